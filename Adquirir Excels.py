@@ -1,20 +1,23 @@
-import requests
 from bs4 import BeautifulSoup
 import os
-from urllib.parse import urljoin
-import time
+from urllib.parse import urljoin, urlsplit
 from tqdm import tqdm
+from scrapers import cache_http, red
+
+# La página con los enlaces cambia como mucho una vez al día: entre ejecuciones sale de la caché
+# en disco (y caducada se revalida con ETag/Last-Modified en vez de descargarla entera)
+CACHE_HORAS = 24
 
 def download_excel_files(url):
-    # Headers para simular un navegador
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
+    host = urlsplit(url).netloc
+    cache_http.configurar_ttl(host, CACHE_HORAS)
+    # Pequeña pausa entre descargas para no sobrecargar el servidor
+    red.configurar_ritmo(host, por_segundo=2)
+
     try:
         # Obtener el contenido de la página
         print("Accediendo a la página web...")
-        response = requests.get(url, headers=headers)
+        response = red.get(url)
         response.raise_for_status()
         
         # Parsear el HTML
@@ -46,8 +49,8 @@ def download_excel_files(url):
                 continue
                 
             try:
-                # Descargar el archivo
-                response = requests.get(excel_url, headers=headers)
+                # Descargar el archivo (sin pasar por la caché: ya se guarda como fichero)
+                response = red.get(excel_url, cache=False)
                 response.raise_for_status()
                 
                 # Guardar el archivo
@@ -56,9 +59,6 @@ def download_excel_files(url):
                 
                 downloaded += 1
                 
-                # Pequeña pausa para no sobrecargar el servidor
-                time.sleep(0.5)
-                
             except Exception as e:
                 print(f"\nError descargando {filename}: {str(e)}")
         
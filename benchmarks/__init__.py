@@ -0,0 +1 @@
+"""Benchmarks de la ingesta y de la carga de las páginas con datos sintéticos del panel."""
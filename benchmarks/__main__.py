@@ -0,0 +1,129 @@
+"""
+Uso:
+    python -m benchmarks                      # panel completo: 700 alimentos x 17 CCAA x 12 meses x 2 años
+    python -m benchmarks --alimentos 100 --meses 3 --repeticiones 3
+    python -m benchmarks --casos carga almacen # solo los casos cuyo nombre empieza así
+
+Cada ejecución se añade a benchmarks/resultados.jsonl y se compara con la última
+ejecución con los mismos parámetros; si algún caso empeora más del umbral, el
+comando termina con código 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from functools import partial
+
+from benchmarks import casos, sinteticos
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+RESULTADOS = os.path.join(CARPETA, "resultados.jsonl")
+DATOS = os.path.join(CARPETA, ".datos")
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        # La salida de la ingesta (un print por CSV) no se mide ni se muestra
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+    return {"mediana": statistics.median(tiempos), "min": min(tiempos), "repeticiones": repeticiones}
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CARPETA, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ultima_ejecucion(ruta, parametros):
+    if not os.path.exists(ruta):
+        return None
+    anterior = None
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            registro = json.loads(linea)
+            if registro["parametros"] == parametros:
+                anterior = registro
+    return anterior
+
+
+def informe(resultados, anterior, umbral):
+    """Imprime la tabla de tiempos y devuelve los casos que han empeorado más del umbral."""
+    regresiones = []
+    print(f"\n{'caso':<28}{'mediana (s)':>13}{'min (s)':>10}{'anterior':>10}{'cambio':>9}")
+    for nombre, r in resultados.items():
+        previo = (anterior or {}).get("resultados", {}).get(nombre)
+        linea = f"{nombre:<28}{r['mediana']:>13.3f}{r['min']:>10.3f}"
+        if previo:
+            cambio = r["mediana"] / previo["mediana"] - 1 if previo["mediana"] else 0.0
+            marca = " ⚠" if cambio > umbral else ""
+            linea += f"{previo['mediana']:>10.3f}{cambio:>+9.0%}{marca}"
+            if marca:
+                regresiones.append(nombre)
+        print(linea)
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Mide la ingesta y la carga de las páginas con datos sintéticos.")
+    parser.add_argument("--alimentos", type=int, default=700)
+    parser.add_argument("--meses", type=int, default=12, choices=range(1, 13), metavar="1-12")
+    parser.add_argument("--anios", type=int, nargs="+", default=[2023, 2024])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de la ingesta (por defecto, uno por CPU)")
+    parser.add_argument("--casos", nargs="*", help="Prefijos de los casos a ejecutar")
+    parser.add_argument("--umbral", type=float, default=0.25, help="Empeoramiento relativo que se marca como regresión")
+    parser.add_argument("--datos", default=DATOS, help="Carpeta donde se generan los datos sintéticos")
+    parser.add_argument("--salida", default=RESULTADOS)
+    parser.add_argument("--no-guardar", action="store_true", help="No añadir la ejecución a los resultados")
+    args = parser.parse_args(argv)
+
+    parametros = {"alimentos": args.alimentos, "meses": args.meses, "anios": args.anios, "workers": args.workers}
+    carpeta = os.path.join(args.datos, f"a{args.alimentos}_m{args.meses}_{'-'.join(map(str, args.anios))}")
+    sinteticos.generar(carpeta, args.anios, args.alimentos, args.meses)
+    salida = os.path.abspath(args.salida)
+
+    # Las páginas y el almacén usan rutas relativas a la raíz del proyecto
+    os.chdir(carpeta)
+    with contextlib.redirect_stdout(io.StringIO()):
+        casos.preparar()
+
+    seleccion = {n: c for n, c in casos.CASOS.items() if not args.casos or any(n.startswith(p) for p in args.casos)}
+    resultados = {}
+    for nombre, (funcion, una_vez, preparacion) in seleccion.items():
+        if nombre == "ingesta.mensuales":
+            funcion = partial(funcion, max_workers=args.workers)
+        print(f"⏱️ {nombre}...")
+        if preparacion is not None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                preparacion()
+        resultados[nombre] = medir(funcion, 1 if una_vez else args.repeticiones)
+
+    regresiones = informe(resultados, ultima_ejecucion(salida, parametros), args.umbral)
+
+    if not args.no_guardar:
+        registro = {"fecha": datetime.now().isoformat(timespec="seconds"), "commit": commit_actual(),
+                    "parametros": parametros, "resultados": resultados}
+        with open(salida, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        print(f"\n💾 Resultados añadidos a {salida}")
+
+    if regresiones:
+        print(f"❌ Regresiones de más del {args.umbral:.0%}: {', '.join(regresiones)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
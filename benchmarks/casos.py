@@ -0,0 +1,240 @@
+"""
+Casos de benchmark. Cada caso es una función sin argumentos que se ejecuta con
+la carpeta de trabajo sintética como directorio actual (igual que la app, que
+usa rutas relativas a la raíz). Los casos marcados como "una_vez" son caros y
+se miden con una sola repetición. Si un caso necesita algo antes (p. ej. llenar
+una caché), `preparacion` se ejecuta justo antes de medirlo, fuera del tiempo.
+"""
+import glob
+import os
+import shutil
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import altair as alt
+from streamlit.testing.v1 import AppTest
+
+from datos import acumulados, almacen, carga, catalogo, cubo, datos_grafico, plan
+from ingesta.pipeline import procesar_mensuales
+from scrapers import cache_http, eroski, red
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINA_ANALISIS_CONCRETO = os.path.join(RAIZ, "pages", "analisis_concreto.py")
+
+FUENTE = "ccaa"
+ALIMENTOS_GRAFICO = 20
+# Segundos que tarda el servidor local en responder cada página, como una web real
+LATENCIA_WEB = 0.15
+
+CASOS = {}
+
+
+def caso(nombre, una_vez=False, preparacion=None):
+    def registrar(funcion):
+        CASOS[nombre] = (funcion, una_vez, preparacion)
+        return funcion
+    return registrar
+
+
+def _ultimo_mes():
+    # (año, mes) más reciente del almacén, a partir de los nombres de las particiones
+    particiones = glob.glob(os.path.join(almacen.ALMACEN_MENSUAL, f"fuente={FUENTE}", "anio=*", "mes=*"))
+    meses = [(os.path.basename(os.path.dirname(p)).split("=")[1], os.path.basename(p).split("=")[1]) for p in particiones]
+    return max(meses, key=lambda am: acumulados.periodo(*am))
+
+
+# ------------------- INGESTA -------------------
+
+@caso("ingesta.mensuales", una_vez=True)
+def ingesta_mensuales(max_workers=None):
+    # Ingesta en frío: sin la caché de niveles ni el manifiesto de la ejecución anterior
+    shutil.rmtree(".cache_ingesta", ignore_errors=True)
+    procesar_mensuales("Excel Mensuales", "CSV_Mensuales", almacen.ALMACEN_MENSUAL,
+                       max_workers=max_workers, forzar=True)
+
+
+# ------------------- CARGA MENSUAL -------------------
+
+def _csv_mes():
+    anio, mes = _ultimo_mes()
+    return sorted(glob.glob(os.path.join(almacen.CSV_MENSUAL, FUENTE, f"{anio}_{FUENTE}_{mes}_*.csv")))
+
+
+@caso("carga.csv_mes_frio")
+def csv_mes_frio():
+    rutas = _csv_mes()
+    carga.limpiar_cache()
+    for ruta in rutas:
+        carga.leer_csv(ruta)
+
+
+@caso("carga.csv_mes_cache")
+def csv_mes_cache():
+    for ruta in _csv_mes():
+        carga.leer_csv(ruta)
+
+
+@caso("catalogo.actualizar")
+def catalogo_actualizar():
+    # Sin el catálogo en memoria: listado de las carpetas y comparación con el JSON guardado
+    catalogo.limpiar_cache()
+    catalogo.cargar()
+
+
+@caso("almacen.leer_mes")
+def leer_mes():
+    anio, mes = _ultimo_mes()
+    almacen.leer_mes(FUENTE, anio, mes)
+
+
+@caso("almacen.leer_panel")
+def leer_panel():
+    almacen.leer_panel(FUENTE)
+
+
+@caso("cubo.construir", una_vez=True)
+def construir_cubo():
+    cubo.limpiar_cache()
+    cubo.cargar()
+
+
+@caso("cubo.mes_ancho")
+def cubo_mes_ancho():
+    anio, mes = _ultimo_mes()
+    cubo.a_ancho(cubo.cortar(FUENTE, [anio], [mes]))
+
+
+@caso("plan.seleccion_completa")
+def seleccion_completa():
+    # "Seleccionar todo" en Datos Generales: todas las regiones de todos los meses
+    csv = catalogo.rutas(FUENTE)
+    seleccion = {}
+    for anio, mes, segmento in csv:
+        seleccion.setdefault((anio, mes), []).append(segmento)
+    datos = plan.cargar_plan(plan.planificar(FUENTE, seleccion))
+    plan.concatenar(list(datos.values()))
+
+
+# ------------------- YTD / TAM -------------------
+
+@caso("acumulados.construir", una_vez=True)
+def construir_acumulados():
+    acumulados.construir(FUENTE)
+
+
+@caso("acumulados.ytd_tam_frio")
+def ytd_tam_frio():
+    anio, mes = _ultimo_mes()
+    carga.limpiar_cache()
+    for region in ["ANDALUCÍA", "MADRID", "CATALUÑA"]:
+        acumulados.ytd(FUENTE, region, anio, "enero", mes)
+        acumulados.tam(FUENTE, region, anio, mes)
+
+
+# ------------------- PÁGINAS Y GRÁFICOS -------------------
+
+@caso("pagina.analisis_concreto")
+def pagina_analisis_concreto():
+    # Ejecución completa de la página: lectura de los dos CSV, diferencias y gráfico matplotlib
+    at = AppTest.from_file(PAGINA_ANALISIS_CONCRETO, default_timeout=120)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def _datos_grafico():
+    # Lo que acumula "Datos Generales" con todas las regiones y meses seleccionados
+    panel = almacen.leer_panel(FUENTE, columnas=["Alimentos", "VALOR (Miles Euros)"])
+    alimentos = panel["Alimentos"].drop_duplicates().iloc[:ALIMENTOS_GRAFICO]
+    df = panel[panel["Alimentos"].isin(alimentos)]
+    return df.rename(columns={almacen.COLUMNA_SEGMENTO: "Región/Categoría"}).astype({"Año": str})
+
+
+@caso("grafico.altair")
+def grafico_altair():
+    df = _datos_grafico()
+    chart = alt.Chart(df).mark_line().encode(
+        x=alt.X("Mes:N", sort=acumulados.MESES, title="Mes"),
+        y=alt.Y("VALOR (Miles Euros):Q", title="VALOR (Miles Euros)"),
+        color=alt.Color("Región/Categoría:N", title="Región/Categoría"),
+        column=alt.Column("Año:N"),
+    )
+    with alt.data_transformers.disable_max_rows():
+        chart.properties(width=300, height=300).interactive().to_dict()
+
+
+@caso("grafico.altair_preparado")
+def grafico_altair_preparado():
+    # El mismo gráfico con los datos agregados en el servidor
+    df = _datos_grafico()
+    preparado = datos_grafico.preparar(df, "Mes", "VALOR (Miles Euros)", color="Región/Categoría", columna="Año")
+    chart = alt.Chart(preparado.datos).mark_line().encode(
+        x=alt.X("Mes:N", sort=acumulados.MESES, title="Mes"),
+        y=alt.Y("VALOR (Miles Euros):Q", title="VALOR (Miles Euros)"),
+        color=alt.Color("Región/Categoría:N", title="Región/Categoría"),
+        column=alt.Column("Año:N"),
+    )
+    with alt.data_transformers.disable_max_rows():
+        chart.properties(width=300, height=300).interactive().to_dict()
+
+
+# ------------------- SCRAPERS -------------------
+
+class _PaginaConLatencia(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCIA_WEB)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+_servidor = None
+
+
+def _servidor_eroski():
+    # Sirve las páginas guardadas en Eroski/ (una vez por proceso) y devuelve su URL
+    global _servidor
+    if _servidor is None:
+        carpeta = os.path.abspath("Eroski")
+        _servidor = ThreadingHTTPServer(("127.0.0.1", 0), partial(_PaginaConLatencia, directory=carpeta))
+        threading.Thread(target=_servidor.serve_forever, daemon=True).start()
+    host, puerto = _servidor.server_address
+    return f"http://{host}:{puerto}"
+
+
+def _buscar_eroski():
+    # Búsqueda y todas las fichas, con el mismo ritmo máximo que contra la web real
+    eroski.URL_BASE = _servidor_eroski()
+    red.configurar_ritmo(eroski.URL_BASE.split("//")[1], eroski.PETICIONES_SEGUNDO, rafaga=eroski.RAFAGA)
+    urls = [url for _, url in eroski.buscar("leche")]
+    detalles = dict(eroski.consultar_detalles(urls))
+    if len(detalles) != len(urls) or any(d["precio"].startswith("Error") for d in detalles.values()):
+        raise RuntimeError("Fichas de Eroski incompletas")
+
+
+@caso("scrapers.eroski_detalles")
+def eroski_detalles():
+    # Sin caché HTTP para el servidor local: todo sale de la red
+    _buscar_eroski()
+
+
+def _llenar_cache_eroski():
+    cache_http.configurar_ttl(_servidor_eroski().split("//")[1], horas=1)
+    _buscar_eroski()
+
+
+@caso("scrapers.eroski_cache", preparacion=_llenar_cache_eroski)
+def eroski_cache():
+    # La misma búsqueda repetida: todo sale de la caché HTTP en disco
+    _buscar_eroski()
+
+
+def preparar():
+    """Deja la carpeta de trabajo lista para los casos que no son de ingesta."""
+    if not os.path.exists(almacen.ALMACEN_MENSUAL):
+        ingesta_mensuales()
+    if not acumulados.existen(FUENTE):
+        construir_acumulados()
@@ -0,0 +1,121 @@
+"""
+Datos sintéticos con la forma de los libros del panel del MAPA.
+
+Genera en una carpeta de trabajo:
+
+    Excel Mensuales/{anio}_ccaa_panel.xlsx   una hoja por mes, bloque por CCAA
+    CSV_Anuales/{anio}_anual_ccaa_{ccaa}.csv  CSV anuales para analisis_concreto
+    Eroski/es/...                             búsqueda y fichas de producto de Eroski
+
+La columna A lleva la sangría de cada alimento (nivel), como los libros reales,
+para que la extracción de niveles recorra el mismo camino.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+
+from datos.acumulados import MESES
+
+CCAA = ["ANDALUCÍA", "ARAGÓN", "ASTURIAS", "BALEARES", "CANARIAS", "CANTABRIA", "CASTILLA LA MANCHA",
+        "CASTILLA Y LEÓN", "CATALUÑA", "C. VALENCIANA", "EXTREMADURA", "GALICIA", "MADRID", "MURCIA",
+        "C. FORAL DE NAVARRA", "PAÍS VASCO", "LA RIOJA"]
+METRICAS = ["CONSUMO X CAPITA", "GASTO X CAPITA", "PENETRACION (%)", "PRECIO MEDIO kg ó litros",
+            "VALOR (Miles Euros)", "VOLUMEN (Miles kg ó litros)"]
+ALIMENTOS_POR_GRUPO = 20
+
+
+def alimentos_sinteticos(n_alimentos):
+    """[(nombre, nivel)]: total, grupos de nivel 1 y alimentos de nivel 2."""
+    alimentos = [(".TOTAL ALIMENTACION", 0)]
+    grupo = 0
+    while len(alimentos) < n_alimentos:
+        grupo += 1
+        alimentos.append((f"T.GRUPO {grupo:03d}", 1))
+        for i in range(ALIMENTOS_POR_GRUPO):
+            if len(alimentos) >= n_alimentos:
+                break
+            alimentos.append((f"ALIMENTO {grupo:03d}-{i:02d}", 2))
+    return alimentos
+
+
+def _valores(rng, n_filas, n_columnas):
+    return np.round(rng.gamma(2.0, 500.0, size=(n_filas, n_columnas)), 4)
+
+
+def escribir_libro_ccaa(path, alimentos, meses, ccaa=CCAA, semilla=0):
+    rng = np.random.default_rng(semilla)
+    wb = Workbook(write_only=True)
+    sangrias = {nivel: Alignment(indent=nivel) for nivel in {n for _, n in alimentos}}
+    for mes in meses:
+        ws = wb.create_sheet(mes.capitalize())
+        ws.append(["Panel de consumo alimentario (sintético)"])
+        ws.append([None] + [c for c in ccaa for _ in METRICAS])
+        ws.append([None] + METRICAS * len(ccaa))
+        valores = _valores(rng, len(alimentos), len(ccaa) * len(METRICAS))
+        for (nombre, nivel), fila in zip(alimentos, valores.tolist()):
+            celda = WriteOnlyCell(ws, value=nombre)
+            celda.alignment = sangrias[nivel]
+            ws.append([celda] + fila)
+    wb.save(path)
+
+
+def escribir_csv_anuales(carpeta, anio, alimentos, ccaa=CCAA, semilla=0):
+    rng = np.random.default_rng(semilla)
+    os.makedirs(carpeta, exist_ok=True)
+    for region in ccaa:
+        df = pd.DataFrame(_valores(rng, len(alimentos), len(METRICAS)), columns=METRICAS)
+        df.insert(0, "Alimentos", [nombre for nombre, _ in alimentos])
+        df["Nivel"] = [float(nivel) for _, nivel in alimentos]
+        df.to_csv(os.path.join(carpeta, f"{anio}_anual_ccaa_{region}.csv"), index=False, sep=";", encoding="utf-8-sig")
+
+
+FICHAS_EROSKI = 40
+
+
+def escribir_paginas_eroski(carpeta, alimento="leche", n_fichas=FICHAS_EROSKI, semilla=0):
+    """
+    Página de resultados y fichas de producto con el marcado de la web de Eroski, como
+    ficheros estáticos (index.html por ruta) que puede servir cualquier servidor HTTP.
+    También se pueden sustituir por páginas reales guardadas desde el navegador.
+    """
+    rng = np.random.default_rng(semilla)
+    enlaces = []
+    for i in range(n_fichas):
+        ruta = f"/es/productdetail/{1000 + i}-{alimento}-{i}/"
+        enlaces.append(f'<a href="{ruta}">{alimento.capitalize()} sintética {i}</a>')
+        reseñas = "".join(f'<div class="reviewText">Reseña {j} del producto {i}.</div>'
+                          for j in range(rng.integers(0, 6)))
+        precio = f"{rng.uniform(0.5, 5):.2f}".replace(".", ",")
+        ficha = (f'<html><head><meta charset="utf-8"></head><body>'
+                 f'<span itemprop="price" class="offer-now">{precio} €</span>'
+                 f'<div class="ratingPercentBar"><div style="width: {rng.integers(0, 101)}%"></div></div>'
+                 f'{reseñas}</body></html>')
+        os.makedirs(carpeta + ruta, exist_ok=True)
+        with open(os.path.join(carpeta + ruta, "index.html"), "w", encoding="utf-8") as f:
+            f.write(ficha)
+    os.makedirs(os.path.join(carpeta, "es", "search", "results"), exist_ok=True)
+    with open(os.path.join(carpeta, "es", "search", "results", "index.html"), "w", encoding="utf-8") as f:
+        # Cada producto aparece dos veces (imagen y título), como en la web
+        f.write(f'<html><head><meta charset="utf-8"></head><body>{"".join(enlaces * 2)}</body></html>')
+
+
+def generar(carpeta, anios=(2023, 2024), n_alimentos=700, n_meses=12):
+    """Crea (si no existen ya) los libros y CSV sintéticos en `carpeta`."""
+    entrada = os.path.join(carpeta, "Excel Mensuales")
+    os.makedirs(entrada, exist_ok=True)
+    alimentos = alimentos_sinteticos(n_alimentos)
+    for i, anio in enumerate(anios):
+        path = os.path.join(entrada, f"{anio}_ccaa_panel.xlsx")
+        if not os.path.exists(path):
+            print(f"🧪 Generando {path}...")
+            escribir_libro_ccaa(path + ".tmp.xlsx", alimentos, MESES[:n_meses], semilla=i)
+            os.replace(path + ".tmp.xlsx", path)
+        if not os.path.exists(os.path.join(carpeta, "CSV_Anuales", f"{anio}_anual_ccaa_{CCAA[0]}.csv")):
+            escribir_csv_anuales(os.path.join(carpeta, "CSV_Anuales"), anio, alimentos, semilla=100 + i)
+    if not os.path.exists(os.path.join(carpeta, "Eroski")):
+        escribir_paginas_eroski(os.path.join(carpeta, "Eroski"))
+    return entrada
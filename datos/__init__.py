@@ -0,0 +1 @@
+"""Utilidades compartidas de carga y almacenamiento de los datos del panel de consumo."""
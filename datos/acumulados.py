@@ -0,0 +1,209 @@
+"""
+Tablas precalculadas de YTD y TAM a partir del almacén mensual.
+
+Por cada (fuente, segmento, alimento) se guardan dos tablas mensuales:
+
+- ytd: suma acumulada desde enero hasta cada mes (prefijo dentro del año).
+- tam: suma de los 12 meses que terminan en cada mes (tasa anual móvil).
+
+Así el YTD entre dos meses cualesquiera es la resta de dos prefijos y el TAM
+una sola búsqueda, sin volver a leer un CSV por mes. Al construirlas se comprueba
+que el YTD del último año coincide con la suma de sus CSV; si no, se borran y la
+página vuelve a sumar los CSV.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from datos import almacen, carga, catalogo
+
+ACUMULADOS_MENSUAL = "Acumulados_Mensual"
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+         "septiembre", "octubre", "noviembre", "diciembre"]
+MES_IDX = {m: i for i, m in enumerate(MESES)}
+
+COLUMNAS_NO_METRICA = [almacen.COLUMNA_SEGMENTO, "Alimentos", "Nivel", "Hoja", "Año", "Mes"]
+
+
+def periodo(anio, mes):
+    return int(anio) * 12 + MES_IDX[mes.lower()]
+
+
+def _acumular_segmento(df):
+    # Igual que al sumar los CSV: lo que no es número cuenta como vacío. En sociodem las
+    # métricas llegan como texto al almacén por la segunda fila de cabecera.
+    metricas = [c for c in df.columns if c not in COLUMNAS_NO_METRICA]
+    df = df.assign(**{c: pd.to_numeric(df[c], errors="coerce") for c in metricas})
+    metricas = [c for c in metricas if df[c].notna().any()]
+    df = df.assign(Periodo=[periodo(a, m) for a, m in zip(df["Año"], df["Mes"])])
+    mensual = df.groupby(["Alimentos", "Periodo"])[metricas].sum()
+
+    # Rejilla completa alimento × mes: los meses sin dato cuentan como 0, igual que al sumar CSVs
+    periodos = np.arange(mensual.index.get_level_values("Periodo").min(),
+                         mensual.index.get_level_values("Periodo").max() + 1)
+    alimentos = mensual.index.get_level_values("Alimentos").unique()
+    rejilla = pd.MultiIndex.from_product([alimentos, periodos], names=["Alimentos", "Periodo"])
+    mensual = mensual.reindex(rejilla, fill_value=0)
+
+    anios = mensual.index.get_level_values("Periodo") // 12
+    ytd = mensual.groupby([mensual.index.get_level_values("Alimentos"), anios]).cumsum()
+
+    total = mensual.groupby(level="Alimentos").cumsum()
+    tam = total - total.groupby(level="Alimentos").shift(12).fillna(0)
+    # Sin 12 meses de historia no hay TAM
+    tam[tam.index.get_level_values("Periodo") < periodos[0] + 11] = np.nan
+    return ytd.reset_index(), tam.reset_index()
+
+
+def calcular_acumulados(df_panel):
+    """Recibe el panel largo de una fuente (almacen.leer_panel) y devuelve (ytd, tam)."""
+    ytds, tams = [], []
+    for segmento, df in df_panel.groupby(almacen.COLUMNA_SEGMENTO, observed=True):
+        # Cada segmento tiene sus propias columnas (sobre todo en sociodem)
+        df = df.dropna(axis=1, how="all")
+        ytd, tam = _acumular_segmento(df)
+        ytd.insert(0, almacen.COLUMNA_SEGMENTO, segmento)
+        tam.insert(0, almacen.COLUMNA_SEGMENTO, segmento)
+        ytds.append(ytd)
+        tams.append(tam)
+    return pd.concat(ytds, ignore_index=True), pd.concat(tams, ignore_index=True)
+
+
+def ruta_tabla(fuente, tipo, destino=ACUMULADOS_MENSUAL):
+    return os.path.join(destino, f"{fuente.lower()}_{tipo}.parquet")
+
+
+def construir(fuente, origen=almacen.ALMACEN_MENSUAL, destino=ACUMULADOS_MENSUAL):
+    df_panel = almacen.leer_panel(fuente, origen=origen)
+    if df_panel.empty:
+        print(f"  ⚠ No hay datos de {fuente} en {origen}")
+        return
+    os.makedirs(destino, exist_ok=True)
+    for tipo, tabla in zip(["ytd", "tam"], calcular_acumulados(df_panel)):
+        ruta = ruta_tabla(fuente, tipo, destino)
+        tabla[almacen.COLUMNA_SEGMENTO] = tabla[almacen.COLUMNA_SEGMENTO].astype("category")
+        tabla.to_parquet(ruta + ".tmp", index=False)
+        os.replace(ruta + ".tmp", ruta)
+        print(f"  ✔ {tipo.upper()} guardado: {ruta}")
+    diferencias = comprobar(fuente, destino=destino)
+    if diferencias:
+        print(f"  ⚠ El YTD de {fuente} no coincide con la suma de los CSV ({', '.join(diferencias[:5])}); "
+              f"se borran sus tablas y se usarán los CSV")
+        for tipo in ["ytd", "tam"]:
+            os.remove(ruta_tabla(fuente, tipo, destino))
+
+
+def construir_todos(origen=almacen.ALMACEN_MENSUAL, destino=ACUMULADOS_MENSUAL):
+    for fuente in almacen.CARPETAS_MENSUALES:
+        construir(fuente, origen, destino)
+
+
+# ------------------- CONSULTAS -------------------
+
+def existen(fuente, destino=ACUMULADOS_MENSUAL):
+    """Si están las dos tablas de la fuente y tienen alguna métrica (si no, hay que sumar los CSV)."""
+    rutas = [ruta_tabla(fuente, t, destino) for t in ["ytd", "tam"]]
+    if not all(os.path.exists(r) for r in rutas):
+        return False
+    no_metricas = set(COLUMNAS_NO_METRICA) | {"Periodo"}
+    return all(set(pq.read_schema(r).names) - no_metricas for r in rutas)
+
+
+def _cargar_tabla(ruta):
+    df = pd.read_parquet(ruta)
+    return df.set_index([almacen.COLUMNA_SEGMENTO, "Periodo", "Alimentos"]).sort_index()
+
+
+def _tabla(fuente, tipo, destino):
+    return carga.cachear_fichero(ruta_tabla(fuente, tipo, destino), _cargar_tabla, "acumulados")
+
+
+def _fila(tabla, segmento, anio, periodo_max):
+    # Último mes disponible del año que no pase de periodo_max -> (DataFrame por alimento, periodo)
+    periodos = tabla.loc[segmento].index.get_level_values("Periodo")
+    validos = periodos[(periodos >= int(anio) * 12) & (periodos <= periodo_max)]
+    if len(validos) == 0:
+        return None, None
+    elegido = validos.max()
+    return tabla.loc[(segmento, elegido)].dropna(axis=1, how="all"), elegido
+
+
+def _filtrar(df, alimentos, columnas):
+    if alimentos is not None:
+        df = df[df.index.isin(list(alimentos))]
+    if columnas is not None:
+        df = df[[c for c in columnas if c in df.columns]]
+    return df.reset_index()
+
+
+def ytd(fuente, segmento, anio, mes_inicio, mes_fin, alimentos=None, columnas=None, destino=ACUMULADOS_MENSUAL):
+    """Suma por alimento desde mes_inicio hasta mes_fin (incluidos) del año indicado."""
+    tabla = _tabla(fuente, "ytd", destino)
+    if segmento not in tabla.index.get_level_values(0):
+        return pd.DataFrame(columns=["Alimentos"])
+    fin, _ = _fila(tabla, segmento, anio, periodo(anio, mes_fin))
+    if fin is None:
+        return pd.DataFrame(columns=["Alimentos"])
+    resultado = fin
+    if MES_IDX[mes_inicio.lower()] > 0:
+        previo, _ = _fila(tabla, segmento, anio, periodo(anio, mes_inicio) - 1)
+        if previo is not None:
+            resultado = fin.sub(previo.reindex(fin.index, fill_value=0), fill_value=0)
+    return _filtrar(resultado, alimentos, columnas)
+
+
+def tam(fuente, segmento, anio, mes="diciembre", alimentos=None, columnas=None, destino=ACUMULADOS_MENSUAL):
+    """
+    Suma de los 12 meses que terminan en `mes` del año indicado (o en el último mes
+    publicado de ese año si `mes` aún no está disponible). Devuelve también el mes usado.
+    """
+    tabla = _tabla(fuente, "tam", destino)
+    if segmento not in tabla.index.get_level_values(0):
+        return pd.DataFrame(columns=["Alimentos"]), None
+    fila, periodo_usado = _fila(tabla, segmento, anio, periodo(anio, mes))
+    if fila is None:
+        return pd.DataFrame(columns=["Alimentos"]), None
+    return _filtrar(fila, alimentos, columnas), MESES[periodo_usado % 12]
+
+
+# ------------------- COMPROBACIÓN -------------------
+
+def _sumar_csv(rutas):
+    # La misma suma que hace la página sin tablas precalculadas (sumar_por_alimento)
+    df = pd.concat([carga.leer_csv(r) for r in rutas], ignore_index=True)
+    metricas = [c for c in df.columns if c not in ["Alimentos", "Nivel", "Mes"]]
+    df = df.assign(**{c: pd.to_numeric(df[c], errors="coerce") for c in metricas})
+    metricas = [c for c in metricas if df[c].notna().any()]
+    return df.groupby("Alimentos")[metricas].sum()
+
+
+def comprobar(fuente, anio=None, carpeta_csv=almacen.CSV_MENSUAL, destino=ACUMULADOS_MENSUAL):
+    """
+    Compara el YTD enero-último mes de `anio` (por defecto el más reciente) de cada segmento
+    con la suma de sus CSV mensuales. Devuelve los segmentos que no coinciden.
+    """
+    rutas = catalogo.rutas(fuente, carpeta=carpeta_csv)
+    if not rutas:
+        return []
+    anio = anio or max(a for a, _, _ in rutas)
+    por_segmento = {}
+    for (a, mes, segmento), ruta in rutas.items():
+        if str(a) == str(anio):
+            por_segmento.setdefault(segmento, []).append((mes, ruta))
+
+    diferencias = []
+    for segmento, meses in sorted(por_segmento.items()):
+        ultimo = max((mes for mes, _ in meses), key=lambda m: MES_IDX[m.lower()])
+        esperado = _sumar_csv([ruta for _, ruta in meses])
+        obtenido = ytd(fuente, segmento, anio, "enero", ultimo, destino=destino).set_index("Alimentos")
+        obtenido = obtenido.reindex(esperado.index)
+        if set(obtenido.columns) != set(esperado.columns) or not np.allclose(
+                obtenido[esperado.columns].to_numpy(dtype=float), esperado.to_numpy(dtype=float), equal_nan=True):
+            diferencias.append(segmento)
+    return diferencias
+
+
+if __name__ == "__main__":
+    construir_todos()
@@ -0,0 +1,191 @@
+"""
+Almacén columnar (Parquet) de los CSV mensuales del panel.
+
+En lugar de un CSV por región/categoría se guarda un único fichero por
+(fuente, año, mes) con todas las regiones/categorías juntas:
+
+    Almacen_Mensual/fuente=ccaa/anio=2022/mes=abril/datos.parquet
+
+La región o categoría va en la columna "Segmento" (dictionary-encoded) y cada
+segmento ocupa su propio row group, de modo que pedir solo unas regiones o
+solo unas columnas no obliga a leer el fichero entero.
+"""
+import os
+import re
+from collections import defaultdict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CSV_MENSUAL = "CSV_Mensuales"
+ALMACEN_MENSUAL = "Almacen_Mensual"
+CARPETAS_MENSUALES = ["ccaa", "canal", "sociodem"]
+NOMBRE_FICHERO = "datos.parquet"
+
+COLUMNA_SEGMENTO = "Segmento"
+COLUMNAS_TEXTO = ["Alimentos", "Hoja"]
+
+
+# ------------------- ESCRITURA -------------------
+
+def ruta_particion(fuente, anio, mes, destino=ALMACEN_MENSUAL):
+    return os.path.join(destino, f"fuente={fuente.lower()}", f"anio={anio}", f"mes={mes.lower()}", NOMBRE_FICHERO)
+
+
+def _normalizar_columnas(df):
+    # Las columnas de métricas pueden llegar como object desde Excel; se pasan a número
+    # solo si la conversión no pierde valores, para no romper columnas de texto.
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if col in COLUMNAS_TEXTO or col == COLUMNA_SEGMENTO:
+            continue
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            convertida = pd.to_numeric(df[col], errors="coerce")
+            if convertida.notna().sum() == df[col].notna().sum():
+                df[col] = convertida
+            else:
+                df[col] = df[col].astype("string")
+    for col in COLUMNAS_TEXTO:
+        if col in df.columns:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def escribir_particion(fuente, anio, mes, segmentos, destino=ALMACEN_MENSUAL):
+    """
+    Escribe en un solo fichero Parquet todos los segmentos de un (fuente, año, mes).
+    `segmentos` es un dict {región/categoría: DataFrame}. Cada segmento queda en su row group.
+    """
+    frames = []
+    for segmento, df in sorted(segmentos.items()):
+        df = df.copy()
+        df.insert(0, COLUMNA_SEGMENTO, str(segmento))
+        frames.append(df)
+    if not frames:
+        return None
+
+    df_total = _normalizar_columnas(pd.concat(frames, ignore_index=True))
+    df_total[COLUMNA_SEGMENTO] = df_total[COLUMNA_SEGMENTO].astype("category")
+    if "Alimentos" in df_total.columns:
+        df_total["Alimentos"] = df_total["Alimentos"].astype("category")
+    tabla = pa.Table.from_pandas(df_total, preserve_index=False)
+
+    ruta = ruta_particion(fuente, anio, mes, destino)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    ruta_tmp = ruta + ".tmp"
+    with pq.ParquetWriter(ruta_tmp, tabla.schema, compression="zstd") as writer:
+        inicio = 0
+        for df in frames:
+            writer.write_table(tabla.slice(inicio, len(df)))
+            inicio += len(df)
+    os.replace(ruta_tmp, ruta)
+    return ruta
+
+
+class EscritorAlmacen:
+    """
+    Acumula los bloques que van generando los exportadores del notebook y los
+    vuelca al almacén agrupados por (fuente, año, mes).
+    """
+
+    def __init__(self, destino=ALMACEN_MENSUAL):
+        self.destino = destino
+        self._pendientes = defaultdict(dict)
+
+    def agregar(self, fuente, anio, mes, segmento, df):
+        self._pendientes[(fuente.lower(), str(anio), mes.lower())][str(segmento)] = df
+
+    def volcar(self):
+        rutas = []
+        for (fuente, anio, mes), segmentos in self._pendientes.items():
+            ruta = escribir_particion(fuente, anio, mes, segmentos, self.destino)
+            if ruta:
+                print(f"  🗄️ Partición guardada: {ruta}")
+                rutas.append(ruta)
+        self._pendientes.clear()
+        return rutas
+
+    def descartar(self):
+        self._pendientes.clear()
+
+
+def construir_desde_csv(carpeta_csv=CSV_MENSUAL, destino=ALMACEN_MENSUAL):
+    """Genera el almacén a partir de los CSV mensuales ya exportados."""
+    escritor = EscritorAlmacen(destino)
+    for fuente in CARPETAS_MENSUALES:
+        carpeta = os.path.join(carpeta_csv, fuente)
+        if not os.path.isdir(carpeta):
+            continue
+        for f in sorted(os.listdir(carpeta)):
+            partes = f.replace(".csv", "").split("_")
+            if not f.endswith(".csv") or len(partes) < 4:
+                continue
+            anio, mes, segmento = partes[0], partes[2], "_".join(partes[3:])
+            df = pd.read_csv(os.path.join(carpeta, f), sep=";", encoding="utf-8-sig")
+            escritor.agregar(fuente, anio, mes, segmento, df)
+        escritor.volcar()
+
+
+# ------------------- LECTURA -------------------
+
+def existe_particion(fuente, anio, mes, origen=ALMACEN_MENSUAL):
+    return os.path.exists(ruta_particion(fuente, anio, mes, origen))
+
+
+def leer_mes(fuente, anio, mes, segmentos=None, columnas=None, origen=ALMACEN_MENSUAL):
+    """
+    Lee un mes completo de una fuente con una sola lectura de fichero.
+    `segmentos` filtra regiones/categorías (se descartan row groups sin leerlos) y
+    `columnas` limita las columnas leídas; Segmento y Alimentos se incluyen siempre.
+    """
+    ruta = ruta_particion(fuente, anio, mes, origen)
+    esquema = pq.read_schema(ruta)
+
+    if columnas is not None:
+        fijas = [COLUMNA_SEGMENTO, "Alimentos"]
+        columnas = [c for c in dict.fromkeys(fijas + list(columnas)) if c in esquema.names]
+
+    filtros = None
+    if segmentos is not None:
+        filtros = [(COLUMNA_SEGMENTO, "in", [str(s) for s in segmentos])]
+
+    df = pq.read_table(ruta, columns=columnas, filters=filtros).to_pandas()
+    if "Alimentos" in df.columns:
+        df["Alimentos"] = df["Alimentos"].astype(object)
+    # Las columnas que solo existen en otros segmentos quedan vacías: se quitan
+    return df.dropna(axis=1, how="all")
+
+
+def leer_panel(fuente, anios=None, meses=None, segmentos=None, columnas=None, origen=ALMACEN_MENSUAL):
+    """Concatena varios meses del almacén añadiendo las columnas Año y Mes."""
+    carpeta = os.path.join(origen, f"fuente={fuente.lower()}")
+    if not os.path.isdir(carpeta):
+        return pd.DataFrame()
+
+    anios = {str(a) for a in anios} if anios is not None else None
+    meses = {m.lower() for m in meses} if meses is not None else None
+    dfs = []
+    for dir_anio in sorted(os.listdir(carpeta)):
+        anio = re.sub(r"^anio=", "", dir_anio)
+        if anios is not None and anio not in anios:
+            continue
+        for dir_mes in sorted(os.listdir(os.path.join(carpeta, dir_anio))):
+            mes = re.sub(r"^mes=", "", dir_mes)
+            if meses is not None and mes not in meses:
+                continue
+            df = leer_mes(fuente, anio, mes, segmentos=segmentos, columnas=columnas, origen=origen)
+            df["Año"] = anio
+            df["Mes"] = mes
+            dfs.append(df)
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+
+def segmento(df_mes, nombre):
+    """Devuelve las filas de un segmento con la forma del CSV original."""
+    df = df_mes[df_mes[COLUMNA_SEGMENTO] == nombre].drop(columns=[COLUMNA_SEGMENTO])
+    return df.dropna(axis=1, how="all").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    construir_desde_csv()
@@ -0,0 +1,74 @@
+"""
+Índice de búsqueda de los nombres de alimentos, compartido por todo el proceso.
+
+Cada nombre recibe un ID entero estable la primera vez que aparece (en cualquier
+año, mes, región o nivel), así que la selección de la página puede guardarse como
+un conjunto de IDs. La búsqueda no distingue mayúsculas ni acentos ("azucar"
+encuentra "AZÚCAR") y sigue siendo "contiene": con tres o más caracteres los
+trigramas de la consulta reducen los candidatos antes de comprobar la subcadena.
+
+    ids = buscador.ids(alimentos_nivel)
+    encontrados = buscador.buscar("aceite oliv", ids)
+    buscador.nombres(encontrados)
+"""
+import threading
+import unicodedata
+
+_lock = threading.Lock()
+_ids = {}  # nombre -> ID
+_nombres = []  # ID -> nombre
+_normalizados = []  # ID -> nombre normalizado
+_trigramas = {}  # trigrama -> conjunto de IDs
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con los espacios colapsados."""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.casefold().split())
+
+
+def _trigramas_de(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _registrar(nombre):
+    # Llamar con el lock cogido
+    id_nombre = len(_nombres)
+    normalizado = normalizar(nombre)
+    _ids[nombre] = id_nombre
+    _nombres.append(nombre)
+    _normalizados.append(normalizado)
+    for trigrama in _trigramas_de(normalizado):
+        _trigramas.setdefault(trigrama, set()).add(id_nombre)
+    return id_nombre
+
+
+def ids(nombres):
+    """IDs de `nombres`, en el mismo orden (los nombres nuevos se añaden al índice)."""
+    with _lock:
+        return [_ids[n] if n in _ids else _registrar(n) for n in nombres]
+
+
+def nombres(ids_nombres):
+    """Nombres de unos IDs, en el mismo orden."""
+    with _lock:
+        return [_nombres[i] for i in ids_nombres]
+
+
+def buscar(consulta, ids_nombres):
+    """Los IDs de `ids_nombres` (en su orden) cuyo nombre contiene `consulta`."""
+    consulta = normalizar(consulta)
+    if not consulta:
+        return list(ids_nombres)
+    with _lock:
+        candidatos = None
+        if len(consulta) >= 3:
+            # Empezando por el trigrama más raro, la intersección se queda pequeña enseguida
+            for trigrama in sorted(_trigramas_de(consulta), key=lambda t: len(_trigramas.get(t, ()))):
+                encontrados = _trigramas.get(trigrama, set())
+                candidatos = encontrados if candidatos is None else candidatos & encontrados
+                if not candidatos:
+                    return []
+        return [i for i in ids_nombres
+                if (candidatos is None or i in candidatos) and consulta in _normalizados[i]]
@@ -0,0 +1,131 @@
+"""
+Carga de CSV con una caché compartida por todo el proceso.
+
+Streamlit ejecuta cada sesión en un hilo del mismo proceso, así que una caché a
+nivel de módulo la comparten todas las páginas y todos los usuarios. La clave
+incluye el mtime y el tamaño del fichero: si la página de subida o el notebook
+reescriben un CSV, la siguiente lectura lo vuelve a parsear sin más.
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from datos import esquemas
+
+# Presupuesto de memoria de la caché (MB), configurable por variable de entorno
+LIMITE_CACHE_MB = int(os.environ.get("PANEL_CACHE_MB", "512"))
+
+_cache = OrderedDict()
+_bytes_en_cache = 0
+_lock = threading.Lock()
+_estadisticas = {"aciertos": 0, "fallos": 0, "expulsiones": 0}
+
+
+def detectar_separador(path, num_lineas=5, encoding="utf-8"):
+    posibles = [',', ';', '\t', '|']
+    with open(path, 'r', encoding=encoding) as f:
+        lineas = list(itertools.islice(f, num_lineas))
+    if not lineas:
+        return ','
+    mejor, max_cnt = None, 0
+    for sep in posibles:
+        cnt = sum(line.count(sep) for line in lineas) / len(lineas)
+        if cnt > max_cnt:
+            mejor, max_cnt = sep, cnt
+    return mejor or ','
+
+
+def _clave(path, *extra):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size) + extra
+
+
+def _guardar(clave, valor, tam):
+    global _bytes_en_cache
+    limite = LIMITE_CACHE_MB * 1024 * 1024
+    if tam > limite:
+        return
+    # Otra versión del mismo fichero ya no sirve: se quita antes de insertar
+    for antigua in [k for k in _cache if k[0] == clave[0] and k[3:] == clave[3:] and k != clave]:
+        _bytes_en_cache -= _cache.pop(antigua)[1]
+    _cache[clave] = (valor, tam)
+    _bytes_en_cache += tam
+    while _bytes_en_cache > limite:
+        _, (_, tam_expulsado) = _cache.popitem(last=False)
+        _bytes_en_cache -= tam_expulsado
+        _estadisticas["expulsiones"] += 1
+
+
+def cachear_fichero(path, cargador, *extra, medir=None):
+    """
+    Devuelve cargador(path) usando la caché compartida; la clave es (ruta, mtime,
+    tamaño) más `extra`. `medir` calcula los bytes del resultado (por defecto el
+    memory_usage de un DataFrame). El resultado es compartido: no modificarlo.
+    """
+    clave = _clave(path, *extra)
+
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada is not None:
+            _cache.move_to_end(clave)
+            _estadisticas["aciertos"] += 1
+            return entrada[0]
+
+    valor = cargador(path)
+    tam = medir(valor) if medir else int(valor.memory_usage(deep=True).sum())
+
+    with _lock:
+        _estadisticas["fallos"] += 1
+        _guardar(clave, valor, tam)
+    return valor
+
+
+def leer_csv(path, sep=None, encoding="utf-8-sig", compacto=False, **opciones):
+    """
+    Equivalente a pd.read_csv con caché LRU por (ruta, mtime, tamaño, separador).
+    Separador y codificación salen del registro de esquemas (datos.esquemas): se
+    detectan la primera vez que se lee el fichero y después se pasan explícitos.
+    Con `compacto` las métricas se devuelven en float32, Nivel en Int8 y
+    Alimentos/Hoja como category. Si se pasan otras `opciones` de read_csv no se usa el registro.
+
+    Devuelve una copia superficial: se pueden añadir o reasignar columnas, pero
+    no modificar valores en el sitio porque el resto de sesiones comparten los datos.
+    """
+    if opciones:
+        if sep is None:
+            sep = detectar_separador(path, encoding=encoding)
+
+        def cargador(p):
+            return pd.read_csv(p, sep=sep, encoding=encoding, **opciones)
+
+        df = cachear_fichero(path, cargador, "csv", sep, encoding, repr(sorted(opciones.items())))
+        return df.copy(deep=False)
+
+    def cargador(p):
+        esquema = esquemas.consultar(p)
+        if esquema is None:
+            cod = esquemas.detectar_codificacion(p, encoding)
+            separador = sep or detectar_separador(p, encoding=cod)
+            df = pd.read_csv(p, sep=separador, encoding=cod)
+            esquema = esquemas.registrar(p, df, separador, cod)
+        else:
+            df = pd.read_csv(p, sep=sep or esquema.sep, encoding=esquema.encoding)
+        return esquemas.compactar(df, esquema) if compacto else df
+
+    df = cachear_fichero(path, cargador, "csv", sep, encoding, compacto)
+    return df.copy(deep=False)
+
+
+def limpiar_cache():
+    global _bytes_en_cache
+    with _lock:
+        _cache.clear()
+        _bytes_en_cache = 0
+
+
+def estadisticas_cache():
+    with _lock:
+        return dict(_estadisticas, ficheros=len(_cache), mb=round(_bytes_en_cache / 1024 / 1024, 1))
@@ -0,0 +1,170 @@
+"""
+Catálogo de los CSV mensuales.
+
+Un índice con una fila por fichero {año}_{fuente}_{mes}_{segmento}.csv:
+
+    Fuente, Año, Mes, Segmento, Métrica, Ruta, Tamano, Mtime, Filas, Separador, Columnas
+
+Se guarda en CSV_Mensuales/.catalogo.json y se actualiza de forma incremental:
+solo se vuelven a leer (separador, cabecera y número de filas) los ficheros nuevos
+o con otro mtime/tamaño. Dentro del proceso, si el mtime de las carpetas no ha
+cambiado ni siquiera se listan (los exportadores escriben con os.replace, que
+actualiza el mtime de la carpeta). Las páginas consultan aquí los años, meses y
+regiones/categorías disponibles en lugar de listar y partir nombres en cada rerun.
+"""
+import json
+import os
+import re
+import threading
+
+import pandas as pd
+
+from datos import almacen, carga
+
+FICHERO_CATALOGO = ".catalogo.json"
+COLUMNAS = ["Fuente", "Año", "Mes", "Segmento", "Métrica", "Ruta", "Tamano", "Mtime", "Filas", "Separador", "Columnas"]
+# En ccaa el segmento es la región; en canal y sociodem cada fichero es una métrica
+FUENTES_POR_REGION = ["ccaa"]
+
+_PATRON_CSV = re.compile(r"^(?P<anio>[^_]+)_(?P<fuente>[^_]+)_(?P<mes>[^_]+)_(?P<segmento>.+)\.csv$")
+
+_lock = threading.Lock()
+_catalogos = {}  # carpeta -> (mtimes de las carpetas, DataFrame)
+
+
+# ------------------- CONSTRUCCIÓN -------------------
+
+def _describir(ruta, st):
+    # Separador, columnas y filas de un CSV, leyendo la cabecera y contando saltos de línea
+    sep = carga.detectar_separador(ruta, encoding="utf-8-sig")
+    with open(ruta, "rb") as f:
+        cabecera = f.readline().decode("utf-8-sig").rstrip("\r\n")
+        filas = sum(trozo.count(b"\n") for trozo in iter(lambda: f.read(1024 * 1024), b""))
+    return {"tamano": st.st_size, "mtime": st.st_mtime_ns, "filas": filas,
+            "sep": sep, "columnas": cabecera.split(sep) if cabecera else []}
+
+
+def _cargar_json(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_json(ruta, datos):
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def actualizar(carpeta=almacen.CSV_MENSUAL):
+    """Recorre las carpetas, describe solo los ficheros nuevos o cambiados y guarda el catálogo."""
+    ruta_json = os.path.join(carpeta, FICHERO_CATALOGO)
+    previo = _cargar_json(ruta_json)
+    entradas = {}
+    for fuente in almacen.CARPETAS_MENSUALES:
+        carpeta_fuente = os.path.join(carpeta, fuente)
+        if not os.path.isdir(carpeta_fuente):
+            continue
+        for f in os.scandir(carpeta_fuente):
+            if not f.is_file() or not _PATRON_CSV.match(f.name):
+                continue
+            clave = f"{fuente}/{f.name}"
+            st = f.stat()
+            anterior = previo.get(clave)
+            if anterior and anterior["tamano"] == st.st_size and anterior["mtime"] == st.st_mtime_ns:
+                entradas[clave] = anterior
+            else:
+                entradas[clave] = _describir(f.path, st)
+    if entradas != previo and os.path.isdir(carpeta):
+        _guardar_json(ruta_json, entradas)
+    return entradas
+
+
+def _tabla(carpeta, entradas):
+    filas = []
+    for clave, e in entradas.items():
+        fuente, nombre = clave.split("/", 1)
+        m = _PATRON_CSV.match(nombre)
+        segmento = m["segmento"]
+        filas.append((fuente, m["anio"], m["mes"].lower(), segmento,
+                      None if fuente in FUENTES_POR_REGION else segmento,
+                      os.path.join(carpeta, fuente, nombre), e["tamano"], e["mtime"], e["filas"], e["sep"], e["columnas"]))
+    df = pd.DataFrame(filas, columns=COLUMNAS)
+    return df.astype({"Tamano": "int64", "Mtime": "int64", "Filas": "int64"})
+
+
+def _mtimes(carpeta):
+    mtimes = []
+    for fuente in almacen.CARPETAS_MENSUALES:
+        try:
+            mtimes.append(os.stat(os.path.join(carpeta, fuente)).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def cargar(carpeta=almacen.CSV_MENSUAL):
+    """Devuelve el catálogo (DataFrame) compartido del proceso, actualizándolo si hace falta."""
+    mtimes = _mtimes(carpeta)
+    with _lock:
+        entrada = _catalogos.get(carpeta)
+        if entrada is not None and entrada[0] == mtimes:
+            return entrada[1]
+    df = _tabla(carpeta, actualizar(carpeta))
+    with _lock:
+        _catalogos[carpeta] = (mtimes, df)
+    return df
+
+
+def limpiar_cache():
+    with _lock:
+        _catalogos.clear()
+
+
+# ------------------- CONSULTA -------------------
+
+def ficheros(fuente=None, anio=None, mes=None, segmento=None, carpeta=almacen.CSV_MENSUAL):
+    """Filas del catálogo que cumplen los filtros indicados."""
+    df = cargar(carpeta)
+    if fuente is not None:
+        df = df[df["Fuente"] == fuente.lower()]
+    if anio is not None:
+        df = df[df["Año"] == str(anio)]
+    if mes is not None:
+        df = df[df["Mes"] == mes.lower()]
+    if segmento is not None:
+        df = df[df["Segmento"] == segmento]
+    return df
+
+
+def anios(fuente=None, carpeta=almacen.CSV_MENSUAL):
+    return sorted(ficheros(fuente, carpeta=carpeta)["Año"].unique())
+
+
+def estructura(fuente, carpeta=almacen.CSV_MENSUAL):
+    """{año: {mes, ...}} con los meses en minúsculas."""
+    df = ficheros(fuente, carpeta=carpeta)
+    return {anio: set(g["Mes"]) for anio, g in df.groupby("Año")}
+
+
+def segmentos(fuente, anio=None, carpeta=almacen.CSV_MENSUAL):
+    """{año: {segmento, ...}} (o el conjunto de un año si se indica)."""
+    df = ficheros(fuente, anio, carpeta=carpeta)
+    por_anio = {a: set(g["Segmento"]) for a, g in df.groupby("Año")}
+    return por_anio.get(str(anio), set()) if anio is not None else por_anio
+
+
+def rutas(fuente, carpeta=almacen.CSV_MENSUAL):
+    """{(año, mes, segmento): ruta} de todos los CSV de una fuente."""
+    df = ficheros(fuente, carpeta=carpeta)
+    return dict(zip(zip(df["Año"], df["Mes"], df["Segmento"]), df["Ruta"]))
+
+
+def ruta(fuente, anio, mes, segmento, carpeta=almacen.CSV_MENSUAL):
+    """Ruta del CSV o None si no está en el catálogo."""
+    df = ficheros(fuente, anio, mes, segmento, carpeta=carpeta)
+    return df["Ruta"].iloc[0] if not df.empty else None
@@ -0,0 +1,113 @@
+"""
+Representación compacta de los datos del panel.
+
+Los mismos textos (alimentos, hojas, regiones, orígenes...) se repiten en cada
+uno de los cientos de CSV mensuales. En modo compacto esas columnas se guardan
+como Categorical contra un diccionario global por columna, compartido por todo el
+proceso: cada fichero solo aporta sus códigos, y los trozos de ficheros distintos
+se concatenan sin volver a object. Las métricas pasan a float32 y Nivel a Int8.
+
+float32 solo guarda unas 7 cifras significativas: los totales grandes (p. ej.
+miles de euros de T.ESPAÑA) pierden las últimas cifras en las sumas y en lo que se
+exporta. Por eso el modo está desactivado por defecto; PANEL_COMPACTO=1 lo activa
+cuando importa más la memoria que la exactitud.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+ACTIVO = os.environ.get("PANEL_COMPACTO", "0") != "0"
+TIPO_METRICA = np.float32 if ACTIVO else np.float64
+
+COLUMNA_NIVEL = "Nivel"
+COLUMNAS_CATEGORICAS = ["Alimentos", "Hoja", "Origen", "Segmento", "Región/Categoría", "Fuente", "Año", "Mes"]
+
+_lock = threading.Lock()
+_diccionarios = {}  # columna -> {valor: código}
+_tipos = {}  # columna -> CategoricalDtype con todas las categorías vistas hasta ahora
+
+
+def categorizar(valores, columna):
+    """Categorical de `valores` con el diccionario global de `columna` (que crece si hace falta)."""
+    codigos, unicos = pd.factorize(pd.Series(valores, copy=False))
+    with _lock:
+        diccionario = _diccionarios.setdefault(columna, {})
+        nuevos = [u for u in unicos if u not in diccionario]
+        if nuevos or columna not in _tipos:
+            for u in nuevos:
+                diccionario[u] = len(diccionario)
+            # Las categorías solo se añaden al final: los códigos antiguos siguen valiendo
+            _tipos[columna] = pd.CategoricalDtype(pd.Index(list(diccionario), dtype=object))
+        tipo = _tipos[columna]
+        mapa = np.fromiter((diccionario[u] for u in unicos), dtype=np.int32, count=len(unicos))
+    globales = np.where(codigos >= 0, mapa[np.maximum(codigos, 0)] if len(mapa) else -1, -1)
+    return pd.Categorical.from_codes(globales, dtype=tipo)
+
+
+def _alinear_columna(serie, columna):
+    # Un Categorical creado con una versión anterior del diccionario se pasa a la actual
+    # reutilizando sus códigos (el diccionario actual empieza por las mismas categorías)
+    with _lock:
+        tipo = _tipos.get(columna)
+    if tipo is None or serie.dtype == tipo:
+        return serie
+    previas = serie.cat.categories
+    if len(previas) <= len(tipo.categories) and tipo.categories[:len(previas)].equals(previas):
+        return pd.Series(pd.Categorical.from_codes(serie.cat.codes.to_numpy(), dtype=tipo),
+                         index=serie.index, name=serie.name)
+    return pd.Series(categorizar(serie.astype(object), columna), index=serie.index, name=serie.name)
+
+
+def nivel_compacto(serie):
+    """Nivel en Int8 si todos sus valores son enteros pequeños; si no, en float32."""
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(np.float64, na_value=np.nan)
+    presentes = valores[~np.isnan(valores)]
+    if ((presentes % 1) == 0).all() and ((presentes >= -128) & (presentes <= 127)).all():
+        return pd.array(valores, dtype="Int8")
+    return valores.astype(np.float32)
+
+
+def compactar(df):
+    """Copia de `df` con columnas de texto conocidas como categóricas y métricas en float32."""
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if col in COLUMNAS_CATEGORICAS:
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                columnas[col] = _alinear_columna(serie, col)
+            elif not pd.api.types.is_numeric_dtype(serie):
+                columnas[col] = categorizar(serie, col)
+        elif col == COLUMNA_NIVEL:
+            if pd.api.types.is_numeric_dtype(serie) and str(serie.dtype) != "Int8":
+                columnas[col] = nivel_compacto(serie)
+        elif pd.api.types.is_float_dtype(serie) and serie.dtype != np.float32:
+            # Series.astype cuesta más que la conversión en numpy para estas columnas tan cortas
+            columnas[col] = serie.to_numpy(np.float32, na_value=np.nan)
+        elif pd.api.types.is_integer_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            columnas[col] = serie.to_numpy(np.float32, na_value=np.nan)
+    return df.assign(**columnas) if columnas else df
+
+
+def concatenar(frames):
+    """pd.concat que conserva las categóricas globales aunque los trozos se crearan con versiones distintas del diccionario."""
+    alineados = []
+    for df in frames:
+        columnas = {col: _alinear_columna(df[col], col) for col in df.columns
+                    if col in COLUMNAS_CATEGORICAS and isinstance(df[col].dtype, pd.CategoricalDtype)}
+        alineados.append(df.assign(**columnas) if columnas else df)
+    return pd.concat(alineados, ignore_index=True)
+
+
+def memoria():
+    """Bytes de los diccionarios globales de categorías."""
+    with _lock:
+        tipos = list(_tipos.values())
+    return sum(int(t.categories.memory_usage(deep=True)) for t in tipos)
+
+
+def limpiar_cache():
+    with _lock:
+        _diccionarios.clear()
+        _tipos.clear()
@@ -0,0 +1,195 @@
+"""
+Cubo del panel en formato largo, compartido por todas las páginas.
+
+Todo el almacén mensual se carga una vez por proceso en un único DataFrame con
+una fila por (fuente, año, mes, segmento, alimento, métrica):
+
+    índice:   Fuente, Año, Mes, Segmento, Alimentos, Orden, Métrica (categóricos salvo Orden)
+    columnas: Nivel (float32), Valor (float32 en modo compacto, si no float64)
+
+"Orden" es la posición de la fila en el CSV original: conserva el orden de la
+jerarquía y distingue los alimentos con el mismo nombre en ramas distintas. Las
+páginas recortan el cubo con cortar() y, si necesitan la forma de un CSV, lo
+pasan a ancho con a_ancho(). El cubo se recarga solo si cambia algún fichero
+del almacén. Las columnas de texto (p. ej. las de sociodem que no son numéricas)
+no forman parte del cubo.
+"""
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from datos import almacen, compacto
+from datos.acumulados import MESES
+
+NIVELES_INDICE = ["Fuente", "Año", "Mes", almacen.COLUMNA_SEGMENTO, "Alimentos", "Orden", "Métrica"]
+COLUMNAS_NO_METRICA = [almacen.COLUMNA_SEGMENTO, "Alimentos", "Nivel", "Hoja", "Año", "Mes"]
+
+_lock = threading.Lock()
+_cubos = {}  # origen -> (firma, cubo)
+
+
+# ------------------- CONSTRUCCIÓN -------------------
+
+def _categorico(valores, repeticiones, categorias=None):
+    # Se codifica sobre las filas del panel y se repiten los códigos, no los textos
+    if categorias is None:
+        # Categorías en orden de aparición: al pasar a ancho se conserva el orden del CSV
+        categorias = pd.unique(pd.Series(valores, dtype=object).dropna())
+    cat = pd.Categorical(valores, categories=categorias)
+    return pd.Categorical.from_codes(np.repeat(cat.codes, repeticiones), cat.categories)
+
+
+def _largo_fuente(fuente, origen):
+    panel = almacen.leer_panel(fuente, origen=origen)
+    if panel.empty:
+        return None
+    metricas = [c for c in panel.columns
+                if c not in COLUMNAS_NO_METRICA and pd.api.types.is_numeric_dtype(panel[c])]
+    if not metricas:
+        return None
+
+    # Cada fila del panel se repite una vez por métrica (ravel en orden C: fila a fila)
+    k = len(metricas)
+    claves = ["Año", "Mes", almacen.COLUMNA_SEGMENTO]
+    orden = panel.groupby(claves, sort=False, observed=True).cumcount().to_numpy()
+    nivel = panel["Nivel"] if "Nivel" in panel.columns else pd.Series(np.nan, index=panel.index)
+
+    return pd.DataFrame({
+        "Fuente": pd.Categorical.from_codes(np.zeros(len(panel) * k, dtype=np.int8), [fuente]),
+        "Año": _categorico(panel["Año"].astype(str), k),
+        "Mes": _categorico(panel["Mes"], k, MESES),
+        almacen.COLUMNA_SEGMENTO: _categorico(panel[almacen.COLUMNA_SEGMENTO].astype(str), k),
+        "Alimentos": _categorico(panel["Alimentos"].astype(object), k),
+        "Orden": np.repeat(orden.astype(np.int32), k),
+        "Métrica": pd.Categorical.from_codes(np.tile(np.arange(k, dtype=np.int16), len(panel)), metricas),
+        "Nivel": np.repeat(pd.to_numeric(nivel, errors="coerce").to_numpy(np.float32), k),
+        "Valor": panel[metricas].to_numpy(dtype=compacto.TIPO_METRICA).ravel(),
+    })
+
+
+def _concatenar(partes):
+    # pd.concat convierte a object los categóricos con categorías distintas: se unen antes
+    if len(partes) == 1:
+        return partes[0]
+    columnas = {}
+    for col in partes[0].columns:
+        if isinstance(partes[0][col].dtype, pd.CategoricalDtype):
+            columnas[col] = union_categoricals([p[col] for p in partes])
+        else:
+            columnas[col] = np.concatenate([p[col].to_numpy() for p in partes])
+    return pd.DataFrame(columnas)
+
+
+def construir(origen=almacen.ALMACEN_MENSUAL):
+    """Lee todo el almacén y devuelve el cubo largo con su MultiIndex ordenado."""
+    partes = [p for p in (_largo_fuente(f, origen) for f in almacen.CARPETAS_MENSUALES) if p is not None]
+    if not partes:
+        indice = pd.MultiIndex.from_arrays([[] for _ in NIVELES_INDICE], names=NIVELES_INDICE)
+        return pd.DataFrame({"Nivel": pd.Series(dtype=np.float32), "Valor": pd.Series(dtype=compacto.TIPO_METRICA)}, index=indice)
+    cubo = _concatenar(partes).set_index(NIVELES_INDICE)
+    return cubo.sort_index()
+
+
+def _firma(origen):
+    rutas = sorted(glob.glob(os.path.join(origen, "fuente=*", "anio=*", "mes=*", almacen.NOMBRE_FICHERO)))
+    firma = []
+    for ruta in rutas:
+        st = os.stat(ruta)
+        firma.append((ruta, st.st_mtime_ns, st.st_size))
+    return tuple(firma)
+
+
+def cargar(origen=almacen.ALMACEN_MENSUAL):
+    """
+    Devuelve el cubo compartido del proceso, reconstruyéndolo solo si ha cambiado
+    algún fichero del almacén. El resultado es compartido: no modificarlo.
+    """
+    firma = _firma(origen)
+    with _lock:
+        entrada = _cubos.get(origen)
+        if entrada is not None and entrada[0] == firma:
+            return entrada[1]
+    cubo = construir(origen)
+    with _lock:
+        _cubos[origen] = (firma, cubo)
+    return cubo
+
+
+def limpiar_cache():
+    with _lock:
+        _cubos.clear()
+
+
+def memoria():
+    """Bytes que ocupan los cubos ya cargados en el proceso (sin cargar ninguno)."""
+    with _lock:
+        cubos = [c for _, c in _cubos.values()]
+    return sum(int(c.memory_usage(deep=True).sum()) for c in cubos)
+
+
+# ------------------- CONSULTA -------------------
+
+def _mascara(indice, nivel, valores):
+    # Se compara contra las categorías del nivel (pocas) y se propaga con los códigos
+    pos = indice.names.index(nivel)
+    en_nivel = indice.levels[pos].isin(list(valores))
+    codigos = indice.codes[pos]
+    return en_nivel[codigos] & (codigos >= 0)
+
+
+def fuentes(origen=almacen.ALMACEN_MENSUAL):
+    return list(cargar(origen).index.levels[0])
+
+
+def contiene(fuente, origen=almacen.ALMACEN_MENSUAL):
+    return fuente.lower() in fuentes(origen)
+
+
+def periodos(fuente=None, origen=almacen.ALMACEN_MENSUAL):
+    """[(año, mes)] con datos en el cubo, en orden cronológico."""
+    indice = cortar(fuente, origen=origen).index if fuente is not None else cargar(origen).index
+    anios, meses = indice.levels[1], indice.levels[2]
+    pares = np.unique(indice.codes[1].astype(np.int64) * len(meses) + indice.codes[2])
+    return sorted(((anios[p // len(meses)], meses[p % len(meses)]) for p in pares),
+                  key=lambda am: (am[0], MESES.index(am[1])))
+
+
+def cortar(fuente=None, anios=None, meses=None, segmentos=None, alimentos=None, metricas=None,
+           origen=almacen.ALMACEN_MENSUAL):
+    """Recorte del cubo largo; cada filtro a None deja pasar todos los valores de ese nivel."""
+    cubo = cargar(origen)
+    filtros = {
+        "Fuente": [fuente.lower()] if fuente is not None else None,
+        "Año": [str(a) for a in anios] if anios is not None else None,
+        "Mes": [m.lower() for m in meses] if meses is not None else None,
+        almacen.COLUMNA_SEGMENTO: [str(s) for s in segmentos] if segmentos is not None else None,
+        "Alimentos": alimentos,
+        "Métrica": metricas,
+    }
+    mascara = np.ones(len(cubo), dtype=bool)
+    for nivel, valores in filtros.items():
+        if valores is not None:
+            mascara &= _mascara(cubo.index, nivel, valores)
+    return cubo[mascara]
+
+
+def a_ancho(largo):
+    """
+    Pasa un recorte del cubo a la forma de los CSV: una fila por alimento y
+    segmento, con las métricas como columnas y Nivel al final.
+    """
+    claves = NIVELES_INDICE[:-1]
+    if largo.empty:
+        return pd.DataFrame(columns=claves[:-1] + ["Nivel"])
+    ancho = largo["Valor"].unstack("Métrica")
+    ancho = ancho.dropna(axis=1, how="all")
+    ancho.columns = list(ancho.columns)
+    ancho["Nivel"] = largo["Nivel"].groupby(level=claves, observed=True).first()
+    ancho = ancho.reset_index().sort_values(claves[:4] + ["Orden"], kind="stable")
+    for col in claves[:4] + ["Alimentos"]:
+        ancho[col] = ancho[col].astype(object)
+    return ancho.drop(columns=["Orden"]).reset_index(drop=True)
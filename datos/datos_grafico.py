@@ -0,0 +1,79 @@
+"""
+Datos de los gráficos Altair ya reducidos en el servidor.
+
+alt.Chart(df) manda al navegador todas las filas y todas las columnas del panel,
+aunque el gráfico solo use x/y/color/facetas. preparar() se queda con esos campos,
+agrega y (suma o media) por cada combinación de ellos y, si aún pasan del límite,
+recorta: en los gráficos agregados se quedan las categorías con más peso del campo
+con más categorías; en los de puntos (dispersión, boxplot) se toma una muestra
+estratificada y reproducible. Streamlit serializa el resultado a Arrow una sola vez.
+
+    preparado = datos_grafico.preparar(df, "Mes", "VALOR", color="Región/Categoría")
+    alt.Chart(preparado.datos).mark_line().encode(...)
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Máximo de filas que se mandan a un gráfico, configurable por variable de entorno
+LIMITE_FILAS = int(os.environ.get("PANEL_GRAFICO_FILAS", "5000"))
+AGREGACIONES = {"Suma": "sum", "Media": "mean"}
+
+# datos: DataFrame listo para alt.Chart; filas_origen: filas de partida; recorte: texto o None
+Preparado = namedtuple("Preparado", ["datos", "filas_origen", "recorte"])
+
+
+def _recortar_categorias(datos, campos, y, max_filas):
+    # El campo con más categorías es el que más filas aporta: se quedan sus categorías de más peso
+    campo = max(campos, key=lambda c: datos[c].nunique())
+    total = datos[campo].nunique()
+    grupos = datos[y].abs().groupby(datos[campo], observed=True, sort=False)
+    orden = grupos.sum().sort_values(ascending=False, kind="stable").index
+    acumuladas = grupos.size().reindex(orden).cumsum().to_numpy()
+    elegidas = orden[:max(1, int((acumuladas <= max_filas).sum()))]
+    datos = datos[datos[campo].isin(elegidas)]
+    return datos, f"{len(elegidas)} de {total} valores de '{campo}' (los de más peso)"
+
+
+def _muestrear(datos, campos, max_filas):
+    # Tras barajar (semilla fija), cada punto queda en la posición relativa que ocupa dentro de su
+    # grupo; tomar las menores reparte la muestra en proporción al tamaño de cada grupo
+    barajado = datos.iloc[np.random.default_rng(0).permutation(len(datos))]
+    grupos = barajado.groupby(campos, observed=True, sort=False)
+    posicion = (grupos.cumcount() + 0.5) / grupos[campos[0]].transform("size")
+    elegidos = np.argsort(posicion.to_numpy(), kind="stable")[:max_filas]
+    muestra = barajado.iloc[elegidos].sort_index()
+    return muestra, f"muestra de {len(muestra)} de {len(datos)} puntos"
+
+
+def preparar(df, x, y, color=None, fila=None, columna=None, agregacion="sum", max_filas=None):
+    """
+    Solo las columnas codificadas, con `y` agregada por (x, color, fila, columna):
+        agregacion: "sum", "mean" o None para dejar los puntos sin agregar
+        max_filas:  límite de filas (LIMITE_FILAS por defecto)
+    """
+    max_filas = max_filas or LIMITE_FILAS
+    campos = list(dict.fromkeys(c for c in (x, color, fila, columna) if c))
+    datos = df[campos + [y]]
+    filas_origen = len(datos)
+
+    if agregacion:
+        datos = datos.groupby(campos, observed=True, sort=False)[y].agg(agregacion).reset_index()
+    else:
+        datos = datos.dropna(subset=[y])
+
+    recorte = None
+    if len(datos) > max_filas:
+        if agregacion:
+            datos, recorte = _recortar_categorias(datos, campos, y, max_filas)
+        else:
+            datos, recorte = _muestrear(datos, campos, max_filas)
+
+    # Las categóricas globales arrastran todo su diccionario al Arrow: solo las usadas
+    categoricas = {c: datos[c].cat.remove_unused_categories() for c in campos
+                   if isinstance(datos[c].dtype, pd.CategoricalDtype)}
+    if categoricas:
+        datos = datos.assign(**categoricas)
+    return Preparado(datos.reset_index(drop=True), filas_origen, recorte)
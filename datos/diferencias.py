@@ -0,0 +1,130 @@
+"""
+Motor de diferencias entre N ficheros (p. ej. todos los años de una métrica).
+
+alinear() agrupa cada fichero por la columna categórica (media del valor) y los
+alinea una sola vez en una matriz NumPy categorías x ficheros, que queda en caché
+mientras no cambie ningún fichero. A partir de ahí, comparar un par, cambiar el
+tipo de diferencia o el número de categorías del gráfico solo recorta la matriz:
+
+    alineado = diferencias.alinear(rutas, "Alimentos", "VALOR")
+    par = diferencias.par(alineado, 0, 2)   # DataFrame del par 0 -> 2
+    top = ranking.top_k(par["Diferencia"], 20, por_magnitud=True)
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from datos import carga
+
+MAX_ALINEADOS = 32
+
+# categorias: pd.Index (filas de la matriz); nombres: ficheros (columnas); matriz: float64;
+# niveles: Nivel de cada categoría (el del primer fichero que la tiene) o None si no hay columna Nivel
+Alineado = namedtuple("Alineado", ["categoria", "valor", "nombres", "categorias", "matriz", "niveles"])
+
+_lock = threading.Lock()
+_alineados = OrderedDict()
+
+
+def _firma(rutas):
+    firma = []
+    for ruta in rutas:
+        st = os.stat(ruta)
+        firma.append((os.path.abspath(ruta), st.st_mtime_ns, st.st_size))
+    return tuple(firma)
+
+
+def _construir(rutas, categoria, valor):
+    medias, niveles = [], []
+    for ruta in rutas:
+        df = carga.leer_csv(ruta)
+        medias.append(df[[categoria, valor]].dropna().groupby(categoria)[valor].mean())
+        if "Nivel" in df.columns and categoria != "Nivel":
+            niveles.append(df[[categoria, "Nivel"]].dropna().groupby(categoria)["Nivel"].first())
+    # Unión ordenada de las categorías; NaN donde un fichero no tiene la categoría
+    categorias = medias[0].index
+    for m in medias[1:]:
+        categorias = categorias.union(m.index)
+    matriz = np.column_stack([m.reindex(categorias).to_numpy(np.float64) for m in medias])
+    nivel = None
+    if niveles:
+        nivel = niveles[0].reindex(categorias)
+        for n in niveles[1:]:
+            nivel = nivel.fillna(n.reindex(categorias))
+        nivel = nivel.to_numpy(np.float64)
+    return Alineado(categoria, valor, [os.path.basename(r) for r in rutas], categorias, matriz, nivel)
+
+
+def alinear(rutas, categoria, valor):
+    """Matriz categorías x ficheros con la media de `valor` por `categoria` (compartida: no modificarla)."""
+    clave = (_firma(rutas), categoria, valor)
+    with _lock:
+        if clave in _alineados:
+            _alineados.move_to_end(clave)
+            return _alineados[clave]
+    alineado = _construir(rutas, categoria, valor)
+    with _lock:
+        _alineados[clave] = alineado
+        while len(_alineados) > MAX_ALINEADOS:
+            _alineados.popitem(last=False)
+    return alineado
+
+
+def limpiar_cache():
+    with _lock:
+        _alineados.clear()
+
+
+def todas(alineado):
+    """
+    Diferencias de todos los pares a la vez: (absolutas, porcentuales), arrays de forma
+    (categorías, base, comparado). El porcentaje es NaN donde la base es 0 o falta.
+    """
+    m = alineado.matriz
+    absolutas = m[:, None, :] - m[:, :, None]
+    base = np.broadcast_to(m[:, :, None], absolutas.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        porcentuales = np.where(base != 0, absolutas / base * 100, np.nan)
+    return absolutas, porcentuales
+
+
+def resumen_pares(alineado):
+    """Una fila por par (base, comparado) con las categorías comparables, subidas, bajadas y cambio medio."""
+    absolutas, _ = todas(alineado)
+    m = alineado.matriz
+    validas = ~np.isnan(absolutas) & (m[:, :, None] != 0)
+    filas = []
+    n = len(alineado.nombres)
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
+            d = absolutas[:, i, j][validas[:, i, j]]
+            filas.append((alineado.nombres[i], alineado.nombres[j], len(d), int((d > 0).sum()), int((d < 0).sum()),
+                          d.mean() if len(d) else np.nan))
+    return pd.DataFrame(filas, columns=["Base", "Comparado", "Categorías", "Subidas", "Bajadas", "Cambio medio"])
+
+
+def par(alineado, i, j):
+    """
+    Tabla del par base i -> comparado j con la forma de siempre: categoría, los dos
+    valores, Diferencia y Diferencia % (más Nivel si los ficheros lo traen). Solo
+    categorías presentes en ambos y con base distinta de 0.
+    """
+    base, comparado = alineado.matriz[:, i], alineado.matriz[:, j]
+    validas = ~np.isnan(base) & ~np.isnan(comparado) & (base != 0)
+    base, comparado = base[validas], comparado[validas]
+    diferencia = comparado - base
+    tabla = pd.DataFrame({
+        alineado.categoria: alineado.categorias[validas],
+        f"{alineado.valor}_{alineado.nombres[i]}": base,
+        f"{alineado.valor}_{alineado.nombres[j]}": comparado,
+        "Diferencia": diferencia,
+        "Diferencia %": diferencia / base * 100,
+    })
+    if alineado.niveles is not None:
+        tabla["Nivel"] = alineado.niveles[validas]
+    return tabla
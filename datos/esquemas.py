@@ -0,0 +1,142 @@
+"""
+Registro de esquemas de los CSV: separador, codificación, columnas y tipos.
+
+La primera vez que se lee un fichero se detectan su separador y codificación y
+los tipos que infiere pandas, y se anotan en un .esquemas.json en la misma
+carpeta (por nombre, con su mtime y tamaño). Las lecturas siguientes pasan el
+separador y la codificación explícitos a pd.read_csv sin abrir antes el fichero.
+
+Los tipos no se pasan como dtype=: con el parser de C de pandas fijarlos por
+columna es más lento que dejar que los infiera. Sirven para el modo compacto, que
+convierte tras leer: métricas en float32, Nivel en Int8 y Alimentos/Hoja como category.
+"""
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from datos import compacto
+
+FICHERO_ESQUEMAS = ".esquemas.json"
+COLUMNA_NIVEL = "Nivel"
+# Texto repetido fila a fila; el resto de columnas de texto se dejan como están
+COLUMNAS_CATEGORIA = ["Alimentos", "Hoja"]
+
+# tipos: {columna: dtype inferido por pandas}; nivel_entero: Nivel sin decimales (cabe en Int8)
+Esquema = namedtuple("Esquema", ["sep", "encoding", "columnas", "tipos", "nivel_entero"])
+
+_lock = threading.Lock()
+_registros = {}  # carpeta -> {nombre: entrada}
+
+
+def detectar_codificacion(path, encoding="utf-8-sig"):
+    # Los CSV del panel son utf-8 con BOM; los subidos a mano pueden venir en latin-1
+    with open(path, "rb") as f:
+        muestra = f.read(64 * 1024)
+    try:
+        muestra.decode(encoding)
+        return encoding
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final de la muestra no cuenta como error
+        if e.start >= len(muestra) - 3:
+            return encoding
+        return "latin-1"
+
+
+def _registro(carpeta):
+    # Se llama con _lock tomado
+    if carpeta not in _registros:
+        ruta = os.path.join(carpeta, FICHERO_ESQUEMAS)
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                _registros[carpeta] = json.load(f)
+        except (OSError, ValueError):
+            _registros[carpeta] = {}
+    return _registros[carpeta]
+
+
+def _guardar(carpeta, registro):
+    ruta = os.path.join(carpeta, FICHERO_ESQUEMAS)
+    try:
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(registro, f, ensure_ascii=False)
+        os.replace(ruta + ".tmp", ruta)
+    except OSError:
+        pass  # carpeta de solo lectura: el registro queda solo en memoria
+
+
+def _entrada_vigente(entrada, st):
+    return entrada is not None and entrada["tamano"] == st.st_size and entrada["mtime"] == st.st_mtime_ns
+
+
+def _a_esquema(entrada):
+    return Esquema(entrada["sep"], entrada["encoding"], entrada["columnas"], entrada["tipos"], entrada["nivel_entero"])
+
+
+def consultar(path):
+    """Esquema registrado del fichero, o None si no lo está o ha cambiado desde entonces."""
+    carpeta, nombre = os.path.split(os.path.abspath(path))
+    st = os.stat(path)
+    with _lock:
+        entrada = _registro(carpeta).get(nombre)
+    return _a_esquema(entrada) if _entrada_vigente(entrada, st) else None
+
+
+def registrar(path, df, sep, encoding):
+    """Anota el esquema de un fichero a partir del DataFrame leído con inferencia normal."""
+    carpeta, nombre = os.path.split(os.path.abspath(path))
+    st = os.stat(path)
+    nivel = df[COLUMNA_NIVEL] if COLUMNA_NIVEL in df.columns else None
+    nivel_entero = bool(nivel is not None and pd.api.types.is_numeric_dtype(nivel)
+                        and ((nivel.dropna() % 1) == 0).all() and nivel.dropna().between(-128, 127).all())
+    entrada = {
+        "tamano": st.st_size, "mtime": st.st_mtime_ns, "sep": sep, "encoding": encoding,
+        "columnas": [str(c) for c in df.columns],
+        "tipos": {str(c): str(t) for c, t in df.dtypes.items()},
+        "nivel_entero": nivel_entero,
+    }
+    with _lock:
+        registro = _registro(carpeta)
+        registro[nombre] = entrada
+        _guardar(carpeta, registro)
+    return _a_esquema(entrada)
+
+
+def dtypes(esquema, compacto=False):
+    """{columna: dtype} del modo indicado (en modo normal, los inferidos por pandas)."""
+    if not compacto:
+        return dict(esquema.tipos)
+    tipos = {}
+    for col, tipo in esquema.tipos.items():
+        if col == COLUMNA_NIVEL and esquema.nivel_entero:
+            tipos[col] = "Int8"
+        elif tipo.startswith(("float", "int")):
+            tipos[col] = "float32"
+        elif col in COLUMNAS_CATEGORIA:
+            tipos[col] = "category"
+    return tipos
+
+
+def compactar(df, esquema):
+    """Convierte un DataFrame leído con el esquema a los tipos compactos."""
+    # Se construye cada columna desde numpy: Series.astype cuesta más que la propia conversión
+    columnas = {}
+    for col, tipo in dtypes(esquema, compacto=True).items():
+        if col not in df.columns:
+            continue
+        if tipo == "float32":
+            columnas[col] = df[col].to_numpy(np.float32)
+        elif tipo == "Int8":
+            columnas[col] = pd.array(df[col].to_numpy(), dtype="Int8")
+        else:
+            # Contra el diccionario global: los trozos de ficheros distintos se concatenan como category
+            columnas[col] = compacto.categorizar(df[col], col)
+    return df.assign(**columnas) if columnas else df
+
+
+def limpiar_cache():
+    with _lock:
+        _registros.clear()
@@ -0,0 +1,147 @@
+"""
+Exportación de tablas a CSV, Excel y ZIP, generada solo cuando se pide.
+
+Los botones de descarga reciben diferido(...), un callable que Streamlit ejecuta
+al pulsar el botón: ningún rerun construye ficheros que nadie descarga. Lo
+generado se guarda por huella de los datos, así que volver a pedir la misma tabla
+no la reescribe. El Excel se escribe fila a fila con xlsxwriter en modo
+constant_memory, y varias tablas pueden ir en una sola pasada a un libro (una hoja
+por tabla) o a un ZIP (un CSV por tabla):
+
+    st.download_button("📥 Excel", data=exportar.diferido(exportar.excel, {"YTD": df_ytd, "TAM": df_tam}),
+                       file_name="resultados.xlsx", mime=exportar.MIME["xlsx"])
+"""
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+import xlsxwriter
+
+from datos.graficos import huella
+
+MIME = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "zip": "application/zip",
+}
+
+# Presupuesto de memoria de la caché de exportaciones (MB), configurable por variable de entorno
+LIMITE_EXPORTACIONES_MB = int(os.environ.get("PANEL_EXPORTACIONES_MB", "128"))
+
+_cache = OrderedDict()
+_bytes_en_cache = 0
+_lock = threading.Lock()
+
+
+def _cacheado(tipo, generar, *args):
+    global _bytes_en_cache
+    # Las tablas van como lista de pares: huella() ordena las claves de un dict y aquí el orden importa
+    clave = (tipo, huella(*(list(a.items()) if isinstance(a, dict) else a for a in args)))
+    with _lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+    datos = generar(*args)
+    limite = LIMITE_EXPORTACIONES_MB * 1024 * 1024
+    with _lock:
+        if len(datos) <= limite and clave not in _cache:
+            _cache[clave] = datos
+            _bytes_en_cache += len(datos)
+            while _bytes_en_cache > limite:
+                _, expulsado = _cache.popitem(last=False)
+                _bytes_en_cache -= len(expulsado)
+    return datos
+
+
+def _tablas(tablas, nombre):
+    # Un DataFrame suelto es una sola tabla con el nombre por defecto
+    return {nombre: tablas} if isinstance(tablas, pd.DataFrame) else tablas
+
+
+def _csv(df, index):
+    return df.to_csv(index=index).encode("utf-8")
+
+
+def csv(df, index=False):
+    """Bytes CSV (UTF-8) de `df`."""
+    return _cacheado("csv", _csv, df, index)
+
+
+def _nombre_hoja(nombre, usados):
+    # Excel: 31 caracteres como mucho, sin []:*?/\ y sin repetir
+    base = re.sub(r"[\[\]:*?/\\]", "_", str(nombre))[:31] or "Hoja"
+    nombre, n = base, 1
+    while nombre.lower() in usados:
+        n += 1
+        nombre = f"{base[:31 - len(str(n)) - 1]}_{n}"
+    usados.add(nombre.lower())
+    return nombre
+
+
+def _celdas(serie):
+    # Valores nativos de Python por columna; los NaN quedan como celda vacía
+    if pd.api.types.is_bool_dtype(serie) or (pd.api.types.is_integer_dtype(serie) and not serie.hasnans):
+        return serie.tolist()
+    if pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+        return [None if v != v else v for v in serie.astype("float64").tolist()]
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def _excel(tablas, index):
+    salida = io.BytesIO()
+    # constant_memory: cada fila se vuelca al terminarla, así que se escribe estrictamente por filas
+    libro = xlsxwriter.Workbook(salida, {"constant_memory": True, "nan_inf_to_errors": True})
+    cabecera = libro.add_format({"bold": True, "border": 1, "align": "center"})
+    usados = set()
+    for nombre, df in tablas.items():
+        if index:
+            df = df.reset_index()
+        hoja = libro.add_worksheet(_nombre_hoja(nombre, usados))
+        hoja.write_row(0, 0, [str(c) for c in df.columns], cabecera)
+        columnas = [_celdas(df.iloc[:, i]) for i in range(df.shape[1])]
+        for fila, valores in enumerate(zip(*columnas), start=1):
+            hoja.write_row(fila, 0, valores)
+    libro.close()
+    return salida.getvalue()
+
+
+def excel(tablas, index=False):
+    """Bytes .xlsx con una hoja por tabla (`tablas`: DataFrame o {nombre de hoja: DataFrame})."""
+    return _cacheado("xlsx", _excel, _tablas(tablas, "Datos"), index)
+
+
+def _zip(tablas, index):
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, df in tablas.items():
+            # Cada CSV se escribe directamente en su entrada del ZIP
+            with archivo.open(f"{nombre}.csv", "w") as entrada, \
+                    io.TextIOWrapper(entrada, encoding="utf-8", newline="") as texto:
+                df.to_csv(texto, index=index)
+    return salida.getvalue()
+
+
+def comprimir(tablas, index=False):
+    """Bytes .zip con un CSV por tabla (`tablas`: {nombre de fichero sin extensión: DataFrame})."""
+    return _cacheado("zip", _zip, _tablas(tablas, "datos"), index)
+
+
+def diferido(exportar, *args, **kwargs):
+    """Callable sin argumentos para st.download_button(data=...): genera el fichero al pulsar."""
+    return lambda: exportar(*args, **kwargs)
+
+
+def limpiar_cache():
+    global _bytes_en_cache
+    with _lock:
+        _cache.clear()
+        _bytes_en_cache = 0
+
+
+def estadisticas_cache():
+    with _lock:
+        return {"ficheros": len(_cache), "mb": round(_bytes_en_cache / 1024 / 1024, 1)}
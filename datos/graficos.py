@@ -0,0 +1,115 @@
+"""
+Caché de gráficos matplotlib/seaborn ya renderizados.
+
+Cada gráfico se describe con una función que lo dibuja y devuelve la Figure, más
+sus argumentos (DataFrames, columnas, títulos...). La clave es la función (fichero
+y nombre) y una huella de los argumentos: los DataFrames se resumen con
+hash_pandas_object, así que volver al mismo alimento o cambiar de pestaña no
+vuelve a dibujar nada. Lo que se guarda son los bytes PNG/SVG, que sirven tanto
+para mostrar (st.image) como para el botón de descarga, y la Figure se cierra en
+cuanto se renderiza para que no se acumulen en el estado global de pyplot.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+# Presupuesto de memoria de la caché de gráficos (MB), configurable por variable de entorno
+LIMITE_GRAFICOS_MB = int(os.environ.get("PANEL_GRAFICOS_MB", "64"))
+# Los mismos ajustes que usa st.pyplot al convertir la figura
+DPI = 200
+
+_cache = OrderedDict()
+_bytes_en_cache = 0
+_lock = threading.Lock()
+_estadisticas = {"aciertos": 0, "fallos": 0}
+
+
+def _huella_objeto(h, obj):
+    if isinstance(obj, pd.DataFrame):
+        h.update(repr(("DataFrame", list(obj.columns), list(obj.dtypes), obj.shape)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(repr(("Series", obj.name, obj.dtype, obj.shape)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for o in obj:
+            _huella_objeto(h, o)
+    elif isinstance(obj, dict):
+        for k in sorted(obj, key=repr):
+            h.update(repr(k).encode())
+            _huella_objeto(h, obj[k])
+    else:
+        h.update(repr(obj).encode())
+    h.update(b"|")
+
+
+def huella(*objetos):
+    """Resumen estable de DataFrames, Series y valores simples (para usar en claves)."""
+    h = hashlib.blake2b(digest_size=16)
+    for obj in objetos:
+        _huella_objeto(h, obj)
+    return h.hexdigest()
+
+
+def _guardar(clave, datos):
+    global _bytes_en_cache
+    limite = LIMITE_GRAFICOS_MB * 1024 * 1024
+    if len(datos) > limite:
+        return
+    _cache[clave] = datos
+    _bytes_en_cache += len(datos)
+    while _bytes_en_cache > limite:
+        _, expulsado = _cache.popitem(last=False)
+        _bytes_en_cache -= len(expulsado)
+
+
+def renderizar(dibujar, *args, formato="png", **kwargs):
+    """
+    Bytes del gráfico que dibuja dibujar(*args, **kwargs) en `formato` ("png" o "svg").
+    Solo se llama a dibujar() si no está en caché; la Figure se cierra al terminar.
+    """
+    clave = (dibujar.__code__.co_filename, dibujar.__qualname__, formato, huella(args, kwargs))
+    with _lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            _estadisticas["aciertos"] += 1
+            return _cache[clave]
+
+    fig = dibujar(*args, **kwargs)
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=formato, dpi=DPI, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    datos = buf.getvalue()
+
+    with _lock:
+        _estadisticas["fallos"] += 1
+        _guardar(clave, datos)
+    return datos
+
+
+def png(dibujar, *args, **kwargs):
+    return renderizar(dibujar, *args, formato="png", **kwargs)
+
+
+def svg(dibujar, *args, **kwargs):
+    return renderizar(dibujar, *args, formato="svg", **kwargs)
+
+
+def limpiar_cache():
+    global _bytes_en_cache
+    with _lock:
+        _cache.clear()
+        _bytes_en_cache = 0
+
+
+def estadisticas_cache():
+    with _lock:
+        return dict(_estadisticas, graficos=len(_cache), mb=round(_bytes_en_cache / 1024 / 1024, 1))
@@ -0,0 +1,86 @@
+"""
+Informe de memoria de una página: lo que ocupan sus DataFrames y las cachés
+compartidas del proceso (CSV, cubo, gráficos, exportaciones), más el pico de
+memoria del proceso cuando el sistema lo expone. Sirve para comprobar que un
+worker de Streamlit con el panel completo cargado cabe en el límite del contenedor.
+"""
+import sys
+
+import pandas as pd
+
+from datos import carga, compacto, cubo, exportar, graficos
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+
+
+def _tamano_columna(serie):
+    # De una categórica solo se cuentan los códigos: las categorías son el diccionario
+    # global de datos.compacto, compartido por todos los DataFrames y contado aparte
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return int(serie.cat.codes.nbytes)
+    return int(serie.memory_usage(index=False, deep=True))
+
+
+def tamano(obj):
+    """Bytes de un DataFrame/Series (con los textos) o de una lista/dict de ellos."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.index.memory_usage(deep=True)) + sum(_tamano_columna(obj[c]) for c in obj.columns)
+    if isinstance(obj, pd.Series):
+        return int(obj.index.memory_usage(deep=True)) + _tamano_columna(obj)
+    if isinstance(obj, dict):
+        return sum(tamano(o) for o in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(tamano(o) for o in obj)
+    return 0
+
+
+def _filas(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(_filas(o) for o in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_filas(o) for o in obj)
+    return 0
+
+
+def pico_proceso():
+    """Pico de memoria residente del proceso en bytes, o None si no se puede saber."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024  # en Linux viene en KB
+
+
+def informe(objetos):
+    """
+    DataFrame Objeto / Filas / MB con los `objetos` de la página ({nombre: DataFrame,
+    lista o dict de DataFrames}) seguidos de las cachés compartidas del proceso.
+    """
+    filas = [(nombre, _filas(obj), tamano(obj) / MB) for nombre, obj in objetos.items()]
+    cache_csv = carga.estadisticas_cache()
+    filas.append(("Caché de CSV (proceso)", cache_csv["ficheros"], cache_csv["mb"]))
+    cache_graficos = graficos.estadisticas_cache()
+    filas.append(("Gráficos renderizados (proceso)", cache_graficos["graficos"], cache_graficos["mb"]))
+    cache_exportaciones = exportar.estadisticas_cache()
+    filas.append(("Exportaciones (proceso)", cache_exportaciones["ficheros"], cache_exportaciones["mb"]))
+    filas.append(("Cubo del panel (proceso)", None, cubo.memoria() / MB))
+    filas.append(("Diccionarios de categorías (proceso)", None, compacto.memoria() / MB))
+    pico = pico_proceso()
+    if pico is not None:
+        filas.append(("Pico del proceso", None, pico / MB))
+    df = pd.DataFrame(filas, columns=["Objeto", "Filas", "MB"])
+    df["MB"] = df["MB"].round(1)
+    return df
+
+
+def mostrar(st, objetos):
+    """Pinta el informe en un expander plegado al final de la página."""
+    with st.expander("🧠 Memoria de la página"):
+        st.caption("Tipos compactos activados (PANEL_COMPACTO=1)" if compacto.ACTIVO else "Tipos compactos desactivados")
+        st.dataframe(informe(objetos), hide_index=True)
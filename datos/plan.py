@@ -0,0 +1,107 @@
+"""
+Planificador de la carga de una selección de meses y regiones/categorías.
+
+Antes de leer nada se resuelve, con el catálogo de CSV, qué (año, mes, segmento)
+hacen falta y de dónde sale cada uno: del cubo compartido, de la partición del
+almacén o del CSV. Después cargar_plan() lee cada origen una sola vez (un único
+recorte del cubo para toda la selección, una lectura por partición) en vez de una
+lectura por región y mes.
+"""
+from collections import namedtuple
+
+import pandas as pd
+
+from datos import almacen, carga, catalogo, compacto, cubo
+
+# segmentos: {segmento: ruta del CSV}; origen: "cubo", "almacen" o "csv"
+Parte = namedtuple("Parte", ["fuente", "anio", "mes", "segmentos", "origen"])
+
+def planificar(fuente, seleccion, carpeta=almacen.CSV_MENSUAL, origen=almacen.ALMACEN_MENSUAL):
+    """
+    `seleccion` es {(año, mes): [segmentos]}. Devuelve una Parte por (año, mes) con
+    los segmentos que existen y el origen desde el que se leerán.
+    """
+    csv = catalogo.rutas(fuente, carpeta)
+    en_cubo = cubo.contiene(fuente, origen)
+    plan = []
+    for (anio, mes), segmentos in seleccion.items():
+        rutas = {s: csv[(anio, mes.lower(), s)] for s in segmentos if (anio, mes.lower(), s) in csv}
+        if not rutas:
+            continue
+        if almacen.existe_particion(fuente, anio, mes, origen):
+            tipo = "cubo" if en_cubo else "almacen"
+        else:
+            tipo = "csv"
+        plan.append(Parte(fuente, anio, mes, rutas, tipo))
+    return plan
+
+
+def _segmentos_de(df, parte):
+    # {segmento: df con la forma del CSV}, como almacen.segmento() pero en una sola pasada:
+    # las filas y las columnas con datos de cada segmento se calculan para todos a la vez
+    segmentos = df[almacen.COLUMNA_SEGMENTO].astype(object).to_numpy()
+    resto = df.drop(columns=[almacen.COLUMNA_SEGMENTO])
+    con_datos = resto.notna().groupby(segmentos, sort=False).any()
+    filas = pd.Series(segmentos).groupby(segmentos, sort=False).indices
+    resultado = {}
+    for s in parte.segmentos:
+        if s in filas:
+            columnas = resto.columns[con_datos.loc[s].to_numpy()]
+            resultado[s] = resto.iloc[filas[s]][columnas].reset_index(drop=True)
+        else:
+            resultado[s] = resto.iloc[:0, :0]
+    return resultado
+
+
+def _anotar(errores, claves, error):
+    if errores is None:
+        raise error
+    errores.update(dict.fromkeys(claves, error))
+
+
+def cargar_plan(plan, origen=almacen.ALMACEN_MENSUAL, errores=None, compactar_tipos=False):
+    """
+    Ejecuta el plan y devuelve {(año, mes, segmento): DataFrame con la forma del CSV}.
+    Si se pasa el dict `errores`, los fallos de lectura se anotan ahí por clave en
+    lugar de interrumpir la carga del resto. Con `compactar_tipos` los DataFrames vienen
+    con los tipos de datos.compacto sea cual sea su origen.
+    """
+    datos = {}
+
+    # Todo lo que viene del cubo sale de un único recorte
+    partes_cubo = [p for p in plan if p.origen == "cubo"]
+    if partes_cubo:
+        largo = cubo.cortar(partes_cubo[0].fuente,
+                            anios={p.anio for p in partes_cubo},
+                            meses={p.mes for p in partes_cubo},
+                            segmentos={s for p in partes_cubo for s in p.segmentos},
+                            origen=origen)
+        ancho = cubo.a_ancho(largo)
+        grupos = dict(tuple(ancho.groupby(["Año", "Mes"], sort=False)))
+        for p in partes_cubo:
+            df_mes = grupos.get((str(p.anio), p.mes.lower()), ancho.iloc[:0])
+            for s, df in _segmentos_de(df_mes.drop(columns=["Fuente", "Año", "Mes"]), p).items():
+                datos[(p.anio, p.mes, s)] = compacto.compactar(df) if compactar_tipos else df
+
+    for p in (p for p in plan if p.origen == "almacen"):
+        try:
+            df_mes = almacen.leer_mes(p.fuente, p.anio, p.mes, segmentos=list(p.segmentos), origen=origen)
+        except Exception as e:
+            _anotar(errores, [(p.anio, p.mes, s) for s in p.segmentos], e)
+            continue
+        for s, df in _segmentos_de(df_mes, p).items():
+            datos[(p.anio, p.mes, s)] = compacto.compactar(df) if compactar_tipos else df
+
+    for p in (p for p in plan if p.origen == "csv"):
+        for s, ruta in p.segmentos.items():
+            try:
+                datos[(p.anio, p.mes, s)] = carga.leer_csv(ruta, compacto=compactar_tipos)
+            except Exception as e:
+                _anotar(errores, [(p.anio, p.mes, s)], e)
+    return datos
+
+
+def concatenar(frames):
+    """Concatena una sola vez los trozos acumulados (pd.DataFrame() si no hay ninguno)."""
+    frames = [f for f in frames if not f.empty]
+    return compacto.concatenar(frames) if frames else pd.DataFrame()
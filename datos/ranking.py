@@ -0,0 +1,65 @@
+"""
+Selección de los k mayores sin ordenar todo el array.
+
+np.partition encuentra en O(n) el k-ésimo mayor, que hace de umbral: entran los
+que lo superan y, de los que lo igualan, los de posición más baja hasta completar
+k. Solo esos k se ordenan. Así los empates se resuelven siempre a favor de la
+posición más baja (como un sort estable o idxmax) y el resultado no cambia de un
+rerun a otro. Los NaN nunca entran en el ranking.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _claves(valores, por_magnitud, mayores):
+    # Se rankea siempre "de mayor a menor" sobre una clave; los NaN pasan a -inf
+    clave = np.asarray(valores, dtype=np.float64)
+    if por_magnitud:
+        clave = np.abs(clave)
+    elif not mayores:
+        clave = -clave
+    return np.where(np.isnan(clave), -np.inf, clave), ~np.isnan(clave)
+
+
+def _top(clave, validos, k):
+    n = int(validos.sum())
+    k = min(k, n)
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    if k < len(clave):
+        # Umbral: el k-ésimo mayor. Entran todos los que lo superan y, de los que lo
+        # igualan, los de posición más baja hasta completar k
+        umbral = -np.partition(-clave, k - 1)[k - 1]
+        por_encima = np.flatnonzero(clave > umbral)
+        iguales = np.flatnonzero((clave == umbral) & validos)[:k - len(por_encima)]
+        candidatos = np.concatenate([por_encima, iguales])
+        candidatos.sort()
+    else:
+        candidatos = np.flatnonzero(validos)
+    return candidatos[np.argsort(-clave[candidatos], kind="stable")]
+
+
+def top_k(valores, k, por_magnitud=False, mayores=True, grupos=None):
+    """
+    Posiciones de los k primeros de `valores`, ya ordenadas:
+        por_magnitud: rankea por valor absoluto (p. ej. diferencias que suben o bajan)
+        mayores:      False para los k menores
+        grupos:       array de la misma longitud (p. ej. Nivel); devuelve los k primeros
+                      de cada grupo, con los grupos en orden ascendente
+    """
+    clave, validos = _claves(valores, por_magnitud, mayores)
+    if grupos is None:
+        return _top(clave, validos, k)
+    codigos, etiquetas = pd.factorize(pd.Series(grupos), sort=True)
+    partes = []
+    for codigo in range(len(etiquetas)):
+        posiciones = np.flatnonzero(codigos == codigo)
+        partes.append(posiciones[_top(clave[posiciones], validos[posiciones], k)])
+    return np.concatenate(partes) if partes else np.array([], dtype=np.intp)
+
+
+def extremos(valores):
+    """(posición del máximo, posición del mínimo), la primera en caso de empate; None si todo es NaN."""
+    maximo = top_k(valores, 1)
+    minimo = top_k(valores, 1, mayores=False)
+    return (int(maximo[0]) if len(maximo) else None, int(minimo[0]) if len(minimo) else None)
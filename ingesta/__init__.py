@@ -0,0 +1 @@
+"""Exportación de los Excel del panel de consumo (mensuales y anuales) a CSV."""
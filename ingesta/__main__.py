@@ -0,0 +1,36 @@
+"""
+Uso:
+    python -m ingesta                 # mensuales y anuales
+    python -m ingesta --solo mensuales --workers 4
+    python -m ingesta --forzar        # reprocesa aunque los libros no hayan cambiado
+"""
+import argparse
+
+from datos.almacen import ALMACEN_MENSUAL
+from ingesta.pipeline import procesar_anuales, procesar_mensuales
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ingesta", description="Exporta los Excel del panel de consumo a CSV.")
+    parser.add_argument("--solo", choices=["mensuales", "anuales"], help="Procesar solo un tipo de libro")
+    parser.add_argument("--entrada-mensual", default="Excel Mensuales")
+    parser.add_argument("--salida-mensual", default="CSV_Mensuales")
+    parser.add_argument("--entrada-anual", default="Excels Anuales")
+    parser.add_argument("--salida-anual", default="CSV_Anuales")
+    parser.add_argument("--almacen", default=ALMACEN_MENSUAL, help="Carpeta del almacén Parquet ('' para no generarlo)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--forzar", action="store_true", help="Ignorar el manifiesto y reprocesar todos los libros")
+    args = parser.parse_args(argv)
+
+    if args.solo in (None, "mensuales"):
+        print("=== INICIANDO PROCESAMIENTO DE MENSUALES ===")
+        procesar_mensuales(args.entrada_mensual, args.salida_mensual, args.almacen or None,
+                           max_workers=args.workers, forzar=args.forzar)
+
+    if args.solo in (None, "anuales"):
+        print("\n=== INICIANDO PROCESAMIENTO DE ANUALES ===")
+        procesar_anuales(args.entrada_anual, args.salida_anual, max_workers=args.workers, forzar=args.forzar)
+
+
+if __name__ == "__main__":
+    main()
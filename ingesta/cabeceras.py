@@ -0,0 +1,142 @@
+"""
+Detección de cabeceras y bloques de datos en las hojas del panel.
+
+Las hojas de un mismo libro (una por mes) comparten la misma disposición, así
+que la detección trabaja solo sobre las primeras filas convertidas una vez a una
+matriz de texto, con los patrones ya compilados, y devuelve un EsquemaBloques
+que se guarda en caché por disposición y se reutiliza en el resto de meses.
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+FILAS_CABECERA = 30
+MAX_ESQUEMAS = 64
+
+PATRON_TESPANA = re.compile(r'T\.?\s*ESPAÑA', re.IGNORECASE)
+PATRON_TIPOS_DATO = re.compile(r'PENETRACION|VALOR|VOLUMEN|PRECIO|CONSUMO\s*PER\s*C.A?PITA|GASTO\s*PER\s*C.A?PITA', re.IGNORECASE)
+PATRON_CABECERA = re.compile('|'.join([
+    r't\.?\s*españa',
+    r'penetraci[oó]n\s*\(%\)',
+    r'precio\s*medio',
+    r'valor\s*\(.*euros\)',
+    r'volumen\s*\(.*kg.*litros\)',
+    r'consumo\s*per\s*c[aá]pita',
+    r'gasto\s*per\s*c[aá]pita',
+    r'canales?\s*de\s*distribuci[oó]n',
+    r'socio.*econ[oó]mico'
+]), re.IGNORECASE)
+
+# encabezados_idx: fila de cabeceras de columna; tipos_dato_idx: fila con PENETRACION/VALOR/...
+# bloques: [(tipo, col_inicio, col_fin)]; con_tespana: si se encontró la fila T.ESPAÑA
+EsquemaBloques = namedtuple("EsquemaBloques", ["encabezados_idx", "tipos_dato_idx", "encabezados", "bloques", "con_tespana"])
+
+_cache_esquemas = {}
+
+
+def matriz_texto(df):
+    """Celdas del DataFrame como matriz de texto ('' para vacíos)."""
+    return df.fillna('').astype(str).to_numpy()
+
+
+def filas_que_contienen(matriz, patron):
+    """Índices de las filas con alguna celda que cumple el patrón (una sola pasada vectorizada)."""
+    if matriz.size == 0:
+        return np.array([], dtype=int)
+    coincide = pd.Series(matriz.ravel()).str.contains(patron, regex=True).to_numpy()
+    return np.flatnonzero(coincide.reshape(matriz.shape).any(axis=1))
+
+
+def contiene_cabecera_reconocida(df_sample):
+    return len(filas_que_contienen(matriz_texto(df_sample), PATRON_CABECERA)) > 0
+
+
+def _bloques_desde_tipos(tipos_dato):
+    bloques = []
+    current_tipo = None
+    start_col = None
+    for i, tipo in enumerate(tipos_dato):
+        tipo = tipo.strip().upper()
+        if "PENETRACION" in tipo:
+            nuevo = "PENETRACION"
+        elif "PRECIO MEDIO" in tipo:
+            nuevo = "PRECIO_MEDIO"
+        elif "VALOR" in tipo and "MILES" in tipo:
+            nuevo = "VALOR"
+        elif "VOLUMEN" in tipo and "MILES" in tipo:
+            nuevo = "VOLUMEN"
+        else:
+            continue
+        if current_tipo is not None:
+            bloques.append((current_tipo, start_col, i))
+        current_tipo = nuevo
+        start_col = i
+    if current_tipo is not None:
+        bloques.append((current_tipo, start_col, len(tipos_dato)))
+    return bloques
+
+
+def _detectar(df, superior):
+    filas_tespana = filas_que_contienen(superior, PATRON_TESPANA)
+    con_tespana = len(filas_tespana) > 0
+    if not con_tespana and len(df) > len(superior):
+        # T.ESPAÑA más abajo de lo habitual: se busca en el resto de la hoja
+        filas_tespana = filas_que_contienen(matriz_texto(df.iloc[len(superior):]), PATRON_TESPANA) + len(superior)
+        con_tespana = len(filas_tespana) > 0
+
+    if not con_tespana:
+        # Buscamos en las primeras 20 filas la de tipos de dato; la siguiente es la de encabezados
+        candidatas = filas_que_contienen(superior[:20], PATRON_TIPOS_DATO)
+        if len(candidatas) == 0:
+            return EsquemaBloques(None, None, None, [], False)
+        tipos_dato_idx = int(candidatas[0])
+        encabezados = df.iloc[tipos_dato_idx].fillna('').astype(str).tolist()
+        tipos_dato = encabezados
+        encabezados_idx = tipos_dato_idx + 1
+    else:
+        encabezados_idx = int(filas_tespana[0])
+        # La fila de tipos de dato es la más cercana por encima, como mucho 9 filas
+        desde = max(encabezados_idx - 9, 0)
+        candidatas = filas_que_contienen(matriz_texto(df.iloc[desde:encabezados_idx]), PATRON_TIPOS_DATO)
+        if len(candidatas) == 0:
+            return EsquemaBloques(encabezados_idx, None, None, [], True)
+        tipos_dato_idx = desde + int(candidatas[-1])
+        encabezados = df.iloc[encabezados_idx].fillna('').astype(str).tolist()
+        tipos_dato = df.iloc[tipos_dato_idx].fillna('').astype(str).tolist()
+
+    return EsquemaBloques(encabezados_idx, tipos_dato_idx, encabezados, _bloques_desde_tipos(tipos_dato), con_tespana)
+
+
+def _firma(filas):
+    return hashlib.sha1("\x1f".join(filas.ravel()).encode("utf-8")).hexdigest()
+
+
+def detectar_esquema(df, n_filas=FILAS_CABECERA):
+    """
+    Devuelve el EsquemaBloques de una hoja leída con header=None. Si tipos_dato_idx
+    es None no se pudo localizar la fila de tipos de dato.
+    """
+    superior = matriz_texto(df.iloc[:n_filas])
+
+    # Si las filas de cabecera coinciden con las de una hoja ya vista, se reutiliza su esquema
+    firmas = {}
+    for (n_columnas, n_cabecera, firma), esquema in _cache_esquemas.items():
+        if n_columnas != df.shape[1] or n_cabecera > len(superior):
+            continue
+        if n_cabecera not in firmas:
+            firmas[n_cabecera] = _firma(superior[:n_cabecera])
+        if firmas[n_cabecera] == firma:
+            return esquema
+
+    esquema = _detectar(df, superior)
+    # Solo se guarda si el esquema depende únicamente de las filas hasta la cabecera
+    # (sin T.ESPAÑA habría que revisar la hoja entera para saber que sigue sin estar)
+    if esquema.con_tespana and esquema.tipos_dato_idx is not None and esquema.encabezados_idx < len(superior):
+        n_cabecera = esquema.encabezados_idx + 1
+        if len(_cache_esquemas) >= MAX_ESQUEMAS:
+            _cache_esquemas.pop(next(iter(_cache_esquemas)))
+        _cache_esquemas[(df.shape[1], n_cabecera, _firma(superior[:n_cabecera]))] = esquema
+    return esquema
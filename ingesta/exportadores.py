@@ -0,0 +1,344 @@
+"""
+Exportadores de los Excel del panel de consumo a CSV (y al almacén Parquet).
+
+Extraídos de Crear_CSV.ipynb. Cada función procesar_libro_* trabaja sobre un
+único libro ya leído en memoria, de modo que el pipeline puede repartir los
+libros entre varios procesos.
+"""
+import io
+import os
+import re
+import pandas as pd
+
+from datos.almacen import EscritorAlmacen
+from ingesta.cabeceras import detectar_esquema
+from ingesta.limpieza import añadir_niveles, indice_niveles, quitar_espacios
+from ingesta.niveles import extraer_niveles_desde_excel
+
+PORTADA_KEYWORDS = ["portada", "inicio", "presentación", "resumen", "lista canales"]
+
+# ------------------- FUNCIONES GENERALES -------------------
+
+def guardar_csv(df, output_path):
+    # Escritura atómica: un lector nunca ve un CSV a medio escribir
+    ruta_tmp = output_path + ".tmp"
+    df.to_csv(ruta_tmp, index=False, sep=';', encoding='utf-8-sig')
+    os.replace(ruta_tmp, output_path)
+    return output_path
+
+def limpiar_nombre(nombre):
+    return re.sub(r'[^\w\s-]', '', str(nombre)).strip().replace(' ', '_').upper()
+
+def detectar_fuente_datos(nombre_archivo):
+    nombre = nombre_archivo.lower()
+    if "ccaa" in nombre:
+        return "CCAA"
+    elif "canales" in nombre:
+        return "CANAL"
+    elif "sociodem" in nombre:
+        return "SOCIODEM"
+    else:
+        return "GENERAL"
+
+# ------------------- FUNCIONES PARA MENSUALES -------------------
+
+def procesar_sociodem_por_hoja(excel_data, output_folder, year, niveles_df=None, almacen=None):
+    # Acepta la ruta o un pd.ExcelFile ya abierto: el libro se abre una sola vez para las 12 hojas
+    xls = excel_data if isinstance(excel_data, pd.ExcelFile) else pd.ExcelFile(excel_data)
+    salidas = []
+    niveles = indice_niveles(niveles_df)
+    hojas = [h for h in xls.sheet_names if h.lower() in
+             ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
+              'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']]
+    if not hojas:
+        print(f"  ⚠ No se encontraron hojas de meses válidas en {year}")
+        return salidas
+
+    for hoja in hojas:
+        print(f"  📄 Procesando hoja: {hoja}")
+        df = xls.parse(hoja, header=None)
+        df = quitar_espacios(df)
+
+        fila_header = 3
+        cols_tespana = df.iloc[fila_header - 1].astype(str).str.upper().str.strip()
+        cols_tespana_idx = cols_tespana[cols_tespana == 'T.ESPAÑA'].index.tolist()
+
+        if len(cols_tespana_idx) < 2:
+            print(f"    ⚠ No se encontraron al menos dos columnas con 'T.ESPAÑA' en hoja {hoja}")
+            continue
+
+        cols_tespana_idx.append(df.shape[1])
+        primera_columna = df.iloc[fila_header - 1:, 0].reset_index(drop=True)
+        nombre_primera_col = df.iloc[fila_header - 1, 0]
+
+        column_ranges = {
+            (3, 6): "CLASE SOCIAL",
+            (8, 9): "NIÑOS EN EL HOGAR",
+            (11, 11): "ACTIVIDAD RESPONSABLE DE COMPRA",
+            (13, 15): "EDAD RESPONSABLE DE COMPRA",
+            (17, 19): "TAMAÑO DE HOGAR",
+            (21, 24): "TAMAÑO DEL HÁBITAT",
+            (25, 25): "ÁREAS METROPOLITANAS",
+            (28, 35): "TIPO DE HOGAR"
+        }
+
+        for i in range(len(cols_tespana_idx) - 1):
+            start_col = cols_tespana_idx[i]
+            end_col = cols_tespana_idx[i + 1]
+            bloque = df.iloc[fila_header - 1:, start_col:end_col].reset_index(drop=True)
+            bloque.insert(0, nombre_primera_col, primera_columna)
+
+            fila_categoria = df.iloc[2, start_col:end_col].fillna('').astype(str).str.strip()
+            fila_dato = df.iloc[3, start_col:end_col].fillna('').astype(str).str.strip()
+
+            # 🔧 Rellenar categorías explícitamente
+            for (abs_start, abs_end), base_name in column_ranges.items():
+                for abs_col in range(abs_start, abs_end + 1):
+                    if start_col <= abs_col < end_col:
+                        rel_col = abs_col - start_col
+                        fila_categoria.iloc[rel_col] = base_name
+
+            # 🔁 Fallback automático: rellenar categorías faltantes con la última conocida
+            ultima_categoria = ""
+            for idx in range(len(fila_categoria)):
+                if fila_categoria.iloc[idx]:
+                    ultima_categoria = fila_categoria.iloc[idx]
+                else:
+                    fila_categoria.iloc[idx] = ultima_categoria
+
+            # 🔧 Combinar encabezados
+            columnas_combinadas = ["Alimentos"]
+            for cat, dat in zip(fila_categoria, fila_dato):
+                cat = str(cat).strip()
+                dat = str(dat).strip()
+                if cat and dat:
+                    columnas_combinadas.append(f"{cat} ({dat})")
+                elif dat:
+                    columnas_combinadas.append(dat)
+                elif cat:
+                    columnas_combinadas.append(cat)
+                else:
+                    columnas_combinadas.append("SIN NOMBRE")
+
+            if len(columnas_combinadas) != bloque.shape[1]:
+                print(f"    ⚠ Saltando bloque {i+1} por conflicto en columnas ({len(columnas_combinadas)} != {bloque.shape[1]})")
+                continue
+
+            bloque.columns = columnas_combinadas
+            bloque = bloque.drop(0).reset_index(drop=True)
+
+            if niveles is not None:
+                bloque = añadir_niveles(bloque, niveles, con_hoja=False)
+
+            nombre_categoria = df.iloc[fila_header - 2, start_col]
+            nombre_categoria = limpiar_nombre(nombre_categoria) or f"BLOQUE_{i + 1}"
+
+            subfolder = os.path.join(output_folder, "sociodem")
+            os.makedirs(subfolder, exist_ok=True)
+            output_path = os.path.join(subfolder, f"{year}_sociodem_{hoja}_{nombre_categoria}.csv")
+            salidas.append(guardar_csv(bloque, output_path))
+            print(f"    ✔ CSV creado: {output_path}")
+            if almacen is not None:
+                almacen.agregar("sociodem", year, hoja, nombre_categoria, bloque)
+
+    return salidas
+
+
+
+
+def extraer_datos_ccaa_nuevo(df, nombre_base, output_folder, niveles_df=None, almacen=None):
+    salidas = []
+    niveles = indice_niveles(niveles_df)
+    for ccaa in df.columns.get_level_values(0).unique():
+        sub_df = df[ccaa].copy()
+        sub_df.insert(0, "Alimentos", df.index)
+        sub_df = sub_df.dropna(how='all')
+
+        if niveles is not None:
+            sub_df = añadir_niveles(sub_df, niveles)
+
+        ccaa_limpio = re.sub(r'[\\/*?:"<>|]', "_", ccaa)
+        subfolder = os.path.join(output_folder, "ccaa")
+        os.makedirs(subfolder, exist_ok=True)
+        output_path = os.path.join(subfolder, f"{nombre_base}_{ccaa_limpio}.csv")
+        salidas.append(guardar_csv(sub_df, output_path))
+        print(f"  ✔ CCAA guardado: {output_path}")
+        if almacen is not None:
+            anio, fuente, mes = nombre_base.split("_")[:3]
+            almacen.agregar(fuente, anio, mes, ccaa_limpio, sub_df)
+    return salidas
+
+
+def extraer_bloques_datos(df, nombre_base, output_folder, tipo_fuente, niveles_df=None, almacen=None, esquema=None):
+    salidas = []
+    niveles = indice_niveles(niveles_df)
+    # La cabecera se detecta sobre las primeras filas; el esquema se reutiliza entre meses
+    if esquema is None:
+        esquema = detectar_esquema(df)
+
+    if not esquema.con_tespana:
+        print(f"  ⚠ No se encontró 'T.ESPAÑA' en {nombre_base}, buscando otros patrones...")
+    if esquema.tipos_dato_idx is None:
+        print(f"  ⚠ No se encontró fila con tipos de dato en {nombre_base}")
+        return salidas
+
+    encabezados_idx = esquema.encabezados_idx
+    encabezados = esquema.encabezados
+    bloques = esquema.bloques
+
+    print(f"  💡 Se encontraron {len(bloques)} bloques en {nombre_base}")
+
+    for tipo, start_col, end_col in bloques:
+        tipo_limpio = re.sub(r'[^a-zA-Z0-9]', '_', tipo.lower()).strip('_')
+        try:
+            bloque_df = df.iloc[encabezados_idx+1:, [0] + list(range(start_col, end_col))]
+            column_names = ['Alimentos'] + list(encabezados[start_col:end_col])
+            if bloque_df.shape[1] != len(column_names):
+                print(f"  ⚠ Saltando bloque {tipo}: número de columnas no coincide ({bloque_df.shape[1]} != {len(column_names)})")
+                continue
+            bloque_df.columns = column_names            
+            bloque_df = bloque_df.dropna(how='all')
+            bloque_df = bloque_df[bloque_df['Alimentos'].notna()]
+            bloque_df = bloque_df[~bloque_df['Alimentos'].astype(str).str.contains(r'T\.?\s*ESPAÑA', case=False, regex=True)]
+            for col in bloque_df.columns[1:]:
+                bloque_df[col] = pd.to_numeric(bloque_df[col], errors='coerce')
+            bloque_df = bloque_df.drop_duplicates()
+
+            if niveles is not None:
+                bloque_df = añadir_niveles(bloque_df, niveles)
+
+            if tipo_fuente.upper() == "ANUAL":
+                subfolder = output_folder  # Guarda directamente en CSV_Anuales
+            else:
+                subfolder = os.path.join(output_folder, tipo_fuente.lower())
+            os.makedirs(subfolder, exist_ok=True)
+            output_path = os.path.join(subfolder, f"{nombre_base}_{tipo.upper()}.csv")
+            salidas.append(guardar_csv(bloque_df, output_path))
+            print(f"  ✔ {tipo} guardado: {output_path}")
+            if almacen is not None and tipo_fuente.upper() != "ANUAL":
+                anio, _, mes = nombre_base.split("_")[:3]
+                almacen.agregar(tipo_fuente, anio, mes, tipo.upper(), bloque_df)
+        except Exception as e:
+            print(f"  ✖ Error procesando {tipo}: {str(e)}")
+    return salidas
+
+
+# ------------------- PROCESADO POR LIBRO -------------------
+
+def leer_libro(file_path):
+    # El libro se lee del disco una sola vez; pandas y openpyxl trabajan sobre los mismos bytes
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def procesar_libro_mensual(file_path, output_folder, almacen_folder=None):
+    """Exporta un libro mensual y devuelve la lista de ficheros generados (CSV y particiones Parquet)."""
+    filename = os.path.basename(file_path)
+    print(f"\n📂 Procesando archivo mensual: {filename}")
+
+    match = re.search(r"(20\d{2})", filename)
+    year = match.group(1) if match else "sin_anio"
+    tipo_fuente = detectar_fuente_datos(filename)
+    almacen = EscritorAlmacen(almacen_folder) if almacen_folder else None
+
+    contenido = leer_libro(file_path)
+    excel_data = pd.ExcelFile(io.BytesIO(contenido))
+    salidas = []
+
+    try:
+        # La tabla de niveles se normaliza una sola vez para todo el libro
+        if tipo_fuente in ["SOCIODEM", "CCAA", "CANAL"]:
+            niveles = indice_niveles(extraer_niveles_desde_excel(io.BytesIO(contenido)))
+        else:
+            niveles = None
+
+        if tipo_fuente == "SOCIODEM":
+            salidas += procesar_sociodem_por_hoja(excel_data, output_folder, year, niveles_df=niveles, almacen=almacen)
+        else:
+            for sheet_name in excel_data.sheet_names:
+                if any(k in sheet_name.lower() for k in PORTADA_KEYWORDS):
+                    print(f"  ⏩ Omitida hoja: {sheet_name}")
+                    continue
+
+                nombre_base = f"{year}_{tipo_fuente.lower()}_{sheet_name.replace(' ', '_').lower()}"
+                if tipo_fuente == "CCAA":
+                    df = excel_data.parse(sheet_name, header=[1, 2], index_col=0)
+                    salidas += extraer_datos_ccaa_nuevo(df, nombre_base, output_folder, niveles_df=niveles, almacen=almacen)
+                else:
+                    df = excel_data.parse(sheet_name, header=None)
+                    salidas += extraer_bloques_datos(df, nombre_base, output_folder, tipo_fuente, niveles_df=niveles, almacen=almacen)
+
+        if almacen is not None:
+            # Las particiones también son salidas: si faltan, el libro se vuelve a procesar
+            salidas += almacen.volcar()
+    except Exception:
+        # No se vuelcan particiones a medias de un libro con errores
+        if almacen is not None:
+            almacen.descartar()
+        raise
+    return salidas
+
+
+def procesar_libro_anual(file_path, output_folder):
+    """Exporta un libro anual y devuelve la lista de CSV generados."""
+    filename = os.path.basename(file_path)
+    print(f"\n📂 Procesando archivo anual: {filename}")
+
+    match = re.search(r"(20\d{2})", filename)
+    anio = match.group(1) if match else "sin_anio"
+    contenido = leer_libro(file_path)
+    excel_data = pd.ExcelFile(io.BytesIO(contenido))
+    niveles = indice_niveles(extraer_niveles_desde_excel(io.BytesIO(contenido)))
+    salidas = []
+
+    for sheet_name in excel_data.sheet_names:
+        if any(k in sheet_name.lower() for k in PORTADA_KEYWORDS):
+            print(f"  ⏩ Omitida hoja: {sheet_name}")
+            continue
+
+        nombre_base = f"{anio}_anual_{sheet_name.replace(' ', '_').lower()}"
+
+        try:
+            df = excel_data.parse(sheet_name, header=None)
+
+            # Normalizar el nombre de la hoja
+            normalized_name = sheet_name.strip().lower().replace('á', 'a')
+
+            # Detectar si contiene alguna de las palabras clave
+            if 'consumoxcapita' in normalized_name or 'gastoxcapita' in normalized_name:
+                # Caso especial: solo tiene un tipo de dato
+                encabezados_idx = 0
+                while encabezados_idx < len(df) and df.iloc[encabezados_idx].isnull().all():
+                    encabezados_idx += 1
+                encabezados = df.iloc[encabezados_idx].fillna('').astype(str)
+                bloque_df = df.iloc[encabezados_idx+1:].copy()
+                bloque_df.columns = encabezados
+                bloque_df = bloque_df.dropna(how='all')
+                bloque_df = bloque_df[bloque_df.iloc[:, 0].notna()]
+                bloque_df = bloque_df.drop_duplicates()
+
+                # RENOMBRAR LA PRIMERA COLUMNA A "Alimentos"
+                cols = list(bloque_df.columns)
+                cols[0] = "Alimentos"
+                bloque_df.columns = cols
+
+                # Añadir niveles si están disponibles
+                if niveles is not None:
+                    bloque_df = añadir_niveles(bloque_df, niveles, con_hoja=False)
+
+                output_path = os.path.join(output_folder, f"{nombre_base}.csv")
+                salidas.append(guardar_csv(bloque_df, output_path))
+                print(f"  ✔ {sheet_name.upper()} guardado: {output_path}")
+                continue  # saltar a siguiente hoja
+
+            # Estructura estándar
+            if isinstance(df.columns, pd.MultiIndex):
+                salidas += extraer_datos_ccaa_nuevo(df, nombre_base, output_folder, niveles_df=niveles)
+            else:
+                salidas += extraer_bloques_datos(df, nombre_base, output_folder, "ANUAL", niveles_df=niveles)
+
+        except Exception as e:
+            print(f"  ✖ Error procesando hoja {sheet_name}: {str(e)}")
+            continue
+
+    return salidas
@@ -0,0 +1,57 @@
+"""
+Limpieza de las hojas y cruce con la tabla de niveles.
+
+Los espacios se quitan solo en las columnas de texto, columna a columna con las
+operaciones vectorizadas de .str, y la tabla de niveles se normaliza una vez por
+libro en un índice Nombre -> (Nivel, Hoja) que se aplica a cada bloque con
+.map, en lugar de repetir la normalización y un merge en cada bloque.
+"""
+import pandas as pd
+
+
+def quitar_espacios(df):
+    """Quita los espacios de los extremos en las celdas de texto, dejando el resto intacto."""
+    df = df.copy()
+    for col in range(df.shape[1]):
+        serie = df.iloc[:, col]
+        if serie.dtype != object and not pd.api.types.is_string_dtype(serie.dtype):
+            continue
+        # Una columna object sin ningún texto (p. ej. solo booleanos y vacíos) no admite .str
+        if pd.api.types.infer_dtype(serie, skipna=True) not in ("string", "mixed", "mixed-integer"):
+            continue
+        # .str.strip() devuelve NaN en las celdas que no son texto: esas se conservan
+        limpia = serie.str.strip()
+        df.isetitem(col, limpia.where(limpia.notna(), serie))
+    return df
+
+
+def normalizar_alimentos(serie):
+    return serie.astype(str).str.strip().str.upper()
+
+
+def indice_niveles(niveles_df):
+    """
+    Tabla de niveles indexada por el nombre normalizado (primera aparición de cada
+    nombre). Devuelve None si no hay niveles; si ya es un índice, lo devuelve tal cual.
+    """
+    if niveles_df is None or niveles_df.empty:
+        return None
+    if niveles_df.index.name == "Nombre":
+        return niveles_df
+    indice = niveles_df.assign(Nombre=normalizar_alimentos(niveles_df["Nombre"]))
+    indice = indice.drop_duplicates(subset=["Nombre"]).set_index("Nombre")
+    return indice[["Nivel", "Hoja"]]
+
+
+def añadir_niveles(bloque, indice, columna="Alimentos", con_hoja=True):
+    """
+    Normaliza la columna de alimentos y añade Nivel (y Hoja) buscándolos en el
+    índice; equivale al merge left contra la tabla de niveles deduplicada.
+    """
+    bloque = bloque.reset_index(drop=True)
+    claves = normalizar_alimentos(bloque[columna])
+    bloque[columna] = claves
+    bloque["Nivel"] = claves.map(indice["Nivel"])
+    if con_hoja:
+        bloque["Hoja"] = claves.map(indice["Hoja"])
+    return bloque
@@ -0,0 +1,178 @@
+"""
+Extracción de la jerarquía de alimentos (Nombre -> Nivel) de los libros del panel.
+
+El nivel de cada alimento es la sangría (alignment.indent) de su celda en la
+columna A. En vez de cargar el libro entero con openpyxl, se recorre el XML de
+cada hoja en streaming quedándose solo con las celdas de la columna A, y se
+resuelven sus estilos y textos compartidos. El resultado se guarda en disco por
+hash del libro, así que un libro ya visto no se vuelve a leer.
+"""
+import hashlib
+import io
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+CACHE_NIVELES = os.path.join(".cache_ingesta", "niveles")
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_REF_COLUMNA_A = re.compile(r"^A(\d+)$")
+
+
+def _rutas_hojas(zf):
+    # [(nombre_hoja, ruta_xml)] en el orden del libro
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    destinos = {r.get("Id"): r.get("Target") for r in rels.iter(f"{NS_PKG}Relationship")}
+    libro = ET.fromstring(zf.read("xl/workbook.xml"))
+    hojas = []
+    for hoja in libro.iter(f"{NS_MAIN}sheet"):
+        destino = destinos[hoja.get(f"{NS_REL}id")]
+        ruta = destino.lstrip("/") if destino.startswith("/") else posixpath.normpath(posixpath.join("xl", destino))
+        hojas.append((hoja.get("name"), ruta))
+    return hojas
+
+
+def _sangrias(zf):
+    # Sangría de cada estilo de celda (índice s de <c>)
+    if "xl/styles.xml" not in zf.namelist():
+        return []
+    estilos = ET.fromstring(zf.read("xl/styles.xml"))
+    cell_xfs = estilos.find(f"{NS_MAIN}cellXfs")
+    if cell_xfs is None:
+        return []
+    sangrias = []
+    for xf in cell_xfs.findall(f"{NS_MAIN}xf"):
+        alineacion = xf.find(f"{NS_MAIN}alignment")
+        indent = alineacion.get("indent") if alineacion is not None else None
+        sangrias.append(float(indent) if indent else 0)
+    return sangrias
+
+
+def _celdas_columna_a(zf, ruta):
+    # Recorre la hoja en streaming y devuelve [(fila, tipo, valor_crudo, estilo)] de la columna A
+    celdas = []
+    with zf.open(ruta) as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag == f"{NS_MAIN}c":
+                m = _REF_COLUMNA_A.match(elem.get("r", ""))
+                if m:
+                    tipo = elem.get("t", "n")
+                    if tipo == "inlineStr":
+                        valor = "".join(t.text or "" for t in elem.iter(f"{NS_MAIN}t"))
+                    else:
+                        v = elem.find(f"{NS_MAIN}v")
+                        valor = v.text if v is not None else None
+                    celdas.append((int(m.group(1)), tipo, valor, int(elem.get("s", 0))))
+                elem.clear()
+            elif elem.tag == f"{NS_MAIN}row":
+                elem.clear()
+    return celdas
+
+
+def _textos_compartidos(zf, necesarios):
+    # Solo se guardan los textos compartidos que aparecen en la columna A
+    textos = {}
+    if not necesarios or "xl/sharedStrings.xml" not in zf.namelist():
+        return textos
+    idx = 0
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag == f"{NS_MAIN}si":
+                if idx in necesarios:
+                    textos[idx] = "".join(t.text or "" for t in elem.iter(f"{NS_MAIN}t"))
+                idx += 1
+                elem.clear()
+    return textos
+
+
+def _valor(tipo, crudo, textos):
+    if crudo is None:
+        return None
+    if tipo == "s":
+        return textos.get(int(crudo))
+    if tipo == "n":
+        return float(crudo) if "." in crudo or "E" in crudo.upper() else int(crudo)
+    if tipo == "b":
+        return crudo == "1"
+    return crudo
+
+
+def _descartar_nombre(nombre_upper):
+    # ✂️ FILTRAR si el texto tiene muchas repeticiones tipo "NIVEL ALTO NIVEL ALTO"
+    palabras = nombre_upper.split()
+    if len(palabras) >= 4:
+        palabras_unicas = set(palabras)
+        if len(palabras_unicas) <= 2 and any("NIVEL" in p for p in palabras_unicas):
+            return True
+    return False
+
+
+def leer_niveles_xlsx(fuente):
+    """Lee la tabla Nombre/Nivel/Hoja de un .xlsx (ruta o buffer) sin cargar el libro completo."""
+    with zipfile.ZipFile(fuente) as zf:
+        sangrias = _sangrias(zf)
+        hojas = [(nombre, _celdas_columna_a(zf, ruta)) for nombre, ruta in _rutas_hojas(zf)]
+        necesarios = {int(c[2]) for _, celdas in hojas for c in celdas if c[1] == "s" and c[2] is not None}
+        textos = _textos_compartidos(zf, necesarios)
+
+    resultados = []
+    for nombre_hoja, celdas in hojas:
+        nombres, niveles = [], []
+        for fila, tipo, crudo, estilo in celdas:
+            if fila < 2:
+                continue
+            nombre = _valor(tipo, crudo, textos)
+            if nombre is None:
+                continue
+            nombre_str = str(nombre).strip()
+            if _descartar_nombre(nombre_str.upper()):
+                continue
+            nombres.append(nombre_str)
+            niveles.append(sangrias[estilo] if estilo < len(sangrias) else 0)
+
+        df_hoja = pd.DataFrame({"Nombre": nombres, "Nivel": niveles})
+        df_hoja["Hoja"] = nombre_hoja
+        resultados.append(df_hoja)
+
+    if resultados:
+        return pd.concat(resultados, ignore_index=True)
+    else:
+        return pd.DataFrame(columns=["Nombre", "Nivel", "Hoja"])
+
+
+def extraer_niveles_desde_excel(path_excel, cache_dir=CACHE_NIVELES):
+    """
+    Devuelve la tabla de niveles de un libro (ruta o buffer), usando la caché en
+    disco por hash del contenido. cache_dir=None desactiva la caché.
+    """
+    if isinstance(path_excel, (bytes, bytearray)):
+        contenido = bytes(path_excel)
+    elif hasattr(path_excel, "read"):
+        path_excel.seek(0)
+        contenido = path_excel.read()
+    else:
+        with open(path_excel, "rb") as f:
+            contenido = f.read()
+
+    ruta_cache = None
+    if cache_dir:
+        ruta_cache = os.path.join(cache_dir, hashlib.sha256(contenido).hexdigest() + ".parquet")
+        if os.path.exists(ruta_cache):
+            niveles_df = pd.read_parquet(ruta_cache)
+            niveles_df["Nombre"] = niveles_df["Nombre"].astype(object)
+            return niveles_df
+
+    niveles_df = leer_niveles_xlsx(io.BytesIO(contenido))
+
+    if ruta_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        niveles_df.to_parquet(ruta_cache + ".tmp", index=False)
+        os.replace(ruta_cache + ".tmp", ruta_cache)
+    return niveles_df
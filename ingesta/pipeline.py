@@ -0,0 +1,140 @@
+"""
+Pipeline incremental y en paralelo de Excel -> CSV.
+
+Los libros se reparten entre un pool de procesos y se guarda un manifiesto con
+el hash de cada libro de entrada junto a sus CSV de salida. Un libro cuyo hash
+no ha cambiado (y cuyos CSV siguen existiendo) no se vuelve a procesar, así que
+añadir el Excel de un mes nuevo solo exporta ese libro.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from datos.acumulados import construir_todos as construir_acumulados
+from datos.almacen import ALMACEN_MENSUAL
+from ingesta.exportadores import procesar_libro_anual, procesar_libro_mensual
+
+MANIFIESTO = ".manifiesto_ingesta.json"
+
+
+# ------------------- MANIFIESTO -------------------
+
+def hash_fichero(path, bloque=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def cargar_manifiesto(output_folder):
+    ruta = os.path.join(output_folder, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_manifiesto(output_folder, manifiesto):
+    ruta = os.path.join(output_folder, MANIFIESTO)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _salidas_completas(entrada):
+    return all(os.path.exists(p) for p in entrada.get("salidas", []))
+
+
+def libros_pendientes(input_folder, manifiesto, forzar=False):
+    """Devuelve [(ruta, firma)] de los libros nuevos o modificados desde la última ejecución."""
+    pendientes = []
+    for filename in sorted(os.listdir(input_folder)):
+        if not filename.lower().endswith(('.xlsx', '.xls')):
+            continue
+        file_path = os.path.join(input_folder, filename)
+        st = os.stat(file_path)
+        entrada = manifiesto.get(filename)
+
+        # Atajo barato: mismo tamaño y mtime -> no hace falta ni calcular el hash
+        if not forzar and entrada and entrada["tamano"] == st.st_size and entrada["mtime"] == st.st_mtime_ns \
+                and _salidas_completas(entrada):
+            continue
+
+        firma = {"sha256": hash_fichero(file_path), "tamano": st.st_size, "mtime": st.st_mtime_ns}
+        if not forzar and entrada and entrada["sha256"] == firma["sha256"] and _salidas_completas(entrada):
+            entrada.update(firma)  # solo ha cambiado el mtime
+            continue
+        pendientes.append((file_path, firma))
+    return pendientes
+
+
+# ------------------- EJECUCIÓN -------------------
+
+def _ejecutar(funcion, rutas, max_workers):
+    # Genera (ruta, salidas, error) a medida que terminan los libros
+    if max_workers == 1 or len(rutas) <= 1:
+        for ruta in rutas:
+            try:
+                yield ruta, funcion(ruta), None
+            except Exception as e:
+                yield ruta, [], e
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {pool.submit(funcion, ruta): ruta for ruta in rutas}
+        for futuro in as_completed(futuros):
+            ruta = futuros[futuro]
+            try:
+                yield ruta, futuro.result(), None
+            except Exception as e:
+                yield ruta, [], e
+
+
+def _procesar(funcion, input_folder, output_folder, max_workers, forzar):
+    if not os.path.exists(input_folder):
+        print(f"❌ No existe la carpeta: {input_folder}")
+        return []
+    os.makedirs(output_folder, exist_ok=True)
+
+    manifiesto = cargar_manifiesto(output_folder)
+    pendientes = libros_pendientes(input_folder, manifiesto, forzar)
+    firmas = dict(pendientes)
+    print(f"📋 {len(firmas)} libros por procesar en {input_folder}")
+
+    procesados = []
+    for ruta, salidas, error in _ejecutar(funcion, list(firmas), max_workers):
+        filename = os.path.basename(ruta)
+        if error is not None:
+            print(f"  ✖ Error procesando {filename}: {str(error)}")
+            continue
+        manifiesto[filename] = dict(firmas[ruta], salidas=salidas)
+        procesados.append(ruta)
+        # Se guarda tras cada libro: si se interrumpe, lo ya hecho no se repite
+        guardar_manifiesto(output_folder, manifiesto)
+
+    guardar_manifiesto(output_folder, manifiesto)
+    return procesados
+
+
+def procesar_mensuales(input_folder="Excel Mensuales", output_folder="CSV_Mensuales",
+                       almacen_folder=ALMACEN_MENSUAL, max_workers=None, forzar=False):
+    funcion = partial(procesar_libro_mensual, output_folder=output_folder, almacen_folder=almacen_folder)
+    procesados = _procesar(funcion, input_folder, output_folder, max_workers, forzar)
+
+    # Tablas de YTD y TAM precalculadas a partir del almacén recién actualizado
+    if procesados and almacen_folder:
+        print("\n📈 Calculando acumulados YTD / TAM...")
+        construir_acumulados(almacen_folder)
+
+    print("\n✅ Procesamiento de archivos mensuales finalizado.")
+    return procesados
+
+
+def procesar_anuales(input_folder="Excels Anuales", output_folder="CSV_Anuales", max_workers=None, forzar=False):
+    funcion = partial(procesar_libro_anual, output_folder=output_folder)
+    procesados = _procesar(funcion, input_folder, output_folder, max_workers, forzar)
+    print("\n✅ Procesamiento de archivos anuales finalizado.")
+    return procesados
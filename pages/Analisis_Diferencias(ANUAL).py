@@ -1,9 +1,8 @@
 import streamlit as st
 import os
 import pandas as pd
-import itertools
-import io
 import altair as alt
+from datos import acumulados, buscador, carga, catalogo, compacto, datos_grafico, exportar, memoria, plan
 
 
 
@@ -15,6 +14,17 @@ CARPETAS_MENSUALES = ["ccaa", "canal", "sociodem"]
 def key_safe(*args):
     return "_".join(str(a).replace(" ", "_").replace(".", "_").replace("/", "_") for a in args)
 
+def sumar_por_alimento(dfs):
+    if not dfs:
+        return pd.DataFrame()
+    df_total = pd.concat(dfs, ignore_index=True)
+    for col in df_total.columns:
+        if col not in ["Alimentos", "Nivel", "Mes"]:
+            df_total[col] = pd.to_numeric(df_total[col], errors='coerce')
+    columnas_numericas = [col for col in df_total.select_dtypes(include=["number"]).columns
+                          if col != "Nivel" and df_total[col].notna().any()]
+    return df_total.groupby("Alimentos")[columnas_numericas].sum().reset_index()
+
 st.set_page_config(page_title="Comparador de Alimentos", layout="wide")
 st.title("\U0001F4CA Comparador por Alimentos")
 
@@ -42,73 +52,44 @@ with tab_datos_generales:
         st.error(f"No se encontró la carpeta {carpeta_path}")
         st.stop()
 
-    for f in os.listdir(carpeta_path):
-        if f.endswith(".csv"):
-            partes = f.replace(".csv", "").split("_")
-            if len(partes) >= 3:
-                anio = partes[0]
-                mes = partes[2].capitalize()
-                estructura.setdefault(anio, set()).add(mes)
-                if fuente_seleccionada == "ccaa" and len(partes) > 3:
-                    region = "_".join(partes[3:])
-                    regiones_mensuales.setdefault(anio, set()).add(region)
-                elif fuente_seleccionada in ["canal", "sociodem"] and len(partes) > 3:
-                    categoria = "_".join(partes[3:])
-                    categorias_mensuales.setdefault(anio, set()).add(categoria)
-
-    def buscar_csv(anio, mes_lower, region, fuente, carpeta):
-        for f in os.listdir(carpeta):
-            if f.endswith(".csv"):
-                partes = f.replace(".csv", "").split("_")
-                if len(partes) >= 4:
-                    if partes[0] == anio and partes[1] == fuente and partes[2].lower() == mes_lower:
-                        if "_".join(partes[3:]) == region:
-                            return f
-        return None
-
-    def detectar_separador(path, num_lineas=5):
-        posibles = [',', ';', '\t', '|']
-        with open(path, 'r', encoding='utf-8') as f:
-            lineas = list(itertools.islice(f, num_lineas))
-        if not lineas:
-            return ','
-        mejor, max_cnt = None, 0
-        for sep in posibles:
-            cnt = sum(line.count(sep) for line in lineas) / len(lineas)
-            if cnt > max_cnt:
-                mejor, max_cnt = sep, cnt
-        return mejor or ','
+    # Años, meses y regiones/categorías salen del catálogo, sin listar la carpeta en cada rerun
+    for anio, meses in catalogo.estructura(fuente_seleccionada).items():
+        estructura[anio] = {m.capitalize() for m in meses}
+    if fuente_seleccionada == "ccaa":
+        regiones_mensuales = catalogo.segmentos(fuente_seleccionada)
+    elif fuente_seleccionada in ["canal", "sociodem"]:
+        categorias_mensuales = catalogo.segmentos(fuente_seleccionada)
+
+    def alternar_alimento(key, key_global, id_alimento):
+        # La selección vive en un conjunto de IDs; el checkbox solo la refleja
+        seleccion = st.session_state.setdefault(key_global, set())
+        if st.session_state[key]:
+            seleccion.add(id_alimento)
+        else:
+            seleccion.discard(id_alimento)
+
+    def alimentos_seleccionados(key_global):
+        return buscador.nombres(sorted(st.session_state.get(key_global, ())))
 
     def mostrar_alimentos_paginados(alimentos, anio, mes, region_o_cat, nivel, pagina_actual, items_por_pagina=8):
         nivel_str = str(nivel).replace(".", "_")
         filtro = st.text_input(f"\U0001F50D Buscar alimento en Nivel {nivel}:", key=key_safe("buscador", anio, mes, region_o_cat, nivel_str))
-        if filtro:
-            alimentos = [a for a in alimentos if filtro.lower() in a.lower()]
-        total = len(alimentos)
+        ids_alimentos = buscador.buscar(filtro, buscador.ids(alimentos))
+        total = len(ids_alimentos)
         total_paginas = (total - 1) // items_por_pagina + 1 if total > 0 else 1
         pagina_actual = min(max(pagina_actual, 0), total_paginas - 1)
         inicio = pagina_actual * items_por_pagina
         fin = inicio + items_por_pagina
-        alimentos_pagina = alimentos[inicio:fin]
-        cols = st.columns(2)
-        seleccionados_pagina = []
-        for i, alimento in enumerate(alimentos_pagina):
-            col = cols[i % 2]
-            with col:
-                key = key_safe("chk", anio, mes, region_o_cat, nivel_str, alimento)
-                if key not in st.session_state:
-                    st.session_state[key] = False
-                chk_alimento = st.checkbox(f"\U0001F374 {alimento}", key=key)
-                if chk_alimento:
-                    seleccionados_pagina.append(alimento)
+        ids_pagina = ids_alimentos[inicio:fin]
         key_global = key_safe("seleccion", anio, mes, region_o_cat, nivel_str)
-        st.session_state[key_global] = set(st.session_state.get(key_global, set()))
-        for a in seleccionados_pagina:
-            st.session_state[key_global].add(a)
-        for alimento in alimentos_pagina:
-            key = key_safe("chk", anio, mes, region_o_cat, nivel_str, alimento)
-            if not st.session_state[key] and alimento in st.session_state[key_global]:
-                st.session_state[key_global].remove(alimento)
+        seleccion = st.session_state.setdefault(key_global, set())
+        # Solo hay checkboxes para la página visible
+        cols = st.columns(2)
+        for i, (id_alimento, alimento) in enumerate(zip(ids_pagina, buscador.nombres(ids_pagina))):
+            with cols[i % 2]:
+                key = key_safe("chk", anio, mes, region_o_cat, nivel_str, id_alimento)
+                st.session_state[key] = id_alimento in seleccion
+                st.checkbox(f"\U0001F374 {alimento}", key=key, on_change=alternar_alimento, args=(key, key_global, id_alimento))
         col1, col2, col3 = st.columns([1, 2, 1])
         with col1:
             if pagina_actual > 0:
@@ -130,11 +111,12 @@ with tab_datos_generales:
 
     meses_ordenados = ["enero","febrero","marzo","abril","mayo","junio","julio","agosto","septiembre","octubre","noviembre","diciembre"]
 
+    seleccion_meses = {}  # (año, mes) -> regiones/categorías seleccionadas
+    contenedores = {}
     for mes in sorted(meses_años.keys(), key=lambda x: meses_ordenados.index(x.lower())):
         with st.expander(f"{mes}", expanded=False):
             años_disponibles = sorted(meses_años[mes])
             años_seleccionados = st.multiselect(f"Selecciona uno o más años para {mes}", options=años_disponibles, default=años_disponibles, key=key_safe("anios", mes))
-            carpeta_mensual_path = os.path.join(CSV_MENSUAL, fuente_seleccionada)
             for anio_seleccionado in años_seleccionados:
                 st.markdown(f"---\n### Año {anio_seleccionado}")
                 opciones_region_o_cat = sorted(categorias_mensuales.get(anio_seleccionado, [])) if fuente_seleccionada in ["canal", "sociodem"] else sorted(regiones_mensuales.get(anio_seleccionado, []))
@@ -150,88 +132,108 @@ with tab_datos_generales:
                         if st.button("❌ Deseleccionar todo", key=key_safe("desel_todo", mes, anio_seleccionado)):
                             st.session_state[key_multiselect] = []
                     seleccionadas = st.multiselect(f"Selecciona regiones/categorías para {mes} {anio_seleccionado}:", options=opciones_region_o_cat, default=st.session_state[key_multiselect], key=key_multiselect)
-                    for region_o_cat in seleccionadas:
-                        nombre_csv = buscar_csv(anio_seleccionado, mes.lower(), region_o_cat, fuente_seleccionada, carpeta_mensual_path)
-                        if nombre_csv:
-                            path_csv = os.path.join(carpeta_mensual_path, nombre_csv)
-                            try:
-                                sep = detectar_separador(path_csv)
-                                df = pd.read_csv(path_csv, sep=sep)
-                                st.write(f"Cargando archivo: {nombre_csv} - Fuente: {fuente_seleccionada}")
-
-                                # Determinar columnas clave según la fuente seleccionada
-                                if fuente_seleccionada == "canal":
-                                    columnas_clave = ["VALOR", "VOLUMEN", "PENETRACION", "PRECIO MEDIO"]
-                                    columnas_disponibles_clave = [col for col in columnas_clave if col in df.columns]
-                                    columnas_numericas = df.select_dtypes(include=["number"]).columns.tolist()
-                                    columnas_para_seleccionar = sorted(set(columnas_numericas) | set(columnas_disponibles_clave))
-                                elif fuente_seleccionada == "sociodem":
-                                    columnas_excluir = ["Alimentos", "Nivel"]
-                                    columnas_para_seleccionar = [col for col in df.columns if col not in columnas_excluir and pd.api.types.is_numeric_dtype(df[col])]
-                                    columnas_disponibles_clave = columnas_para_seleccionar.copy()
-                                    if not columnas_para_seleccionar:
-                                        st.warning(f"No hay columnas numéricas disponibles para calcular YTD en {nombre_csv}")
-                                        columnas_seleccionadas = []
-                                elif fuente_seleccionada == "ccaa":
-                                    columnas_excluir = ["Alimentos", "Nivel"]  # ajusta según sea necesario
-                                    columnas_para_seleccionar = [col for col in df.columns if col not in columnas_excluir and pd.api.types.is_numeric_dtype(df[col])]
-                                    columnas_disponibles_clave = columnas_para_seleccionar.copy()
-                                else:
-                                    columnas_para_seleccionar = []
-                                    columnas_disponibles_clave = []
-                                # Solo mostrar selección si hay columnas disponibles
-                                if not columnas_para_seleccionar:
-                                    st.warning(f"No hay columnas numéricas para seleccionar en {nombre_csv}")
-                                    columnas_seleccionadas = []
-                                else:
-                                    # Clave única para esta selección
-                                    key_cols = key_safe("columnas_seleccion", anio_seleccionado, mes, region_o_cat)
-
-                                    # Botones de seleccionar/deseleccionar todo
-                                    col1, col2 = st.columns([1, 1])
-                                    with col1:
-                                        if st.button("✅ Seleccionar todas", key=key_safe("select_all", fuente_seleccionada, mes, anio_seleccionado)):
-                                            st.session_state[key_cols] = columnas_para_seleccionar
-                                    with col2:
-                                        if st.button("❌ Deseleccionar todas", key=key_safe("deselect_all", fuente_seleccionada, mes, anio_seleccionado)):
-                                            st.session_state[key_cols] = []
-
-                                    # Mostrar multiselect con estado persistente
-                                    columnas_seleccionadas = st.multiselect(
-                                        f"Selecciona columnas para análisis en {region_o_cat} ({mes} {anio_seleccionado}):",
-                                        options=columnas_para_seleccionar,
-                                        default=st.session_state.get(key_cols, columnas_disponibles_clave),
-                                        key=key_cols
-                                    )
-
-                                if "Alimentos" in df.columns and "Nivel" in df.columns:
-                                    niveles_unicos = sorted(df["Nivel"].dropna().unique())
-                                    niveles_seleccionados = st.multiselect(f"Niveles para {region_o_cat} ({mes} {anio_seleccionado}):", options=niveles_unicos, default=niveles_unicos, key=key_safe("niveles", mes, anio_seleccionado, region_o_cat))
-                                    clave = key_safe(anio_seleccionado, mes, fuente_seleccionada, region_o_cat)
-                                    seleccion_usuario.setdefault(clave, {"anio": anio_seleccionado, "mes": mes, "fuente": fuente_seleccionada, "region_o_categoria": region_o_cat, "niveles": niveles_seleccionados, "alimentos": []})
-                                    for nivel in niveles_seleccionados:
-                                        df_nivel = df[df["Nivel"] == nivel]
-                                        alimentos_nivel = sorted(df_nivel["Alimentos"].dropna().unique())
-                                        st.markdown(f"### \U0001F522 Nivel {nivel}")
-                                        pagina_key = key_safe("pagina", clave, nivel)
-                                        if pagina_key not in st.session_state:
-                                            st.session_state[pagina_key] = 0
-                                        _, nueva_pagina = mostrar_alimentos_paginados(alimentos_nivel, anio_seleccionado, mes, region_o_cat, nivel, st.session_state[pagina_key])
-                                        if isinstance(nueva_pagina, int):
-                                            st.session_state[pagina_key] = nueva_pagina
-                                        key_global = key_safe("seleccion", anio_seleccionado, mes, region_o_cat, str(nivel).replace(".", "_"))
-                                        seleccion_usuario[clave]["alimentos"].extend(list(st.session_state.get(key_global, [])))
-
-                                # Acumular datos para después
-                                if columnas_seleccionadas and "Alimentos" in df.columns:
-                                    df_filtrado = df[df["Alimentos"].isin(seleccion_usuario[clave]["alimentos"])][["Alimentos"] + columnas_seleccionadas]
-                                    df_filtrado["Año"] = anio_seleccionado
-                                    df_filtrado["Mes"] = mes
-                                    df_filtrado["Región/Categoría"] = region_o_cat
-                                    df_filtrado["Fuente"] = fuente_seleccionada
-                                    df_acumulado_total = pd.concat([df_acumulado_total, df_filtrado], ignore_index=True)
-                            except Exception as e:
-                                st.error(f"Error al leer {nombre_csv}: {e}")
+                    seleccion_meses[(anio_seleccionado, mes)] = seleccionadas
+                    contenedores[(anio_seleccionado, mes)] = st.container()
+
+    # Con la selección completa se decide de dónde sale cada (año, mes, región/categoría)
+    # y se lee cada origen una sola vez; los widgets se pintan después en su contenedor
+    plan_carga = plan.planificar(fuente_seleccionada, seleccion_meses)
+    errores_carga = {}
+    datos_cargados = plan.cargar_plan(plan_carga, errores=errores_carga, compactar_tipos=compacto.ACTIVO)
+    rutas_csv = {(p.anio, p.mes, s): ruta for p in plan_carga for s, ruta in p.segmentos.items()}
+
+    frames_acumulados = []
+    for (anio_seleccionado, mes), seleccionadas in seleccion_meses.items():
+        with contenedores[(anio_seleccionado, mes)]:
+            for region_o_cat in seleccionadas:
+                clave_dato = (anio_seleccionado, mes, region_o_cat)
+                if clave_dato not in rutas_csv:
+                    continue
+                nombre_csv = os.path.basename(rutas_csv[clave_dato])
+                try:
+                    if clave_dato in errores_carga:
+                        raise errores_carga[clave_dato]
+                    df = datos_cargados[clave_dato]
+                    st.write(f"Cargando archivo: {nombre_csv} - Fuente: {fuente_seleccionada}")
+
+                    # Determinar columnas clave según la fuente seleccionada
+                    if fuente_seleccionada == "canal":
+                        columnas_clave = ["VALOR", "VOLUMEN", "PENETRACION", "PRECIO MEDIO"]
+                        columnas_disponibles_clave = [col for col in columnas_clave if col in df.columns]
+                        columnas_numericas = df.select_dtypes(include=["number"]).columns.tolist()
+                        columnas_para_seleccionar = sorted(set(columnas_numericas) | set(columnas_disponibles_clave))
+                    elif fuente_seleccionada == "sociodem":
+                        columnas_excluir = ["Alimentos", "Nivel"]
+                        columnas_para_seleccionar = [col for col in df.columns if col not in columnas_excluir and pd.api.types.is_numeric_dtype(df[col])]
+                        columnas_disponibles_clave = columnas_para_seleccionar.copy()
+                        if not columnas_para_seleccionar:
+                            st.warning(f"No hay columnas numéricas disponibles para calcular YTD en {nombre_csv}")
+                            columnas_seleccionadas = []
+                    elif fuente_seleccionada == "ccaa":
+                        columnas_excluir = ["Alimentos", "Nivel"]  # ajusta según sea necesario
+                        columnas_para_seleccionar = [col for col in df.columns if col not in columnas_excluir and pd.api.types.is_numeric_dtype(df[col])]
+                        columnas_disponibles_clave = columnas_para_seleccionar.copy()
+                    else:
+                        columnas_para_seleccionar = []
+                        columnas_disponibles_clave = []
+                    # Solo mostrar selección si hay columnas disponibles
+                    if not columnas_para_seleccionar:
+                        st.warning(f"No hay columnas numéricas para seleccionar en {nombre_csv}")
+                        columnas_seleccionadas = []
+                    else:
+                        # Clave única para esta selección
+                        key_cols = key_safe("columnas_seleccion", anio_seleccionado, mes, region_o_cat)
+
+                        # Botones de seleccionar/deseleccionar todo
+                        col1, col2 = st.columns([1, 1])
+                        with col1:
+                            if st.button("✅ Seleccionar todas", key=key_safe("select_all", fuente_seleccionada, mes, anio_seleccionado, region_o_cat)):
+                                st.session_state[key_cols] = columnas_para_seleccionar
+                        with col2:
+                            if st.button("❌ Deseleccionar todas", key=key_safe("deselect_all", fuente_seleccionada, mes, anio_seleccionado, region_o_cat)):
+                                st.session_state[key_cols] = []
+
+                        # Mostrar multiselect con estado persistente
+                        columnas_seleccionadas = st.multiselect(
+                            f"Selecciona columnas para análisis en {region_o_cat} ({mes} {anio_seleccionado}):",
+                            options=columnas_para_seleccionar,
+                            default=st.session_state.get(key_cols, columnas_disponibles_clave),
+                            key=key_cols
+                        )
+
+                    if "Alimentos" in df.columns and "Nivel" in df.columns:
+                        niveles_unicos = sorted(df["Nivel"].dropna().unique())
+                        niveles_seleccionados = st.multiselect(f"Niveles para {region_o_cat} ({mes} {anio_seleccionado}):", options=niveles_unicos, default=niveles_unicos, key=key_safe("niveles", mes, anio_seleccionado, region_o_cat))
+                        clave = key_safe(anio_seleccionado, mes, fuente_seleccionada, region_o_cat)
+                        seleccion_usuario.setdefault(clave, {"anio": anio_seleccionado, "mes": mes, "fuente": fuente_seleccionada, "region_o_categoria": region_o_cat, "niveles": niveles_seleccionados, "alimentos": []})
+                        for nivel in niveles_seleccionados:
+                            df_nivel = df[df["Nivel"] == nivel]
+                            alimentos_nivel = sorted(df_nivel["Alimentos"].dropna().unique())
+                            st.markdown(f"### \U0001F522 Nivel {nivel}")
+                            pagina_key = key_safe("pagina", clave, nivel)
+                            if pagina_key not in st.session_state:
+                                st.session_state[pagina_key] = 0
+                            _, nueva_pagina = mostrar_alimentos_paginados(alimentos_nivel, anio_seleccionado, mes, region_o_cat, nivel, st.session_state[pagina_key])
+                            if isinstance(nueva_pagina, int):
+                                st.session_state[pagina_key] = nueva_pagina
+                            key_global = key_safe("seleccion", anio_seleccionado, mes, region_o_cat, str(nivel).replace(".", "_"))
+                            seleccion_usuario[clave]["alimentos"].extend(alimentos_seleccionados(key_global))
+
+                    # Acumular datos para después
+                    if columnas_seleccionadas and "Alimentos" in df.columns:
+                        df_filtrado = df[df["Alimentos"].isin(seleccion_usuario[clave]["alimentos"])][["Alimentos"] + columnas_seleccionadas]
+                        df_filtrado["Año"] = anio_seleccionado
+                        df_filtrado["Mes"] = mes
+                        df_filtrado["Región/Categoría"] = region_o_cat
+                        df_filtrado["Fuente"] = fuente_seleccionada
+                        if compacto.ACTIVO:
+                            df_filtrado = compacto.compactar(df_filtrado)
+                        frames_acumulados.append(df_filtrado)
+                except Exception as e:
+                    st.error(f"Error al leer {nombre_csv}: {e}")
+
+    # Los trozos se concatenan una sola vez al final, no en cada iteración
+    df_acumulado_total = plan.concatenar(frames_acumulados)
 
 
 if not df_acumulado_total.empty:
@@ -249,9 +251,25 @@ if not df_acumulado_total.empty:
 
     tipo_grafico = st.selectbox("Tipo de gráfico", ["Línea", "Barras", "Área", "Dispersión", "Boxplot", "Heatmap"])
 
+    # Dispersión y boxplot necesitan los puntos; el resto se agrega en el servidor
+    agregacion = None
+    if tipo_grafico not in ("Dispersión", "Boxplot"):
+        agregacion = datos_grafico.AGREGACIONES[st.selectbox("Agregación de la métrica", options=list(datos_grafico.AGREGACIONES))]
+
+    preparado = datos_grafico.preparar(
+        df_acumulado_total,
+        x=columna_x,
+        y=columna_valor,
+        color=columna_color if columna_color != "(Ninguno)" else None,
+        fila=columna_fila if columna_fila != "(Ninguno)" else None,
+        columna=columna_columna if columna_columna != "(Ninguno)" else None,
+        agregacion=agregacion
+    )
+    if preparado.recorte:
+        st.caption(f"ℹ️ {preparado.filas_origen} filas reducidas a {len(preparado.datos)} para el gráfico: {preparado.recorte}.")
 
     # Base chart
-    base = alt.Chart(df_acumulado_total)
+    base = alt.Chart(preparado.datos)
 
     if tipo_grafico == "Línea":
         chart = base.mark_line()
@@ -304,41 +322,38 @@ with tab_tam_ytd:
         st.error(f"No se encontró la carpeta: {carpeta_path}")
         st.stop()
 
-    opciones_filtro = set()
-    for f in os.listdir(carpeta_path):
-        if f.endswith(".csv"):
-            partes = f.replace(".csv", "").split("_")
-            if len(partes) >= 4:
-                opcion = "_".join(partes[3:]).upper()
-                if opcion:
-                    opciones_filtro.add(opcion)
-
-    opciones_filtro = sorted(opciones_filtro)
+    ficheros_tam = catalogo.ficheros(fuente_seleccionada_tam)
+    opciones_filtro = sorted(set(ficheros_tam["Segmento"].str.upper()))
     if not opciones_filtro:
         st.warning("No se encontraron opciones para filtrar en esta fuente.")
         st.stop()
 
     opcion_seleccionada = st.selectbox(f"Selecciona filtro para {fuente_seleccionada_tam.upper()}", options=opciones_filtro)
 
-    archivos = [f for f in os.listdir(carpeta_path) if f.endswith(".csv")]
-    anos_disponibles = sorted(set(f.split("_")[0] for f in archivos))
+    anos_disponibles = sorted(ficheros_tam["Año"].unique())
     anio_seleccionado = st.selectbox("Selecciona año", options=anos_disponibles)
 
+    # CSV de cada mes para el filtro y año elegidos (una consulta al catálogo para todos los bucles)
+    ficheros_opcion = ficheros_tam[(ficheros_tam["Año"] == anio_seleccionado) & (ficheros_tam["Segmento"].str.upper() == opcion_seleccionada)]
+    rutas_mes = dict(zip(ficheros_opcion["Mes"], ficheros_opcion["Ruta"]))
+
     mes_orden = {m: i for i,m in enumerate(meses_ordenados)}
 
     mes_inicio = st.selectbox("Mes inicio YTD", options=meses_ordenados)
     mes_fin = st.selectbox("Mes fin YTD", options=meses_ordenados, index=len(meses_ordenados)-1)
 
+    productos_seleccionados = []
+    df_ytd_sumado = pd.DataFrame()
+    usar_acumulados = acumulados.existen(fuente_seleccionada_tam)
+
     if mes_orden[mes_fin] < mes_orden[mes_inicio]:
         st.error("El mes fin debe ser igual o posterior al mes inicio")
     else:
         alimentos_set = set()
         for mes in meses_ordenados[mes_orden[mes_inicio]:mes_orden[mes_fin]+1]:
-            nombre_archivo = f"{anio_seleccionado}_{fuente_seleccionada_tam}_{mes.lower()}_{opcion_seleccionada}.csv"
-            ruta_csv = os.path.join(carpeta_path, nombre_archivo)
-            if os.path.exists(ruta_csv):
-                sep = detectar_separador(ruta_csv)
-                df = pd.read_csv(ruta_csv, sep=sep)
+            ruta_csv = rutas_mes.get(mes.lower())
+            if ruta_csv:
+                df = carga.leer_csv(ruta_csv)
                 if "Alimentos" in df.columns:
                     alimentos_set.update(df["Alimentos"].dropna().unique())
 
@@ -357,11 +372,9 @@ with tab_tam_ytd:
             df_temporal = []
 
             for mes in meses_ordenados[mes_orden[mes_inicio]:mes_orden[mes_fin]+1]:
-                nombre_archivo = f"{anio_seleccionado}_{fuente_seleccionada_tam}_{mes.lower()}_{opcion_seleccionada}.csv"
-                ruta_csv = os.path.join(carpeta_path, nombre_archivo)
-                if os.path.exists(ruta_csv):
-                    sep = detectar_separador(ruta_csv)
-                    df = pd.read_csv(ruta_csv, sep=sep)
+                ruta_csv = rutas_mes.get(mes.lower())
+                if ruta_csv:
+                    df = carga.leer_csv(ruta_csv)
                     if "Alimentos" in df.columns and "Nivel" in df.columns:
                         df_temporal.append(df)
                     break
@@ -392,119 +405,132 @@ with tab_tam_ytd:
                     st.session_state[pagina_key_nivel] = nueva_pagina
 
                 key_global = key_safe("seleccion", anio_seleccionado, "YTD", "YTD", str(nivel).replace(".", "_"))
-                productos_seleccionados.extend(st.session_state.get(key_global, []))
+                productos_seleccionados.extend(alimentos_seleccionados(key_global))
     if productos_seleccionados:
-        dfs_ytd = []
-        for mes in meses_ordenados[mes_orden[mes_inicio]:mes_orden[mes_fin]+1]:
-            nombre_archivo = f"{anio_seleccionado}_{fuente_seleccionada_tam}_{mes.lower()}_{opcion_seleccionada}.csv"
-            ruta_csv = os.path.join(carpeta_path, nombre_archivo)
-            if os.path.exists(ruta_csv):
-                sep = detectar_separador(ruta_csv)
-                df = pd.read_csv(ruta_csv, sep=sep)
-                if "Alimentos" in df.columns:
-                    df_filtrado = df[df["Alimentos"].isin(productos_seleccionados)].copy()
-                    df_filtrado["Mes"] = mes
-                    dfs_ytd.append(df_filtrado)
-
-    if dfs_ytd:
-        df_ytd_total = pd.concat(dfs_ytd, ignore_index=True)
-
-        columnas_numericas = df_ytd_total.select_dtypes(include=["number"]).columns.tolist()
-        columnas_numericas = [col for col in columnas_numericas if col not in ["Nivel"]]
-
-        if not columnas_numericas:
-            st.warning("No se encontraron columnas numéricas para calcular YTD.")
+        # Con las tablas precalculadas el YTD es la resta de dos prefijos, sin leer un CSV por mes
+        if usar_acumulados:
+            df_ytd_sumado = acumulados.ytd(fuente_seleccionada_tam, opcion_seleccionada, anio_seleccionado,
+                                           mes_inicio, mes_fin, alimentos=productos_seleccionados)
         else:
-            df_ytd_sumado = df_ytd_total.groupby("Alimentos")[columnas_numericas].sum().reset_index()
+            dfs_ytd = []
+            for mes in meses_ordenados[mes_orden[mes_inicio]:mes_orden[mes_fin]+1]:
+                ruta_csv = rutas_mes.get(mes.lower())
+                if ruta_csv:
+                    df = carga.leer_csv(ruta_csv)
+                    if "Alimentos" in df.columns:
+                        df_filtrado = df[df["Alimentos"].isin(productos_seleccionados)].copy()
+                        df_filtrado["Mes"] = mes
+                        dfs_ytd.append(df_filtrado)
+            df_ytd_sumado = sumar_por_alimento(dfs_ytd)
 
+    if not df_ytd_sumado.empty:
+        columnas_valores = [col for col in df_ytd_sumado.columns
+                        if col not in ["Alimentos", "Nivel", "Mes"] and pd.api.types.is_numeric_dtype(df_ytd_sumado[col])]
 
-            csv_ytd = df_ytd_sumado.to_csv(index=False).encode('utf-8')
+        if not columnas_valores:
+            st.warning("No hay columnas numéricas disponibles para calcular YTD.")
+            st.stop()
+        else:
+            # Los ficheros se generan al pulsar cada botón, no en cada rerun
             st.download_button(
                 label="⬇️ Descargar YTD en CSV",
-                data=csv_ytd,
+                data=exportar.diferido(exportar.csv, df_ytd_sumado),
                 file_name=f"YTD_{anio_seleccionado}_{opcion_seleccionada}.csv",
                 mime="text/csv"
             )
 
-        for col in df_ytd_total.columns:
-            if col not in ["Alimentos", "Nivel", "Mes"]:
-                df_ytd_total[col] = pd.to_numeric(df_ytd_total[col], errors='coerce')
-
-        columnas_valores = [col for col in df_ytd_total.columns
-                        if col not in ["Alimentos", "Nivel", "Mes"] and pd.api.types.is_numeric_dtype(df_ytd_total[col])]
-
-        if not columnas_valores:
-            st.warning("No hay columnas numéricas disponibles para calcular YTD.")
-            st.stop()
-        else:
             columna_valor = st.multiselect("Selecciona la columna para calcular YTD:", columnas_valores)
-            df_resultado = df_ytd_total.groupby("Alimentos")[columna_valor].sum().reset_index()
+            df_resultado = df_ytd_sumado[["Alimentos"] + columna_valor]
             df_resultado = df_resultado.sort_values(by=columna_valor, ascending=False)
             st.subheader("📊 Resultados acumulados YTD")
             st.dataframe(df_resultado)
 
             # Botón para descargar YTD en CSV
-            csv_ytd_resultado = df_resultado.to_csv(index=False).encode('utf-8')
             st.download_button(
                 label="⬇️ Descargar YTD (Resultados) en CSV",
-                data=csv_ytd_resultado,
+                data=exportar.diferido(exportar.csv, df_resultado),
                 file_name=f"YTD_resultados_{anio_seleccionado}_{opcion_seleccionada}.csv",
                 mime="text/csv"
             )
 
             # Botón para descargar YTD en Excel
-            excel_ytd_resultado = io.BytesIO()
-            with pd.ExcelWriter(excel_ytd_resultado, engine='xlsxwriter') as writer:
-                df_resultado.to_excel(writer, index=False, sheet_name='YTD Resultados')
-            excel_ytd_resultado.seek(0)
             st.download_button(
                 label="📥 Descargar YTD (Resultados) en Excel",
-                data=excel_ytd_resultado,
+                data=exportar.diferido(exportar.excel, {"YTD Resultados": df_resultado}),
                 file_name=f"YTD_resultados_{anio_seleccionado}_{opcion_seleccionada}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
 
-            # --- CALCULAR TAM (suma todo el año para la misma selección) ---
-            dfs_tam = []
-            for mes in meses_ordenados:
-                nombre_archivo = f"{anio_seleccionado}_{fuente_seleccionada_tam}_{mes.lower()}_{opcion_seleccionada}.csv"
-                ruta_csv = os.path.join(carpeta_path, nombre_archivo)
-                if os.path.exists(ruta_csv):
-                    sep = detectar_separador(ruta_csv)
-                    df = pd.read_csv(ruta_csv, sep=sep)
-                    if "Alimentos" in df.columns:
-                        df_filtrado = df[df["Alimentos"].isin(productos_seleccionados)].copy()
-                        df_filtrado["Mes"] = mes
-                        dfs_tam.append(df_filtrado)
-
-            if dfs_tam:
-                df_tam_total = pd.concat(dfs_tam, ignore_index=True)
-                for col in df_tam_total.columns:
-                    if col not in ["Alimentos", "Nivel", "Mes"]:
-                        df_tam_total[col] = pd.to_numeric(df_tam_total[col], errors='coerce')
-
-                df_tam_resultado = df_tam_total.groupby("Alimentos")[columna_valor].sum().reset_index()
-                df_tam_resultado = df_tam_resultado.sort_values(by=columna_valor, ascending=False)
-                st.subheader("📈 Resultados acumulados TAM (año completo)")
+            # --- CALCULAR TAM ---
+            if usar_acumulados:
+                # TAM: los 12 meses que terminan en el último mes publicado del año (una sola búsqueda)
+                df_tam_sumado, mes_tam = acumulados.tam(fuente_seleccionada_tam, opcion_seleccionada, anio_seleccionado,
+                                                        alimentos=productos_seleccionados)
+                titulo_tam = f"📈 Resultados acumulados TAM (12 meses hasta {mes_tam} {anio_seleccionado})"
+            else:
+                # Sin tablas precalculadas: la misma ventana de 12 meses, sumando los CSV de este
+                # año y del anterior (los meses sin CSV cuentan como 0, igual que en las tablas)
+                ficheros_segmento = ficheros_tam[ficheros_tam["Segmento"].str.upper() == opcion_seleccionada]
+                rutas_periodo = {acumulados.periodo(a, m): r for a, m, r in
+                                 zip(ficheros_segmento["Año"], ficheros_segmento["Mes"], ficheros_segmento["Ruta"])}
+                fin_tam = max((p for p in rutas_periodo if p // 12 == int(anio_seleccionado)), default=None)
+                mes_tam = acumulados.MESES[fin_tam % 12] if fin_tam is not None else None
+                df_tam_sumado = pd.DataFrame(columns=["Alimentos"])
+                # Sin 12 meses de historia no hay TAM
+                if fin_tam is not None and min(rutas_periodo) <= fin_tam - 11:
+                    dfs_tam = []
+                    for p in range(fin_tam - 11, fin_tam + 1):
+                        ruta_csv = rutas_periodo.get(p)
+                        if ruta_csv:
+                            df = carga.leer_csv(ruta_csv)
+                            if "Alimentos" in df.columns:
+                                df_filtrado = df[df["Alimentos"].isin(productos_seleccionados)].copy()
+                                df_filtrado["Mes"] = acumulados.MESES[p % 12]
+                                dfs_tam.append(df_filtrado)
+                    df_tam_sumado = sumar_por_alimento(dfs_tam)
+                titulo_tam = f"📈 Resultados acumulados TAM (12 meses hasta {mes_tam} {anio_seleccionado})"
+
+            if df_tam_sumado.empty or list(df_tam_sumado.columns) == ["Alimentos"]:
+                st.info(f"No hay 12 meses de datos hasta {anio_seleccionado} para calcular el TAM.")
+            else:
+                df_tam_resultado = df_tam_sumado[["Alimentos"] + [c for c in columna_valor if c in df_tam_sumado.columns]]
+                df_tam_resultado = df_tam_resultado.sort_values(by=[c for c in columna_valor if c in df_tam_resultado.columns], ascending=False)
+                st.subheader(titulo_tam)
                 st.dataframe(df_tam_resultado)
 
                 # Botón para descargar TAM en CSV
-                csv_tam_resultado = df_tam_resultado.to_csv(index=False).encode('utf-8')
                 st.download_button(
                     label="⬇️ Descargar TAM (Resultados) en CSV",
-                    data=csv_tam_resultado,
+                    data=exportar.diferido(exportar.csv, df_tam_resultado),
                     file_name=f"TAM_resultados_{anio_seleccionado}_{opcion_seleccionada}.csv",
                     mime="text/csv"
                 )
 
                 # Botón para descargar TAM en Excel
-                excel_tam_resultado = io.BytesIO()
-                with pd.ExcelWriter(excel_tam_resultado, engine='xlsxwriter') as writer:
-                    df_tam_resultado.to_excel(writer, index=False, sheet_name='TAM Resultados')
-                excel_tam_resultado.seek(0)
                 st.download_button(
                     label="📥 Descargar TAM (Resultados) en Excel",
-                    data=excel_tam_resultado,
+                    data=exportar.diferido(exportar.excel, {"TAM Resultados": df_tam_resultado}),
                     file_name=f"TAM_resultados_{anio_seleccionado}_{opcion_seleccionada}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
+
+                # Todo junto: un libro con una hoja por tabla, escrito de una sola pasada
+                tablas = {"YTD Resultados": df_resultado, "TAM Resultados": df_tam_resultado, "YTD completo": df_ytd_sumado}
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button(
+                        label="📦 Descargar YTD + TAM en un Excel",
+                        data=exportar.diferido(exportar.excel, tablas),
+                        file_name=f"YTD_TAM_{anio_seleccionado}_{opcion_seleccionada}.xlsx",
+                        mime=exportar.MIME["xlsx"]
+                    )
+                with col2:
+                    st.download_button(
+                        label="📦 Descargar YTD + TAM en ZIP (CSV)",
+                        data=exportar.diferido(exportar.comprimir, tablas),
+                        file_name=f"YTD_TAM_{anio_seleccionado}_{opcion_seleccionada}.zip",
+                        mime=exportar.MIME["zip"]
+                    )
+
+memoria.mostrar(st, {"Datos cargados": datos_cargados, "Datos acumulados": df_acumulado_total,
+                     "YTD": df_ytd_sumado})
@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import os
 import matplotlib.pyplot as plt
+from datos import almacen, carga, compacto, cubo, graficos, memoria
 
-CSV_MENSUAL = "CSV_Mensuales"
 CSV_ANUAL = "CSV_Anuales"
 
 st.title("📊 Comparador por Alimento: Meses vs Años")
@@ -12,23 +12,22 @@ st.title("📊 Comparador por Alimento: Meses vs Años")
 # Utilidades para cargar estructura de archivos
 # --------------------------
 
-def listar_estructura_mensual():
+def listar_estructura_mensual(fuente):
     estructura = {}
-    for f in os.listdir(CSV_MENSUAL):
-        if not f.endswith(".csv"):
-            continue
-        partes = f.replace(".csv", "").split("_")
-        if len(partes) >= 2:
-            mes = partes[0].capitalize()
-            anio = partes[1]
-            estructura.setdefault(anio, set()).add(mes)
+    if fuente is None:
+        return estructura
+    for anio, mes in cubo.periodos(fuente):
+        estructura.setdefault(anio, set()).add(mes.capitalize())
     return estructura  # dict { "2022": {"Enero", "Febrero", ...} }
 
 def listar_anios_anuais():
     return sorted([f.replace(".csv", "") for f in os.listdir(CSV_ANUAL)
                    if f.endswith(".csv") and f.replace(".csv", "").isdigit()])
 
-estructura_mensual = listar_estructura_mensual()
+# Los datos mensuales salen del cubo compartido (una fuente del almacén a la vez)
+fuentes_mensuales = cubo.fuentes()
+fuente_mensual = st.selectbox("Fuente de los datos mensuales", fuentes_mensuales) if fuentes_mensuales else None
+estructura_mensual = listar_estructura_mensual(fuente_mensual)
 anios_anuais = listar_anios_anuais()
 
 # Unir años encontrados en ambas fuentes
@@ -82,24 +81,22 @@ def cargar_datos(seleccion):
             path = os.path.join(CSV_ANUAL, f"{anio}.csv")
             try:
                 if os.path.exists(path):
-                    df = pd.read_csv(path, sep=";", encoding="utf-8-sig")
+                    df = carga.leer_csv(path, sep=";")
                     df["Origen"] = anio
-                    dfs.append(df)
+                    dfs.append(compacto.compactar(df) if compacto.ACTIVO else df)
             except Exception as e:
                 st.error(f"Error al cargar el archivo anual {anio}: {e}")
         
         for mes in datos["meses"]:
-            archivos = [f for f in os.listdir(CSV_MENSUAL)
-                        if f.startswith(f"{mes}_{anio}_") and f.endswith(".csv")]
-            for archivo in archivos:
-                try:
-                    df = pd.read_csv(os.path.join(CSV_MENSUAL, archivo), sep=";", encoding="utf-8-sig")
-                    df["Origen"] = f"{mes} {anio}"
-                    dfs.append(df)
-                except Exception as e:
-                    st.error(f"Error al cargar el archivo mensual {archivo}: {e}")
-                    
-    return pd.concat(dfs) if dfs else pd.DataFrame()
+            # Un recorte del cubo por mes en lugar de leer y concatenar un CSV por región/categoría
+            df = cubo.a_ancho(cubo.cortar(fuente_mensual, [anio], [mes]))
+            if df.empty:
+                continue
+            df["Origen"] = f"{mes} {anio} " + df[almacen.COLUMNA_SEGMENTO]
+            df = df.drop(columns=["Fuente", "Año", "Mes", almacen.COLUMNA_SEGMENTO])
+            dfs.append(compacto.compactar(df) if compacto.ACTIVO else df)
+
+    return compacto.concatenar(dfs) if dfs else pd.DataFrame()
 
 df_total = cargar_datos(seleccion_usuario)
 
@@ -122,6 +119,7 @@ if df_filtrado.empty:
 
 df_numerico = df_filtrado.drop(columns=["Alimentos"]).set_index("Origen").apply(pd.to_numeric, errors='coerce')
 df_numerico = df_numerico.transpose()
+df_numerico.columns = df_numerico.columns.astype(str)  # Origen puede venir como categórica
 
 st.subheader("📋 Indicadores")
 st.dataframe(df_numerico)
@@ -132,17 +130,28 @@ st.dataframe(df_numerico)
 
 st.subheader("📊 Comparativa Gráfica")
 
+# Las figuras se renderizan una vez por alimento y selección (graficos.png) y se cierran
+def dibujar_barras(df_numerico, alimento):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    df_numerico_sorted = df_numerico.sort_values(by=df_numerico.index[0], axis=1, ascending=False)  # Ordenar por el primer indicador
+    df_numerico_sorted.plot(kind="bar", ax=ax)
+    ax.set_title(f"Comparativa de {alimento}")
+    ax.tick_params(axis="x", rotation=45)
+    return fig
+
+
+def dibujar_evolucion(df_numerico):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    df_numerico.plot(marker='o', ax=ax)
+    ax.set_title("Evolución")
+    ax.tick_params(axis="x", rotation=45)
+    return fig
+
+
 # Gráfico de barras ordenado
-fig1, ax1 = plt.subplots(figsize=(10, 5))
-df_numerico_sorted = df_numerico.sort_values(by=df_numerico.columns[0], axis=1, ascending=False)  # Ordenar por la primera columna
-df_numerico_sorted.plot(kind="bar", ax=ax1)
-ax1.set_title(f"Comparativa de {alimento_sel}")
-plt.xticks(rotation=45)
-st.pyplot(fig1)
+st.image(graficos.png(dibujar_barras, df_numerico, alimento_sel), width="stretch")
 
 # Gráfico de evolución
-fig2, ax2 = plt.subplots(figsize=(10, 5))
-df_numerico.plot(marker='o', ax=ax2)
-ax2.set_title("Evolución")
-plt.xticks(rotation=45)
-st.pyplot(fig2)
+st.image(graficos.png(dibujar_evolucion, df_numerico), width="stretch")
+
+memoria.mostrar(st, {"Datos seleccionados": df_total, "Indicadores": df_numerico})
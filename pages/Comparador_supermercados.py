@@ -0,0 +1,46 @@
+import streamlit as st
+from datos import exportar
+from scrapers import supermercados
+
+st.title("Comparador de precios en supermercados")
+
+alimento = st.text_input("¿Qué alimento quieres comparar?")
+elegidos = st.multiselect("Supermercados", list(supermercados.NOMBRES),
+                          default=list(supermercados.NOMBRES), format_func=supermercados.NOMBRES.get)
+
+if st.button("Comparar") and alimento and elegidos:
+    st.info(f"Buscando **{alimento}** en {', '.join(supermercados.NOMBRES[s] for s in elegidos)}")
+
+    # Todos los supermercados se buscan a la vez; la tabla se rehace con cada uno que termina
+    respuestas = []
+    progreso = st.progress(0.0, text="Buscando...")
+    avisos = st.container()
+    tabla = st.empty()
+    for hechos, respuesta in enumerate(supermercados.buscar_en_todos(alimento, elegidos), start=1):
+        respuestas.append(respuesta)
+        nombre = supermercados.NOMBRES[respuesta.supermercado]
+        progreso.progress(hechos / len(elegidos), text=f"Buscando... {hechos}/{len(elegidos)} ({nombre} listo)")
+        if respuesta.error:
+            avisos.error(f"{nombre}: {respuesta.error}")
+        else:
+            avisos.caption(f"✅ {nombre}: {len(respuesta.resultado.productos)} productos (vía {respuesta.resultado.via})")
+        tabla.dataframe(supermercados.comparativa(respuestas), hide_index=True)
+    progreso.empty()
+
+    df = supermercados.comparativa(respuestas)
+    if df.empty:
+        tabla.empty()
+        st.warning("No se encontraron productos.")
+    else:
+        st.subheader("Resumen por supermercado")
+        resumen = df.groupby("Supermercado")["Precio (€)"].agg(
+            Productos="size", Mínimo="min", Mediana="median", Máximo="max").reset_index()
+        st.dataframe(resumen.round(2), hide_index=True)
+
+        # Botón para descargar el archivo Excel (se genera al pulsarlo)
+        st.download_button(
+            label="Descargar en Excel",
+            data=exportar.diferido(exportar.excel, {"Comparativa": df, "Resumen": resumen}),
+            file_name=f"comparativa_{alimento}.xlsx",
+            mime=exportar.MIME["xlsx"]
+        )
@@ -2,8 +2,42 @@ import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
+from datos import carga, exportar, graficos, memoria
 from pathlib import Path
-import io
+
+# --------------------- GRÁFICOS ---------------------
+# Cada función dibuja y devuelve la figura; graficos.png() la renderiza una vez por
+# combinación de datos y parámetros y reutiliza los bytes para mostrar y descargar
+
+def dibujar_barras(df, categoria, valor, alimento):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sns.barplot(data=df, x=categoria, y=valor, hue="Fuente", ax=ax)
+    ax.tick_params(axis="x", rotation=45)
+    ax.set_title(f"Comparación de '{valor}' entre archivos para '{alimento}'")
+    return fig
+
+
+def dibujar_lineas(df, categoria, valor, alimento):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sns.lineplot(data=df, x=categoria, y=valor, hue="Fuente", marker='o', ax=ax)
+    ax.set_title(f"Comparación de '{valor}' en línea para '{alimento}'")
+    return fig
+
+
+def dibujar_histograma(serie, valor, alimento):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sns.histplot(serie, kde=True, ax=ax)
+    ax.set_title(f"Distribución de '{valor}' para '{alimento}'")
+    return fig
+
+
+def dibujar_diferencias(df_diferencias, valor, alimento):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    df_diferencias.set_index("Año")[valor].plot(kind="bar", ax=ax, color=["skyblue", "lightgreen", "orange"])
+    ax.set_title(f"Comparativa de valores y diferencia porcentual para '{alimento}'")
+    ax.set_ylabel(valor)
+    return fig
+
 
 st.title("📊 Comparar datos entre dos archivos CSV")
 
@@ -23,8 +57,8 @@ else:
         archivo_2 = st.selectbox("Selecciona el segundo CSV (2023)", [f for f in nombres_csv if f != archivo_1], key="csv2")
 
     # Cargar datos
-    df1 = pd.read_csv(Path(CARPETA_CSV) / archivo_1)
-    df2 = pd.read_csv(Path(CARPETA_CSV) / archivo_2)
+    df1 = carga.leer_csv(Path(CARPETA_CSV) / archivo_1)
+    df2 = carga.leer_csv(Path(CARPETA_CSV) / archivo_2)
 
     columnas_texto_1 = df1.select_dtypes(include='object').columns.tolist()
     columnas_num_1 = df1.select_dtypes(include='number').columns.tolist()
@@ -59,37 +93,21 @@ else:
             st.subheader(f"Gráficos de comparación para '{alimento_seleccionado}'")
             
             # Gráfico de barras
-            fig1, ax1 = plt.subplots(figsize=(12, 6))
-            sns.barplot(data=df_filtrado, x=categoria, y=valor, hue="Fuente", ax=ax1)
-            plt.xticks(rotation=45)
-            ax1.set_title(f"Comparación de '{valor}' entre archivos para '{alimento_seleccionado}'")
-            st.pyplot(fig1)
-
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format="png")
-            st.download_button("📥 Descargar gráfico de barras (PNG)", data=buf1.getvalue(),
+            png_barras = graficos.png(dibujar_barras, df_filtrado, categoria, valor, alimento_seleccionado)
+            st.image(png_barras, width="stretch")
+            st.download_button("📥 Descargar gráfico de barras (PNG)", data=png_barras,
                                file_name=f"grafico_barras_{alimento_seleccionado}.png", mime="image/png")
-            
+
             # Gráfico de líneas
-            fig2, ax2 = plt.subplots(figsize=(12, 6))
-            sns.lineplot(data=df_filtrado, x=categoria, y=valor, hue="Fuente", marker='o', ax=ax2)
-            ax2.set_title(f"Comparación de '{valor}' en línea para '{alimento_seleccionado}'")
-            st.pyplot(fig2)
-
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format="png")
-            st.download_button("📥 Descargar gráfico de líneas (PNG)", data=buf2.getvalue(),
+            png_lineas = graficos.png(dibujar_lineas, df_filtrado, categoria, valor, alimento_seleccionado)
+            st.image(png_lineas, width="stretch")
+            st.download_button("📥 Descargar gráfico de líneas (PNG)", data=png_lineas,
                                file_name=f"grafico_lineas_{alimento_seleccionado}.png", mime="image/png")
 
             # Histograma
-            fig3, ax3 = plt.subplots(figsize=(12, 6))
-            sns.histplot(df_filtrado[valor], kde=True, ax=ax3)
-            ax3.set_title(f"Distribución de '{valor}' para '{alimento_seleccionado}'")
-            st.pyplot(fig3)
-
-            buf3 = io.BytesIO()
-            fig3.savefig(buf3, format="png")
-            st.download_button("📥 Descargar histograma (PNG)", data=buf3.getvalue(),
+            png_histograma = graficos.png(dibujar_histograma, df_filtrado[valor], valor, alimento_seleccionado)
+            st.image(png_histograma, width="stretch")
+            st.download_button("📥 Descargar histograma (PNG)", data=png_histograma,
                                file_name=f"histograma_{alimento_seleccionado}.png", mime="image/png")
 
         with tab2:
@@ -100,19 +118,15 @@ else:
             st.subheader("🔽 Exportar resultados")
             st.download_button(
                 label="📥 Descargar tabla filtrada (CSV)",
-                data=df_filtrado.to_csv(index=False),
+                data=exportar.diferido(exportar.csv, df_filtrado),
                 file_name=f"datos_filtrados_{alimento_seleccionado}.csv",
                 mime="text/csv"
             )
 
             # Exportar tabla como Excel
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                df_filtrado.to_excel(writer, index=False, sheet_name="DatosFiltrados")
-
             st.download_button(
                 label="📥 Descargar tabla en Excel",
-                data=excel_buffer.getvalue(),
+                data=exportar.diferido(exportar.excel, {"DatosFiltrados": df_filtrado}),
                 file_name=f"tabla_filtrada_{alimento_seleccionado}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
@@ -141,17 +155,13 @@ else:
                 st.write(f"Diferencia porcentual entre 2022 y 2023 para '{alimento_seleccionado}'")
                 st.dataframe(df_diferencias)
 
-                fig4, ax4 = plt.subplots(figsize=(12, 6))
-                df_diferencias.set_index("Año")[valor].plot(kind="bar", ax=ax4, color=["skyblue", "lightgreen", "orange"])
-                ax4.set_title(f"Comparativa de valores y diferencia porcentual para '{alimento_seleccionado}'")
-                ax4.set_ylabel(valor)
-                st.pyplot(fig4)
-
-                buf4 = io.BytesIO()
-                fig4.savefig(buf4, format="png")
-                st.download_button("📥 Descargar gráfico de diferencias (PNG)", data=buf4.getvalue(),
+                png_diferencias = graficos.png(dibujar_diferencias, df_diferencias, valor, alimento_seleccionado)
+                st.image(png_diferencias, width="stretch")
+                st.download_button("📥 Descargar gráfico de diferencias (PNG)", data=png_diferencias,
                                    file_name=f"diferencias_{alimento_seleccionado}.png", mime="image/png")
             else:
                 st.error("No se encontraron datos para el alimento seleccionado en ambos archivos.")
     else:
         st.error("Los CSV no tienen columnas comunes para comparar.")
+
+    memoria.mostrar(st, {archivo_1: df1, archivo_2: df2})
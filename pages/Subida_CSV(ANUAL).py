@@ -1,8 +1,8 @@
 # Archivo: pages/4_subida_archivos.py
 
 import streamlit as st
-import pandas as pd
 from pathlib import Path
+from datos import carga
 
 st.title("📤 Subida de nuevos archivos CSV")
 
@@ -22,7 +22,7 @@ if archivo_subido:
 
         # Vista previa
         try:
-            df_vista = pd.read_csv(ruta_destino)
+            df_vista = carga.leer_csv(ruta_destino)
             st.subheader("👀 Vista previa del archivo subido")
             st.dataframe(df_vista.head())
         except Exception as e:
@@ -1,23 +1,19 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import matplotlib.pyplot as plt
+from datos import carga, diferencias, memoria, ranking
 
 # --------------------- FUNCIONES ---------------------
 
-def graficar_diferencias(df, categoria, valor_base, valor_comparado, tipo="absoluta", top_n=20, titulo=""):
+def graficar_diferencias(df, categoria, tipo="absoluta", top_n=20, titulo="", por_nivel=False):
     """
-    Grafica diferencias absolutas o porcentuales entre dos columnas de un DataFrame agrupado por categoría.
+    Grafica las top_n mayores diferencias (en valor absoluto) de una tabla de diferencias.py,
+    que ya trae las columnas Diferencia y Diferencia %. Con por_nivel, las top_n de cada Nivel.
     """
-    df_plot = df.copy()
-    df_plot = df_plot[df_plot[valor_base] != 0]  # Evitar divisiones por cero
+    grupos = df["Nivel"].to_numpy() if por_nivel and "Nivel" in df.columns else None
+    df_plot = df.iloc[ranking.top_k(df["Diferencia"].to_numpy(), top_n, por_magnitud=True, grupos=grupos)]
 
-    df_plot["Diferencia"] = df_plot[valor_comparado] - df_plot[valor_base]
-    df_plot["Diferencia %"] = (df_plot["Diferencia"] / df_plot[valor_base]) * 100
-    df_plot["abs_diff"] = df_plot["Diferencia"].abs()
-    df_plot = df_plot.sort_values("abs_diff", ascending=False).head(top_n)
-
-    fig, ax = plt.subplots(figsize=(12, 0.5 * top_n + 2))
+    fig, ax = plt.subplots(figsize=(12, 0.5 * len(df_plot) + 2))
 
     if tipo == "porcentual":
         valores = df_plot["Diferencia %"]
@@ -26,7 +22,10 @@ def graficar_diferencias(df, categoria, valor_base, valor_comparado, tipo="absol
         valores = df_plot["Diferencia"]
         xlabel = "Diferencia absoluta"
 
-    ax.barh(df_plot[categoria], valores, color="steelblue")
+    etiquetas = df_plot[categoria].astype(str)
+    if grupos is not None:
+        etiquetas = "N" + df_plot["Nivel"].astype("Int64").astype(str) + " · " + etiquetas
+    ax.barh(etiquetas, valores, color="steelblue")
     ax.axvline(0, color="gray", linestyle="--")
     ax.set_xlabel(xlabel)
     ax.set_title(titulo or f"Top {top_n} diferencias en '{categoria}'")
@@ -47,30 +46,35 @@ nombres_csv = [f.name for f in csv_paths]
 if len(nombres_csv) < 2:
     st.warning("Se necesitan al menos dos archivos CSV en la carpeta.")
 else:
-    col1, col2 = st.columns(2)
-    with col1:
-        archivo_1 = st.selectbox("Selecciona el primer CSV", nombres_csv, key="dif_csv1")
-    with col2:
-        archivo_2 = st.selectbox("Selecciona el segundo CSV", [f for f in nombres_csv if f != archivo_1], key="dif_csv2")
+    archivos = st.multiselect("Selecciona los CSV a comparar (dos o más)", nombres_csv, default=nombres_csv[:2], key="dif_csvs")
+    if len(archivos) < 2:
+        st.warning("Selecciona al menos dos archivos CSV.")
+        st.stop()
 
-    df1 = pd.read_csv(Path(CARPETA_CSV) / archivo_1)
-    df2 = pd.read_csv(Path(CARPETA_CSV) / archivo_2)
+    rutas = [Path(CARPETA_CSV) / a for a in archivos]
+    dfs = [carga.leer_csv(r) for r in rutas]
 
-    columnas_texto = list(set(df1.select_dtypes(include='object').columns) & set(df2.select_dtypes(include='object').columns))
-    columnas_numericas = list(set(df1.select_dtypes(include='number').columns) & set(df2.select_dtypes(include='number').columns))
+    columnas_texto = sorted(set.intersection(*(set(df.select_dtypes(include='object').columns) for df in dfs)))
+    columnas_numericas = sorted(set.intersection(*(set(df.select_dtypes(include='number').columns) for df in dfs)))
 
     if columnas_texto and columnas_numericas:
         categoria = st.selectbox("Columna categórica común", columnas_texto)
         valor = st.selectbox("Columna numérica común", columnas_numericas)
 
-        df1_reducido = df1[[categoria, valor]].dropna().groupby(categoria).mean().reset_index()
-        df2_reducido = df2[[categoria, valor]].dropna().groupby(categoria).mean().reset_index()
+        # Los N ficheros se alinean una vez (en caché); el resto de controles solo recortan la matriz
+        alineado = diferencias.alinear(rutas, categoria, valor)
+
+        if len(archivos) > 2:
+            st.subheader("🔀 Resumen de todos los pares")
+            st.dataframe(diferencias.resumen_pares(alineado), hide_index=True)
 
-        df_dif = pd.merge(df1_reducido, df2_reducido, on=categoria, suffixes=(f"_{archivo_1}", f"_{archivo_2}"))
-        df_dif = df_dif[df_dif[f"{valor}_{archivo_1}"] != 0]  # Excluir donde valor base es 0
+        col1, col2 = st.columns(2)
+        with col1:
+            archivo_1 = st.selectbox("Archivo base", archivos, key="dif_csv1")
+        with col2:
+            archivo_2 = st.selectbox("Archivo a comparar", [a for a in archivos if a != archivo_1], key="dif_csv2")
 
-        df_dif["Diferencia"] = df_dif[f"{valor}_{archivo_2}"] - df_dif[f"{valor}_{archivo_1}"]
-        df_dif["Diferencia %"] = (df_dif["Diferencia"] / df_dif[f"{valor}_{archivo_1}"]) * 100
+        df_dif = diferencias.par(alineado, archivos.index(archivo_1), archivos.index(archivo_2))
 
         st.subheader("📋 Tabla de diferencias")
         st.dataframe(df_dif[[categoria, f"{valor}_{archivo_1}", f"{valor}_{archivo_2}", "Diferencia", "Diferencia %"]])
@@ -86,21 +90,22 @@ Este gráfico compara el valor promedio de **'{valor}'** entre los archivos sele
 
         max_mostrar = st.slider("Cantidad máxima de categorías a mostrar", min_value=5, max_value=min(50, len(df_dif)), value=20)
         tipo_diferencia = st.radio("Tipo de diferencia a mostrar", ["absoluta", "porcentual"])
+        por_nivel = "Nivel" in df_dif.columns and st.checkbox("Mostrar el top de cada nivel de la jerarquía")
 
         fig, df_plot = graficar_diferencias(
             df=df_dif,
             categoria=categoria,
-            valor_base=f"{valor}_{archivo_1}",
-            valor_comparado=f"{valor}_{archivo_2}",
             tipo=tipo_diferencia,
             top_n=max_mostrar,
-            titulo=f"Diferencias de '{valor}' por '{categoria}' entre {archivo_1} y {archivo_2}"
+            titulo=f"Diferencias de '{valor}' por '{categoria}' entre {archivo_1} y {archivo_2}",
+            por_nivel=por_nivel
         )
 
         # Generar resumen textual del gráfico
         if not df_plot.empty:
-            mayor_aumento = df_plot.loc[df_plot["Diferencia"].idxmax()]
-            mayor_disminucion = df_plot.loc[df_plot["Diferencia"].idxmin()]
+            pos_aumento, pos_disminucion = ranking.extremos(df_plot["Diferencia"].to_numpy())
+            mayor_aumento = df_plot.iloc[pos_aumento]
+            mayor_disminucion = df_plot.iloc[pos_disminucion]
             num_subidas = (df_plot["Diferencia"] > 0).sum()
             num_bajadas = (df_plot["Diferencia"] < 0).sum()
             promedio_cambio = df_plot["Diferencia"].mean()
@@ -116,6 +121,9 @@ Este gráfico compara el valor promedio de **'{valor}'** entre los archivos sele
             st.markdown(resumen)
 
         st.pyplot(fig)
+        plt.close(fig)
 
     else:
         st.error("No hay columnas comunes de tipo texto y numérico para comparar.")
+
+    memoria.mostrar(st, dict(zip(archivos, dfs)))
@@ -0,0 +1 @@
+"""Consultas a las webs de los supermercados y a APIs externas de productos."""
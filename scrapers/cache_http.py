@@ -0,0 +1,143 @@
+"""
+Caché en disco de respuestas HTTP, compartida por todos los scrapers.
+
+scrapers.red la consulta en cada petición a un host que tenga caducidad
+configurada (los demás no se guardan nunca):
+
+    cache_http.configurar_ttl("supermercado.eroski.es", horas=6)
+
+Las respuestas se guardan en SQLite (.cache_scrapers/http.sqlite) por método,
+URL, parámetros y cuerpo JSON, con el estado, las cabeceras y el cuerpo tal cual.
+Mientras no caducan se sirven sin salir a la red ni esperar turno en el
+limitador; caducadas, si traían ETag o Last-Modified se revalidan con una
+petición condicional y un 304 las renueva sin volver a descargar el cuerpo. El
+fichero tiene un tamaño máximo (SCRAPERS_CACHE_MB, 256 por defecto): al pasarlo
+se borran las respuestas usadas hace más tiempo.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+FICHERO = os.path.join(".cache_scrapers", "http.sqlite")
+LIMITE_MB = int(os.environ.get("SCRAPERS_CACHE_MB", "256"))
+# Estados que son una respuesta definitiva (el resto, p. ej. 429 o 5xx, no se guarda)
+ESTADOS_CACHEABLES = (200, 203, 300, 301, 404, 410)
+CABECERAS_GUARDADAS = ("content-type", "etag", "last-modified")
+
+# status, url final, cabeceras (dict), contenido (bytes), instante en que se descargó o revalidó
+Entrada = namedtuple("Entrada", ["status", "url", "cabeceras", "contenido", "guardado"])
+
+_lock = threading.Lock()
+_local = threading.local()  # una conexión SQLite por hilo
+_ttl = {}  # host -> segundos
+
+
+def configurar_ttl(host, horas):
+    """Las respuestas de `host` se guardan y se sirven de la caché durante `horas`."""
+    with _lock:
+        _ttl[host] = horas * 3600
+
+
+def ttl(host):
+    """Segundos de caducidad de `host`, o None si sus respuestas no se guardan."""
+    with _lock:
+        return _ttl.get(host)
+
+
+def _conexion():
+    conexion = getattr(_local, "conexion", None)
+    if conexion is None:
+        os.makedirs(os.path.dirname(FICHERO), exist_ok=True)
+        conexion = sqlite3.connect(FICHERO, timeout=30, isolation_level=None)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("""CREATE TABLE IF NOT EXISTS respuestas (
+            clave TEXT PRIMARY KEY, host TEXT, status INTEGER, url TEXT, cabeceras TEXT,
+            contenido BLOB, tamano INTEGER, guardado REAL, usado REAL)""")
+        conexion.execute("CREATE INDEX IF NOT EXISTS respuestas_usado ON respuestas (usado)")
+        _local.conexion = conexion
+    return conexion
+
+
+def _clave(peticion):
+    return hashlib.sha1(json.dumps(peticion, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def leer(peticion):
+    """La Entrada guardada para `peticion` (método, url, params, json), caducada o no; None si no hay."""
+    clave = _clave(peticion)
+    conexion = _conexion()
+    fila = conexion.execute("SELECT status, url, cabeceras, contenido, guardado FROM respuestas WHERE clave = ?",
+                            (clave,)).fetchone()
+    if fila is None:
+        return None
+    conexion.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (time.time(), clave))
+    status, url, cabeceras, contenido, guardado = fila
+    return Entrada(status, url, json.loads(cabeceras), contenido, guardado)
+
+
+def vigente(entrada, host):
+    segundos = ttl(host)
+    return segundos is not None and time.time() - entrada.guardado < segundos
+
+
+def validadores(entrada):
+    """Cabeceras de la petición condicional que revalida `entrada` (vacío si no trae ETag ni Last-Modified)."""
+    cabeceras = {}
+    if "etag" in entrada.cabeceras:
+        cabeceras["If-None-Match"] = entrada.cabeceras["etag"]
+    if "last-modified" in entrada.cabeceras:
+        cabeceras["If-Modified-Since"] = entrada.cabeceras["last-modified"]
+    return cabeceras
+
+
+def guardar(peticion, host, status, url, cabeceras, contenido):
+    """Guarda la respuesta si es definitiva y cabe; después recorta el fichero al LIMITE_MB."""
+    limite = LIMITE_MB * 1024 * 1024
+    # Una respuesta enorme (p. ej. un Excel) no puede echar al resto de la caché
+    if status not in ESTADOS_CACHEABLES or len(contenido) > limite // 10:
+        return
+    if "no-store" in cabeceras.get("cache-control", "").lower():
+        return
+    guardadas = {k.lower(): v for k, v in cabeceras.items() if k.lower() in CABECERAS_GUARDADAS}
+    ahora = time.time()
+    conexion = _conexion()
+    conexion.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (_clave(peticion), host, status, url, json.dumps(guardadas), contenido, len(contenido),
+                      ahora, ahora))
+    _recortar(conexion, limite)
+
+
+def renovar(peticion):
+    """Tras un 304: la respuesta guardada vuelve a contar como recién descargada."""
+    _conexion().execute("UPDATE respuestas SET guardado = ? WHERE clave = ?", (time.time(), _clave(peticion)))
+
+
+def _recortar(conexion, limite):
+    total = conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+    if total <= limite:
+        return
+    # Se borran las menos usadas recientemente hasta dejar un 10 % de margen
+    sobran = total - int(limite * 0.9)
+    for clave, tamano in conexion.execute("SELECT clave, tamano FROM respuestas ORDER BY usado").fetchall():
+        if sobran <= 0:
+            break
+        conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+        sobran -= tamano
+
+
+def limpiar_cache(host=None):
+    """Borra todas las respuestas guardadas, o solo las de `host`."""
+    conexion = _conexion()
+    if host is None:
+        conexion.execute("DELETE FROM respuestas")
+    else:
+        conexion.execute("DELETE FROM respuestas WHERE host = ?", (host,))
+
+
+def estadisticas_cache():
+    respuestas, tamano = _conexion().execute("SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()
+    return {"respuestas": respuestas, "mb": round(tamano / 1024 / 1024, 1)}
@@ -0,0 +1,128 @@
+"""
+Búsqueda de productos en el supermercado online de Eroski y de sus fichas.
+
+La búsqueda devuelve los enlaces a las fichas de producto; el precio, la
+valoración y las reseñas están en cada ficha, así que hay que descargarlas todas.
+consultar_detalles() las pide en un pool de hilos sobre la sesión compartida de
+scrapers.red (keep-alive, reintentos y timeout), con un ritmo máximo por host
+(EROSKI_PETICIONES_SEGUNDO, 5 por defecto) para no cargar la web, y va
+devolviendo cada ficha en cuanto llega. La búsqueda y las fichas se guardan en la
+caché HTTP en disco (EROSKI_CACHE_HORAS, 6 por defecto), así que repetir una
+búsqueda no vuelve a descargar nada:
+
+    productos = eroski.buscar("leche")           # [(título, url), ...]
+    for posicion, detalles in eroski.consultar_detalles([url for _, url in productos]):
+        ...
+
+La URL de la web se puede cambiar con EROSKI_URL (p. ej. un servidor local de
+pruebas con fichas guardadas).
+"""
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from scrapers import cache_http, red
+
+URL_BASE = os.environ.get("EROSKI_URL", "https://supermercado.eroski.es")
+HILOS = 6
+PETICIONES_SEGUNDO = float(os.environ.get("EROSKI_PETICIONES_SEGUNDO", "5"))
+RAFAGA = 5
+CACHE_HORAS = float(os.environ.get("EROSKI_CACHE_HORAS", "6"))
+
+red.configurar_ritmo(urlsplit(URL_BASE).netloc, PETICIONES_SEGUNDO, rafaga=RAFAGA)
+cache_http.configurar_ttl(urlsplit(URL_BASE).netloc, CACHE_HORAS)
+
+
+def quitar_acentos(texto):
+    nfkd_form = unicodedata.normalize('NFKD', texto)
+    return ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
+
+
+def buscar(alimento):
+    """(título, url de la ficha) de los productos cuyo nombre contiene `alimento`, sin repetir."""
+    alimento_limpio = quitar_acentos(alimento)
+    respuesta = red.get(f"{URL_BASE}/es/search/results/", params={'q': alimento_limpio, 'suggestionsFilter': 'false'})
+    respuesta.raise_for_status()
+    soup = BeautifulSoup(respuesta.content, 'html.parser')
+
+    productos = []
+    vistos = set()
+    buscado = alimento_limpio.lower()
+    for link in soup.find_all('a', href=lambda href: href and '/productdetail/' in href):
+        href = link['href']
+        titulo = link.text.strip()
+        if href in vistos or buscado not in quitar_acentos(titulo).lower():
+            continue
+        vistos.add(href)
+        productos.append((titulo, f"{URL_BASE}{href}"))
+    return productos
+
+
+def _valoracion(soup):
+    # Método 1: barra de porcentaje
+    rating_div = soup.find('div', class_='ratingPercentBar')
+    if rating_div:
+        barra_porcentaje = rating_div.find('div')
+        if barra_porcentaje and 'width' in barra_porcentaje.get('style', ''):
+            porcentaje = int(barra_porcentaje['style'].split(':')[1].replace('%', '').strip())
+            return round(porcentaje / 20, 1)
+
+    # Método 2: meta tag de valoración
+    rating_meta = soup.find('meta', {'itemprop': 'ratingValue'})
+    if rating_meta:
+        try:
+            return float(rating_meta['content'])
+        except ValueError:
+            pass
+
+    # Método 3: texto en el subtítulo con regex
+    rating_text = soup.find('div', class_='ratingSubtitle')
+    if rating_text:
+        match = re.search(r'([\d,]+)\s+de\s+5', rating_text.get_text())
+        if match:
+            try:
+                return float(match.group(1).replace(',', '.'))
+            except ValueError:
+                pass
+    return None
+
+
+def detalles_ficha(html):
+    """Precio, valoración y reseñas a partir del HTML de una ficha de producto."""
+    soup = BeautifulSoup(html, 'html.parser')
+    precio_span = soup.find('span', {'itemprop': 'price', 'class': 'offer-now'})
+    valoracion = _valoracion(soup)
+    return {
+        'precio': precio_span.get_text(strip=True).replace('€', '').strip() if precio_span else 'No disponible',
+        'valoracion': f"{valoracion:.1f} estrellas" if valoracion is not None else 'Sin valoración',
+        'reseñas': [reseña.get_text(strip=True) for reseña in soup.find_all('div', class_='reviewText')],
+    }
+
+
+def obtener_detalles(url_producto):
+    """Detalles de una ficha; si la petición falla, el error va en el precio."""
+    try:
+        respuesta = red.get(url_producto)
+        if respuesta.status_code != 200:
+            return {'precio': 'Error página', 'valoracion': '0', 'reseñas': []}
+        return detalles_ficha(respuesta.content)
+    except Exception as e:
+        return {'precio': f'Error: {str(e)}', 'valoracion': '0', 'reseñas': []}
+
+
+def consultar_detalles(urls, hilos=HILOS):
+    """Genera (posición en `urls`, detalles) en orden de llegada."""
+    if not urls:
+        return
+    pool = ThreadPoolExecutor(max_workers=hilos)
+    try:
+        futuros = {pool.submit(obtener_detalles, url): i for i, url in enumerate(urls)}
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+    finally:
+        # Si la página deja de consumir (rerun), no se espera a las fichas que faltan
+        pool.shutdown(wait=False, cancel_futures=True)
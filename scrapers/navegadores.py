@@ -0,0 +1,180 @@
+"""
+Pool de navegadores Chrome headless compartido por el proceso.
+
+Arrancar Chrome (y resolver el chromedriver con webdriver_manager) cuesta varios
+segundos, así que los navegadores no se cierran al terminar una búsqueda: vuelven
+al pool y la siguiente búsqueda, de esta sesión o de otra, usa uno ya caliente.
+El número de navegadores abiertos a la vez está acotado (PANEL_NAVEGADORES, 2 por
+defecto): con más búsquedas simultáneas, las demás esperan turno en vez de lanzar
+un Chrome cada una. Antes de prestar un navegador se comprueba que sigue vivo, y
+tras PANEL_NAVEGADOR_USOS búsquedas (50) se cierra y se arranca otro limpio.
+
+    driver = navegadores.tomar()
+    try:
+        driver.get(url)
+    finally:
+        navegadores.devolver(driver)
+"""
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+TAMANO_POOL = int(os.environ.get("PANEL_NAVEGADORES", "2"))
+USOS_MAXIMOS = int(os.environ.get("PANEL_NAVEGADOR_USOS", "50"))
+# Segundos que se espera a que quede un navegador libre
+ESPERA_MAXIMA = 120
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+_lock = threading.Lock()
+_lock_driver = threading.Lock()  # aparte: resolver el driver puede tardar (descarga)
+_plazas = threading.BoundedSemaphore(TAMANO_POOL)
+_libres = []  # navegadores arrancados y sin usar
+_usos = {}  # navegador -> búsquedas hechas
+_ruta_driver = None
+_calentando = False
+
+
+def ruta_driver():
+    """Ruta del chromedriver, resuelta una sola vez por proceso."""
+    global _ruta_driver
+    with _lock_driver:
+        if _ruta_driver is None:
+            _ruta_driver = ChromeDriverManager().install()
+        return _ruta_driver
+
+
+def _opciones():
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    return options
+
+
+def _arrancar():
+    driver = webdriver.Chrome(service=Service(ruta_driver()), options=_opciones())
+    with _lock:
+        _usos[driver] = 0
+    return driver
+
+
+def _cerrar(driver):
+    with _lock:
+        _usos.pop(driver, None)
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+def _vivo(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except WebDriverException:
+        return False
+
+
+def tomar(espera=ESPERA_MAXIMA):
+    """Un navegador listo para usar; hay que devolverlo con devolver() al terminar."""
+    if not _plazas.acquire(timeout=espera):
+        raise TimeoutError("No hay navegadores libres; inténtalo de nuevo en unos segundos.")
+    try:
+        while True:
+            with _lock:
+                driver = _libres.pop() if _libres else None
+            if driver is None:
+                return _arrancar()
+            if _vivo(driver):
+                return driver
+            _cerrar(driver)
+    except BaseException:
+        _plazas.release()
+        raise
+
+
+def devolver(driver):
+    """Devuelve el navegador al pool (o lo cierra si está roto o ya ha hecho USOS_MAXIMOS búsquedas)."""
+    try:
+        with _lock:
+            _usos[driver] = _usos.get(driver, 0) + 1
+            agotado = _usos[driver] >= USOS_MAXIMOS
+        if agotado or not _vivo(driver):
+            _cerrar(driver)
+            return
+        try:
+            # Sin la página anterior en memoria ni sus cookies para la siguiente búsqueda
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except WebDriverException:
+            _cerrar(driver)
+            return
+        with _lock:
+            _libres.append(driver)
+    finally:
+        _plazas.release()
+
+
+@contextmanager
+def navegador(espera=ESPERA_MAXIMA):
+    driver = tomar(espera)
+    try:
+        yield driver
+    finally:
+        devolver(driver)
+
+
+def calentar(cuantos=1):
+    """Arranca en segundo plano hasta `cuantos` navegadores para que la primera búsqueda no espere."""
+    global _calentando
+    with _lock:
+        # Sin pasar del tamaño del pool contando también los navegadores en uso
+        faltan = min(cuantos - len(_libres), TAMANO_POOL - len(_usos))
+        if _calentando or faltan <= 0:
+            return
+        _calentando = True
+
+    def arrancar_en_segundo_plano():
+        global _calentando
+        try:
+            for _ in range(faltan):
+                if not _plazas.acquire(blocking=False):
+                    break
+                try:
+                    driver = _arrancar()
+                    with _lock:
+                        _libres.append(driver)
+                except Exception:
+                    # Sin Chrome o sin red: la primera búsqueda dará el error al usuario
+                    break
+                finally:
+                    _plazas.release()
+        finally:
+            with _lock:
+                _calentando = False
+
+    threading.Thread(target=arrancar_en_segundo_plano, daemon=True).start()
+
+
+def estado():
+    with _lock:
+        return {"abiertos": len(_usos), "libres": len(_libres), "tamano": TAMANO_POOL}
+
+
+@atexit.register
+def cerrar_todos():
+    with _lock:
+        libres = list(_libres)
+        _libres.clear()
+    for driver in libres:
+        _cerrar(driver)
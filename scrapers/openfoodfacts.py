@@ -0,0 +1,80 @@
+"""
+Consulta de productos por código de barras en la API de Open Food Facts.
+
+consultar_codigos() lanza las consultas en un pool de hilos sobre la sesión
+compartida de scrapers.red (keep-alive, reintentos, timeout y el ritmo que pide
+Open Food Facts: 100 consultas de producto por minuto) y va devolviendo cada
+resultado en cuanto llega, para que la página pueda pintar el progreso. Las
+respuestas (producto o "no encontrado") se quedan en la caché HTTP en disco
+(scrapers.cache_http) con una caducidad, así que volver a subir el mismo fichero
+no repite consultas a la API:
+
+    for posicion, fila in openfoodfacts.consultar_codigos(codigos):
+        ...
+
+La URL de la API se puede cambiar con OPENFOODFACTS_URL (p. ej. un servidor local
+de pruebas).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+
+from scrapers import cache_http, red
+
+URL_BASE = os.environ.get("OPENFOODFACTS_URL", "https://world.openfoodfacts.org")
+CAMPOS = "product_name,brands,stars"
+HILOS = 8
+PETICIONES_MINUTO = float(os.environ.get("OPENFOODFACTS_PETICIONES_MINUTO", "100"))
+TTL_HORAS = float(os.environ.get("OPENFOODFACTS_TTL_HORAS", str(7 * 24)))
+
+red.configurar_ritmo(urlsplit(URL_BASE).netloc, PETICIONES_MINUTO / 60, rafaga=5)
+cache_http.configurar_ttl(urlsplit(URL_BASE).netloc, TTL_HORAS)
+
+
+def _fila(codigo, producto="", marca="", estrellas=""):
+    return {'Código de barras': codigo, 'Producto': producto, 'Marca': marca, 'Estrellas': estrellas}
+
+
+def consultar(codigo):
+    """Fila del producto (o con el error de la API en el nombre del producto)."""
+    try:
+        response = red.get(f"{URL_BASE}/api/v2/product/{codigo}", params={'fields': CAMPOS})
+        # "No encontrado" llega como 404 con el JSON de siempre (status 0)
+        data = response.json() if response.status_code in (200, 404) else None
+    except (requests.RequestException, ValueError):
+        data = None
+    if data is None:
+        return _fila(codigo, 'Error al consultar la API')
+    if data.get('status') != 1:
+        return _fila(codigo, 'Producto no encontrado')
+    product = data.get('product', {})
+    return _fila(codigo,
+                 product.get('product_name', 'Nombre no disponible'),
+                 product.get('brands', 'Marca no disponible'),
+                 product.get('stars', 'Estrellas no disponibles'))
+
+
+# ------------------- CONSULTA EN PARALELO -------------------
+
+def consultar_codigos(codigos, hilos=HILOS):
+    """
+    Genera (posición en `codigos`, fila) en orden de llegada (las que están en la caché
+    llegan enseguida). Los códigos repetidos se consultan una sola vez.
+    """
+    posiciones = {}
+    for i, codigo in enumerate(codigos):
+        posiciones.setdefault(codigo, []).append(i)
+    if not posiciones:
+        return
+    pool = ThreadPoolExecutor(max_workers=hilos)
+    try:
+        futuros = {pool.submit(consultar, codigo): codigo for codigo in posiciones}
+        for futuro in as_completed(futuros):
+            fila = futuro.result()
+            for i in posiciones[futuros[futuro]]:
+                yield i, fila
+    finally:
+        # Si la página deja de consumir (rerun), no se espera a las consultas que faltan
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+"""
+Cliente HTTP compartido por los scrapers y las consultas a APIs externas.
+
+Una sola requests.Session por proceso, con un pool de conexiones keep-alive que
+comparten todos los hilos; reintentos con espera exponencial para los fallos
+transitorios (conexión, 429 y 5xx, respetando Retry-After); timeout en todas las
+peticiones, y un limitador por host (cubo de fichas) para no pasar del ritmo que
+admite cada sitio aunque haya varias consultas en paralelo:
+
+    red.configurar_ritmo("world.openfoodfacts.org", por_segundo=1.5, rafaga=5)
+    respuesta = red.get(url, params={...})
+
+Las respuestas de los hosts con caducidad configurada se guardan en disco y se
+reutilizan (ver scrapers.cache_http); cache=False lo evita en una petición.
+
+Para desarrollar y medir sin red, SCRAPERS_MODO=grabar guarda cada respuesta en
+SCRAPERS_FIXTURES (por defecto scrapers/fixtures) y SCRAPERS_MODO=reproducir las
+sirve desde ahí sin salir a internet. Lo mismo vale para el HTML que devuelve un
+navegador (pagina_renderizada).
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scrapers import cache_http
+
+# (conexión, lectura) en segundos
+TIMEOUT = (5, 20)
+REINTENTOS = 3
+ESPERA_REINTENTO = 0.5  # 0.5 s, 1 s, 2 s...
+CONEXIONES_POR_HOST = 32
+CABECERAS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+MODO = os.environ.get("SCRAPERS_MODO", "")  # "", "grabar" o "reproducir"
+CARPETA_FIXTURES = os.environ.get("SCRAPERS_FIXTURES", os.path.join(os.path.dirname(__file__), "fixtures"))
+
+_lock = threading.Lock()
+_sesion = None
+_ritmos = {}  # host -> (peticiones por segundo, ráfaga)
+_cubos = {}  # host -> (fichas disponibles, instante de la última recarga)
+
+
+def sesion():
+    """La Session del proceso (se crea la primera vez)."""
+    global _sesion
+    with _lock:
+        if _sesion is None:
+            reintentos = Retry(total=REINTENTOS, backoff_factor=ESPERA_REINTENTO,
+                               status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET", "HEAD"),
+                               respect_retry_after_header=True, raise_on_status=False)
+            adaptador = HTTPAdapter(pool_connections=16, pool_maxsize=CONEXIONES_POR_HOST, max_retries=reintentos)
+            _sesion = requests.Session()
+            _sesion.headers.update(CABECERAS)
+            _sesion.mount("http://", adaptador)
+            _sesion.mount("https://", adaptador)
+        return _sesion
+
+
+def configurar_ritmo(host, por_segundo, rafaga=1):
+    """Como mucho `por_segundo` peticiones por segundo a `host`, con ráfagas de hasta `rafaga`."""
+    with _lock:
+        _ritmos[host] = (por_segundo, rafaga)
+        _cubos.pop(host, None)
+
+
+def _esperar_turno(host):
+    while True:
+        with _lock:
+            ritmo = _ritmos.get(host)
+            if ritmo is None:
+                return
+            por_segundo, rafaga = ritmo
+            ahora = time.monotonic()
+            fichas, instante = _cubos.get(host, (rafaga, ahora))
+            fichas = min(rafaga, fichas + (ahora - instante) * por_segundo)
+            if fichas >= 1:
+                _cubos[host] = (fichas - 1, ahora)
+                return
+            _cubos[host] = (fichas, ahora)
+            espera = (1 - fichas) / por_segundo
+        time.sleep(espera)
+
+
+# ------------------- FIXTURES -------------------
+
+def _ruta_fixture(*clave):
+    resumen = hashlib.sha1(json.dumps(clave, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:20]
+    host = urlsplit(clave[1]).netloc.replace(":", "_") or "local"
+    return os.path.join(CARPETA_FIXTURES, host, f"{resumen}.json")
+
+
+def _leer_fixture(*clave):
+    ruta = _ruta_fixture(*clave)
+    if not os.path.exists(ruta):
+        raise requests.ConnectionError(f"Sin fixture para {clave[0]} {clave[1]} ({ruta})")
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_fixture(datos, *clave):
+    ruta = _ruta_fixture(*clave)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(dict(datos, peticion=list(clave)), f, ensure_ascii=False, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _respuesta(status, url, cabeceras, contenido):
+    # Una requests.Response igual que la de la red, a partir de lo guardado
+    respuesta = requests.Response()
+    respuesta.status_code = status
+    respuesta.headers.update(cabeceras)
+    respuesta._content = contenido
+    respuesta.encoding = requests.utils.get_encoding_from_headers(respuesta.headers)
+    respuesta.url = url
+    return respuesta
+
+
+def _respuesta_grabada(datos):
+    return _respuesta(datos["status"], datos["url"], datos["cabeceras"], base64.b64decode(datos["contenido"]))
+
+
+def _peticion(metodo, url, params=None, json_datos=None, timeout=TIMEOUT, cache=True, **kwargs):
+    clave = (metodo, url, params or {}, json_datos)
+    if MODO == "reproducir":
+        return _respuesta_grabada(_leer_fixture(*clave))
+    host = urlsplit(url).netloc
+    # Al grabar fixtures todo sale de la red, para que quede grabado
+    guardable = cache and not MODO and cache_http.ttl(host) is not None
+    guardada = cache_http.leer(clave) if guardable else None
+    if guardada is not None and cache_http.vigente(guardada, host):
+        return _respuesta(*guardada[:4])
+    if guardada is not None:
+        # Caducada: se pregunta si ha cambiado (ETag / Last-Modified) en vez de descargarla otra vez
+        kwargs["headers"] = {**cache_http.validadores(guardada), **(kwargs.get("headers") or {})}
+    _esperar_turno(host)
+    respuesta = sesion().request(metodo, url, params=params, json=json_datos, timeout=timeout, **kwargs)
+    if guardada is not None and respuesta.status_code == 304:
+        cache_http.renovar(clave)
+        return _respuesta(*guardada[:4])
+    if guardable:
+        cache_http.guardar(clave, host, respuesta.status_code, respuesta.url, respuesta.headers, respuesta.content)
+    if MODO == "grabar":
+        # El cuerpo tal cual (base64): al reproducir se decodifica igual que la respuesta real
+        _guardar_fixture({"status": respuesta.status_code, "url": respuesta.url,
+                          "contenido": base64.b64encode(respuesta.content).decode("ascii"),
+                          "cabeceras": {k: v for k, v in respuesta.headers.items()
+                                        if k.lower() in ("content-type", "etag", "last-modified")}}, *clave)
+    return respuesta
+
+
+def get(url, params=None, timeout=TIMEOUT, cache=True, **kwargs):
+    """GET con la sesión compartida, desde la caché en disco o esperando turno en el limitador del host."""
+    return _peticion("GET", url, params=params, timeout=timeout, cache=cache, **kwargs)
+
+
+def post(url, json=None, params=None, timeout=TIMEOUT, cache=True, **kwargs):
+    """POST con cuerpo JSON, igual que get() (para APIs de consulta, como la búsqueda de Mercadona)."""
+    return _peticion("POST", url, params=params, json_datos=json, timeout=timeout, cache=cache, **kwargs)
+
+
+def pagina_renderizada(url, renderizar):
+    """
+    HTML de `url` tal como lo deja un navegador: renderizar(url) devuelve el page_source.
+    En modo reproducir sale de la fixture, sin arrancar ningún navegador.
+    """
+    clave = ("NAVEGADOR", url)
+    if MODO == "reproducir":
+        return _leer_fixture(*clave)["cuerpo"]
+    html = renderizar(url)
+    if MODO == "grabar":
+        _guardar_fixture({"status": 200, "url": url, "cuerpo": html, "cabeceras": {}}, *clave)
+    return html
@@ -0,0 +1,258 @@
+"""
+Búsqueda de productos en las webs de los supermercados.
+
+Cada supermercado registra dos formas de buscar: una por HTTP (la API JSON o el
+HTML que sirve la web, sin navegador) y otra con un navegador del pool de
+scrapers.navegadores, que solo se usa si la primera no sirve (la web cambió, la
+API no responde o el HTML llega sin productos porque se pinta con JavaScript).
+Las dos devuelven filas con las mismas columnas:
+
+    resultado = supermercados.buscar("mercadona", "leche")
+    resultado.productos   # [{"Producto": ..., "Precio (€)": ..., "Enlace": ...}, ...]
+    resultado.via         # "http" o "navegador"
+
+La extracción se hace de una pasada sobre el documento ya parseado (JSON o
+BeautifulSoup sobre el page_source). Con SCRAPERS_MODO=reproducir todo sale de
+las fixtures grabadas (ver scrapers.red), también el HTML del navegador.
+
+Las respuestas HTTP se guardan en la caché en disco (SUPERMERCADOS_CACHE_HORAS, 6
+por defecto; ver scrapers.cache_http).
+
+Para comparar precios, buscar_en_todos() lanza todos los supermercados a la vez
+(el tiempo total es el del más lento, no la suma) y devuelve cada respuesta en
+cuanto termina; comparativa() las junta en una tabla con el precio como número.
+"""
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, urlsplit
+
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+
+from scrapers import cache_http, eroski, red
+
+# productos: lista de dicts; via: "http" o "navegador"
+Resultado = namedtuple("Resultado", ["productos", "via"])
+# resultado: el Resultado, o None si la búsqueda falló (y entonces error trae el mensaje)
+Respuesta = namedtuple("Respuesta", ["supermercado", "resultado", "error"])
+
+NOMBRES = {"mercadona": "Mercadona", "bm": "BM", "eroski": "Eroski"}
+
+# supermercado -> (buscar por HTTP, buscar con navegador); cada uno recibe el alimento
+# y devuelve la lista de productos, o None si no puede saberlo (hay que probar el otro)
+BUSCADORES = {}
+
+# Segundos que se espera a que el navegador pinte los productos
+ESPERA_NAVEGADOR = 15
+CACHE_HORAS = float(os.environ.get("SUPERMERCADOS_CACHE_HORAS", "6"))
+
+
+def buscador(supermercado, via):
+    def registrar(funcion):
+        http, navegador = BUSCADORES.get(supermercado, (None, None))
+        BUSCADORES[supermercado] = (funcion, navegador) if via == "http" else (http, funcion)
+        return funcion
+    return registrar
+
+
+def buscar(supermercado, alimento):
+    """Productos de `supermercado` para `alimento`: primero por HTTP y, si no sirve, con navegador."""
+    http, navegador = BUSCADORES[supermercado]
+    if http is not None:
+        try:
+            productos = http(alimento)
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            if navegador is None:
+                raise
+            productos = None
+        if productos is not None or navegador is None:
+            return Resultado(productos or [], "http")
+    return Resultado(navegador(alimento), "navegador")
+
+
+def _buscar_sin_fallar(supermercado, alimento):
+    try:
+        return Respuesta(supermercado, buscar(supermercado, alimento), None)
+    except Exception as e:
+        return Respuesta(supermercado, None, str(e) or type(e).__name__)
+
+
+def buscar_en_todos(alimento, supermercados=None):
+    """
+    Busca `alimento` en todos los supermercados (o en los de `supermercados`) a la vez y
+    genera una Respuesta por supermercado en orden de llegada. Un supermercado que falla
+    no para a los demás: su Respuesta trae el error.
+    """
+    supermercados = list(supermercados or BUSCADORES)
+    if not supermercados:
+        return
+    pool = ThreadPoolExecutor(max_workers=len(supermercados))
+    try:
+        futuros = [pool.submit(_buscar_sin_fallar, supermercado, alimento) for supermercado in supermercados]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+    finally:
+        # Si la página deja de consumir (rerun), no se espera a los supermercados que faltan
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def precio_numerico(texto):
+    """
+    Precio en euros a partir del texto de cada web ("1,05 €", "2,35\xa0€", "1.234,50",
+    "0.99"...); None si no lleva ningún número.
+    """
+    numero = re.search(r"\d[\d.,]*", str(texto).replace("\xa0", " "))
+    if numero is None:
+        return None
+    numero = numero.group().rstrip(".,")
+    if "," in numero:
+        # Formato español: el punto separa miles y la coma decimales
+        numero = numero.replace(".", "").replace(",", ".")
+    try:
+        return float(numero)
+    except ValueError:
+        return None
+
+
+def comparativa(respuestas):
+    """Una fila por producto de todas las respuestas, con el precio como número y de menor a mayor."""
+    filas = [{"Supermercado": NOMBRES.get(r.supermercado, r.supermercado),
+              "Producto": producto["Producto"],
+              "Precio (€)": precio_numerico(producto["Precio (€)"]),
+              "Enlace": producto["Enlace"]}
+             for r in respuestas if r.resultado is not None for producto in r.resultado.productos]
+    df = pd.DataFrame(filas, columns=["Supermercado", "Producto", "Precio (€)", "Enlace"])
+    df["Precio (€)"] = df["Precio (€)"].astype("float64")
+    return df.sort_values("Precio (€)", kind="stable", na_position="last").reset_index(drop=True)
+
+
+def _renderizar(esperar_css):
+    # page_source de una URL con un navegador del pool, cuando ya se ve `esperar_css`
+    def renderizar(url):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        from scrapers import navegadores
+
+        with navegadores.navegador() as driver:
+            driver.get(url)
+            try:
+                WebDriverWait(driver, ESPERA_NAVEGADOR).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, esperar_css)))
+            except TimeoutException:
+                pass  # sin productos: se devuelve la página tal cual
+            return driver.page_source
+    return renderizar
+
+
+# ------------------- MERCADONA -------------------
+
+# La tienda online busca en Algolia con una clave pública de solo lectura (la misma que usa la web)
+MERCADONA_ALGOLIA_URL = os.environ.get(
+    "MERCADONA_ALGOLIA_URL", "https://7uzjkl1dj0-dsn.algolia.net/1/indexes/products_prod_{almacen}_es/query")
+MERCADONA_ALGOLIA_APP = os.environ.get("MERCADONA_ALGOLIA_APP", "7UZJKL1DJ0")
+MERCADONA_ALGOLIA_CLAVE = os.environ.get("MERCADONA_ALGOLIA_CLAVE", "9d8f2e39e90df472b4f2e559a116fe17")
+MERCADONA_ALMACEN = os.environ.get("MERCADONA_ALMACEN", "mad1")
+MERCADONA_BUSQUEDA = "https://tienda.mercadona.es/search-results?query={}"
+
+cache_http.configurar_ttl(urlsplit(MERCADONA_ALGOLIA_URL).netloc, CACHE_HORAS)
+
+
+def _precio_mercadona(valor):
+    # La API da "1.05"; en la web se ve "1,05 €"
+    return f"{str(valor).replace('.', ',')} €" if valor not in (None, "") else "Precio no disponible"
+
+
+@buscador("mercadona", "http")
+def _mercadona_http(alimento):
+    respuesta = red.post(MERCADONA_ALGOLIA_URL.format(almacen=MERCADONA_ALMACEN),
+                         params={"x-algolia-application-id": MERCADONA_ALGOLIA_APP,
+                                 "x-algolia-api-key": MERCADONA_ALGOLIA_CLAVE},
+                         json={"params": f"query={quote(alimento)}&hitsPerPage=100"})
+    if respuesta.status_code != 200:
+        return None
+    return [{"Producto": hit["display_name"],
+             "Precio (€)": _precio_mercadona(hit.get("price_instructions", {}).get("unit_price")),
+             "Enlace": hit.get("share_url") or MERCADONA_BUSQUEDA.format(quote(alimento))}
+            for hit in respuesta.json()["hits"]]
+
+
+@buscador("mercadona", "navegador")
+def _mercadona_navegador(alimento):
+    url = MERCADONA_BUSQUEDA.format(alimento)
+    soup = BeautifulSoup(red.pagina_renderizada(url, _renderizar(".product-cell")), "html.parser")
+    # og:url es de la página, no de cada producto: se lee una sola vez
+    meta_url = soup.select_one("meta[property='og:url']")
+    enlace = meta_url["content"] if meta_url and meta_url.has_attr("content") else url
+    productos = []
+    for celda in soup.select(".product-cell"):
+        nombre = celda.select_one(".product-cell__description-name")
+        precio = celda.select_one(".product-price__unit-price")
+        if nombre is None:
+            continue
+        productos.append({"Producto": nombre.get_text(strip=True),
+                          "Precio (€)": precio.get_text(strip=True) if precio else "Precio no disponible",
+                          "Enlace": enlace})
+    return productos
+
+
+# ------------------- BM -------------------
+
+BM_WEB = "https://www.online.bmsupermercados.es"
+BM_BUSQUEDA = BM_WEB + "/es/s/{}?orderById=13&page=1"
+
+cache_http.configurar_ttl(urlsplit(BM_WEB).netloc, CACHE_HORAS)
+
+
+def _productos_bm(html):
+    # None si la página no trae el listado (se pinta con JavaScript): hay que usar el navegador
+    soup = BeautifulSoup(html, "html.parser")
+    bloques = soup.select("div.widget-prod")
+    if not bloques:
+        return None
+    productos = []
+    for bloque in bloques:
+        img_tag = bloque.find('img')
+        price_span = bloque.find('span', id='grid-widget--price')
+        link_tag = bloque.find('a', href=True)
+        productos.append({
+            'Producto': img_tag['alt'] if img_tag and img_tag.has_attr('alt') else "Sin título",
+            'Precio (€)': price_span.get_text(strip=True).replace('\xa0', ' ') if price_span else "Precio no disponible",
+            'Enlace': BM_WEB + link_tag['href'] if link_tag else "Sin enlace",
+        })
+    return productos
+
+
+@buscador("bm", "http")
+def _bm_http(alimento):
+    respuesta = red.get(BM_BUSQUEDA.format(quote(alimento)))
+    if respuesta.status_code != 200:
+        return None
+    # Los bytes: BeautifulSoup saca la codificación del propio HTML si la cabecera no la trae
+    return _productos_bm(respuesta.content)
+
+
+@buscador("bm", "navegador")
+def _bm_navegador(alimento):
+    html = red.pagina_renderizada(BM_BUSQUEDA.format(quote(alimento)), _renderizar("div.widget-prod"))
+    return _productos_bm(html) or []
+
+
+# ------------------- EROSKI -------------------
+
+@buscador("eroski", "http")
+def _eroski_http(alimento):
+    # El listado no trae precios: salen de las fichas, que se piden en paralelo (ver scrapers.eroski)
+    encontrados = eroski.buscar(alimento)
+    productos = [None] * len(encontrados)
+    for i, detalles in eroski.consultar_detalles([url for _, url in encontrados]):
+        titulo, url = encontrados[i]
+        # Si la ficha no se pudo leer, el precio trae el error: no es un precio
+        precio = "Precio no disponible" if detalles["precio"].startswith("Error") else detalles["precio"]
+        productos[i] = {"Producto": titulo, "Precio (€)": precio, "Enlace": url}
+    return productos